@@ -0,0 +1,301 @@
+"""
+📅 ماژول ظرفیت و تداخل رزروها
+Booking availability engine for Mandani Studio Bot
+
+رزروهای در انتظار و تأیید شده در یک ایندکس بازه‌ای درون حافظه (لیست مرتب شروع‌ها +
+bisect) نگهداری می‌شوند. چون طول هر رزرو محدود است (حداکثر یک روز)، رزروهای متداخل
+با یک بازه فقط در محدوده [شروع - بیشترین طول، پایان) قرار دارند و با دو جستجوی دودویی
+در O(log n + k) پیدا می‌شوند. ظرفیت باقی‌مانده (عکاس، دوربین، پهپاد هلی‌شات) با یک
+sweep روی همین k رزرو محاسبه می‌شود.
+
+ایندکس یک بار هنگام راه‌اندازی از پایگاه داده ساخته شده و سپس با listener های نوشتن
+DatabaseManager (ایجاد رزرو و تغییر وضعیت) به صورت تدریجی به‌روز می‌شود.
+"""
+
+import bisect
+import logging
+import re
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils import PersianDateUtils
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+# وضعیت‌هایی که ظرفیت را اشغال می‌کنند
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+_TRANSLATE_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+_TIME = re.compile(r'^\s*(\d{1,2})(?::(\d{2}))?\s*(صبح|ظهر|بعدازظهر|بعد از ظهر|عصر|شب)?\s*$')
+_HOURS = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def parse_event_date(text: str) -> Optional[date]:
+    """تاریخ شمسی (۱۴۰۳/۰۸/۱۵ یا 1403-8-15) ← date میلادی؛ تاریخ نامعتبر: None"""
+    return PersianDateUtils.parse_jalali_date(text)
+
+
+def parse_event_time(text: str) -> Optional[int]:
+    """ساعت (۱۸:۳۰، ۶ عصر، ۱۰ صبح، ...) ← دقیقه از ابتدای روز؛ نامعتبر: None"""
+    match = _TIME.match((text or '').translate(_TRANSLATE_DIGITS))
+    if not match:
+        return None
+    hour, minute, period = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if period == 'صبح':
+        hour %= 12
+    elif period == 'ظهر':
+        hour = hour if hour >= 11 else hour + 12
+    elif period == 'شب' and hour == 12:
+        hour = 0
+    elif period and hour < 12:
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def parse_duration(text, default_minutes: int) -> Optional[int]:
+    """
+    مدت مراسم ('۶ ساعت'، '2'، ...) ← دقیقه
+
+    Returns:
+        None برای «تمام روز»؛ default_minutes اگر عددی در متن نباشد
+    """
+    if text is None:
+        return default_minutes
+    text = str(text).translate(_TRANSLATE_DIGITS)
+    if 'تمام' in text or 'full' in text.lower():
+        return None
+    match = _HOURS.search(text)
+    if not match:
+        return default_minutes
+    hours = float(match.group(1))
+    # اعداد بزرگ احتمالاً دقیقه هستند (مثلاً «۹۰ دقیقه»)
+    minutes = hours if 'دقیقه' in text or hours > 24 else hours * 60
+    return int(min(max(minutes, 30), MINUTES_PER_DAY))
+
+
+def format_minutes(minutes: int) -> str:
+    """دقیقه از ابتدای روز ← «۱۸:۳۰»"""
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}".translate(str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹'))
+
+
+class Crew(NamedTuple):
+    """نیروی انسانی و تجهیزات (نیاز یک رزرو یا ظرفیت استودیو)"""
+    photographers: int
+    cameras: int
+    drones: int
+
+    def __add__(self, other: 'Crew') -> 'Crew':
+        return Crew(self.photographers + other.photographers, self.cameras + other.cameras,
+                    self.drones + other.drones)
+
+    def __sub__(self, other: 'Crew') -> 'Crew':
+        return Crew(self.photographers - other.photographers, self.cameras - other.cameras,
+                    self.drones - other.drones)
+
+    def fits(self, capacity: 'Crew') -> bool:
+        return (self.photographers <= capacity.photographers and self.cameras <= capacity.cameras
+                and self.drones <= capacity.drones)
+
+
+class Booking(NamedTuple):
+    """یک رزرو در ایندکس (زمان‌ها به دقیقه از ابتدای تقویم میلادی)"""
+    code: str
+    start: int
+    end: int
+    crew: Crew
+    status: str
+
+    @property
+    def day(self) -> date:
+        return date.fromordinal(self.start // MINUTES_PER_DAY)
+
+
+class Availability(NamedTuple):
+    """نتیجه بررسی یک بازه"""
+    fits: bool
+    remaining: Crew
+    conflicts: Tuple[Booking, ...]
+
+
+class AvailabilityIndex:
+    """ایندکس بازه‌ای رزروهای فعال و بررسی ظرفیت"""
+
+    def __init__(self, capacity: Crew, buffer_minutes: int = 60, default_minutes: int = 120,
+                 day_start_hour: int = 8, day_end_hour: int = 24):
+        """
+        Args:
+            capacity: ظرفیت همزمان استودیو
+            buffer_minutes: فاصله لازم بین دو مراسم (رفت و آمد و آماده‌سازی)
+            default_minutes: مدت پیش‌فرض وقتی مدت هنوز مشخص نیست
+            day_start_hour / day_end_hour: محدوده کاری روز (برای «تمام روز» و بازه‌های آزاد)
+        """
+        self.capacity = capacity
+        self.buffer = buffer_minutes
+        self.default_minutes = default_minutes
+        self.day_start = day_start_hour * 60
+        self.day_end = day_end_hour * 60
+
+        self._starts: List[int] = []
+        self._bookings: List[Booking] = []
+        self._by_code: Dict[str, Booking] = {}
+        self._max_length = 0
+        # با هر تغییر افزایش می‌یابد (کلید cache نتایج وابسته به ظرفیت، مثل تقویم)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._bookings)
+
+    # ========================================
+    # ساخت و به‌روزرسانی
+    # ========================================
+
+    @staticmethod
+    def required_crew(details: Dict) -> Crew:
+        """نیاز یک رزرو از جزئیات آن (مقادیر پیش‌فرض: ۱ عکاس، ۱ دوربین)"""
+        details = details or {}
+        return Crew(
+            photographers=int(details.get('photographers') or 1),
+            cameras=int(details.get('cameras') or 1),
+            drones=1 if details.get('helishot') else 0,
+        )
+
+    def event_window(self, day: date, start_minutes: Optional[int], duration) -> Tuple[int, int]:
+        """بازه مطلق یک مراسم؛ «تمام روز» کل ساعات کاری روز را اشغال می‌کند"""
+        base = day.toordinal() * MINUTES_PER_DAY
+        length = parse_duration(duration, self.default_minutes)
+        if length is None or start_minutes is None:
+            return base + self.day_start, base + self.day_end
+        return base + start_minutes, base + start_minutes + length
+
+    def booking_from_reservation(self, reservation: Dict) -> Optional[Booking]:
+        """ساخت Booking از ردیف پایگاه داده (تاریخ نامعتبر یا نامشخص: None)"""
+        iso = reservation.get('event_date_iso')
+        day = date.fromisoformat(iso) if iso else parse_event_date(reservation.get('event_date'))
+        if day is None:
+            return None
+        details = reservation.get('service_details') or {}
+        start, end = self.event_window(day, parse_event_time(reservation.get('event_time')),
+                                       details.get('duration'))
+        return Booking(reservation['reservation_code'], start, end, self.required_crew(details),
+                       reservation.get('booking_status') or 'pending')
+
+    def add(self, booking: Booking):
+        self.remove(booking.code)
+        index = bisect.bisect_right(self._starts, booking.start)
+        self._starts.insert(index, booking.start)
+        self._bookings.insert(index, booking)
+        self._by_code[booking.code] = booking
+        self._max_length = max(self._max_length, booking.end - booking.start)
+        self.version += 1
+
+    def remove(self, code: str) -> bool:
+        booking = self._by_code.pop(code, None)
+        if booking is None:
+            return False
+        index = bisect.bisect_left(self._starts, booking.start)
+        while self._bookings[index].code != code:
+            index += 1
+        del self._starts[index]
+        del self._bookings[index]
+        self.version += 1
+        return True
+
+    def load(self, db) -> int:
+        """ساخت ایندکس از رزروهای فعال پایگاه داده"""
+        self._starts, self._bookings, self._by_code, self._max_length = [], [], {}, 0
+        bookings = [b for b in map(self.booking_from_reservation, db.get_active_reservations()) if b]
+        bookings.sort(key=lambda b: b.start)
+        self._starts = [b.start for b in bookings]
+        self._bookings = bookings
+        self._by_code = {b.code: b for b in bookings}
+        self._max_length = max((b.end - b.start for b in bookings), default=0)
+        self.version += 1
+        logger.info(f"📅 ایندکس ظرفیت: {len(bookings)} رزرو فعال")
+        return len(bookings)
+
+    def on_reservation_changed(self, db, reservation_code: str):
+        """listener نوشتن DatabaseManager: به‌روزرسانی تدریجی یک رزرو"""
+        reservation = db.get_reservation_by_code(reservation_code)
+        if not reservation or reservation.get('booking_status') not in ACTIVE_STATUSES:
+            self.remove(reservation_code)
+            return
+        booking = self.booking_from_reservation(reservation)
+        if booking:
+            self.add(booking)
+        else:
+            self.remove(reservation_code)
+
+    # ========================================
+    # پرس‌وجو
+    # ========================================
+
+    def overlapping(self, start: int, end: int, exclude: str = None) -> List[Booking]:
+        """رزروهایی که (با احتساب فاصله لازم) با بازه [start, end) تداخل دارند"""
+        lo = bisect.bisect_left(self._starts, start - self._max_length - self.buffer)
+        hi = bisect.bisect_left(self._starts, end + self.buffer)
+        return [b for b in self._bookings[lo:hi]
+                if b.end + self.buffer > start and b.code != exclude]
+
+    def _usage_segments(self, bookings: List[Booking], start: int, end: int) -> List[Tuple[int, int, Crew]]:
+        """تقسیم [start, end) به بخش‌هایی با مصرف ثابت: (شروع، پایان، مصرف)"""
+        events = {start: Crew(0, 0, 0), end: Crew(0, 0, 0)}
+        for booking in bookings:
+            # فاصله لازم به دو طرف رزرو اضافه می‌شود
+            for point, sign in ((max(booking.start - self.buffer, start), 1),
+                                (min(booking.end + self.buffer, end), -1)):
+                delta = booking.crew if sign > 0 else Crew(0, 0, 0) - booking.crew
+                events[point] = events.get(point, Crew(0, 0, 0)) + delta
+
+        segments = []
+        used = Crew(0, 0, 0)
+        points = sorted(events)
+        for point, next_point in zip(points, points[1:]):
+            used = used + events[point]
+            if point < end and next_point > start:
+                segments.append((point, next_point, used))
+        return segments
+
+    def check(self, start: int, end: int, crew: Crew, exclude: str = None) -> Availability:
+        """آیا رزرو جدید با این نیاز در بازه [start, end) جا می‌شود؟"""
+        conflicts = self.overlapping(start, end, exclude)
+        peak = Crew(0, 0, 0)
+        for _, _, used in self._usage_segments(conflicts, start, end):
+            peak = Crew(*(max(a, b) for a, b in zip(peak, used)))
+        remaining = self.capacity - peak
+        return Availability(crew.fits(remaining), remaining, tuple(conflicts))
+
+    def free_windows(self, day: date, crew: Crew, min_minutes: int = None) -> List[Tuple[int, int]]:
+        """بازه‌های آزاد ساعات کاری یک روز برای این نیاز: (دقیقه شروع، دقیقه پایان)"""
+        min_minutes = self.default_minutes if min_minutes is None else min_minutes
+        base = day.toordinal() * MINUTES_PER_DAY
+        start, end = base + self.day_start, base + self.day_end
+
+        windows = []
+        for seg_start, seg_end, used in self._usage_segments(self.overlapping(start, end), start, end):
+            if not crew.fits(self.capacity - used):
+                continue
+            if windows and windows[-1][1] == seg_start:
+                windows[-1] = (windows[-1][0], seg_end)
+            else:
+                windows.append((seg_start, seg_end))
+        return [(s - base, e - base) for s, e in windows if e - s >= min_minutes]
+
+    def day_bookings(self, day: date) -> List[Booking]:
+        base = day.toordinal() * MINUTES_PER_DAY
+        return self.overlapping(base, base + MINUTES_PER_DAY)
+
+    def is_day_full(self, day: date, crew: Crew = Crew(1, 1, 0)) -> bool:
+        return not self.free_windows(day, crew)
+
+    def format_free_windows(self, day: date, crew: Crew) -> str:
+        windows = self.free_windows(day, crew)
+        if not windows:
+            return "هیچ بازه آزادی در این روز وجود ندارد"
+        return '، '.join(f"{format_minutes(s)} تا {format_minutes(e) if e < MINUTES_PER_DAY else '۲۴:۰۰'}"
+                        for s, e in windows)
+
@@ -0,0 +1,4 @@
+"""
+⏱️ ابزارهای سنجش کارایی ربات استودیو ماندنی
+Benchmarks and load-test tools for Mandani Studio Bot
+"""
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+🗄️ سنجش کارایی DatabaseManager
+DatabaseManager benchmark suite with a synthetic data generator
+
+یک پایگاه داده مصنوعی با مشتریان و رزروهای واقعی‌نما (نام‌های فارسی، تاریخ‌های
+شمسی، وضعیت‌های مختلف) با executemany دسته‌ای ساخته می‌شود و زمان متدهای پرکاربرد
+DatabaseManager روی آن اندازه‌گیری می‌شود. خروجی JSON برای مقایسه بین نسخه‌ها است.
+
+مثال:
+    python -m benchmarks.bench_database --reservations 1000000 --json db_bench.json
+    python -m benchmarks.bench_database --db /tmp/bench.db --repeat 20 --skip backup_data
+    python -m benchmarks.bench_database --db /tmp/bench.db --cache-size 1024 --only get_reservation
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from database import DatabaseManager  # noqa: E402
+from query_cache import QueryCache  # noqa: E402
+from utils import PersianDateUtils  # noqa: E402
+
+FIRST_NAMES = [
+    'علی', 'محمد', 'رضا', 'حسین', 'امیر', 'مهدی', 'سعید', 'حمید', 'کامران', 'پویا',
+    'مریم', 'زهرا', 'فاطمه', 'سارا', 'نگار', 'الهام', 'نرگس', 'مینا', 'شیما', 'پریسا',
+]
+LAST_NAMES = [
+    'محمدی', 'احمدی', 'رضایی', 'کریمی', 'حسینی', 'موسوی', 'جعفری', 'صادقی', 'رحیمی',
+    'کاظمی', 'نوری', 'قاسمی', 'ابراهیمی', 'یوسفی', 'اکبری', 'طاهری', 'باقری', 'شریفی',
+]
+LOCATIONS = ['تهران، تالار بهار', 'کرج، باغ ارغوان', 'تهران، هتل آزادی', 'شیراز، باغ ارم', 'اصفهان، تالار نقش جهان']
+SERVICE_TYPES = [('wedding', 5), ('engagement', 3), ('birthday', 2), ('general', 2), ('other', 1)]
+BOOKING_STATUSES = [('pending', 3), ('confirmed', 6), ('canceled', 1)]
+PAYMENT_STATUSES = [('pending', 4), ('partial', 3), ('paid', 3)]
+
+# الفبای کد رزرو (مشابه ReservationCodeGenerator)
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+
+def _weighted(choices) -> List[str]:
+    return [value for value, weight in choices for _ in range(weight)]
+
+
+def make_code(index: int, length: int = 6) -> str:
+    """کد رزرو یکتا بر اساس شماره ردیف"""
+    chars = []
+    for _ in range(length):
+        index, remainder = divmod(index, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def seed_database(db_path: str, customers: int, reservations: int, batch_size: int = 10000,
+                  seed: int = 42) -> float:
+    """
+    ساخت داده مصنوعی با executemany دسته‌ای
+
+    Returns:
+        مدت زمان ساخت داده (ثانیه)
+    """
+    rng = random.Random(seed)
+    services = _weighted(SERVICE_TYPES)
+    bookings = _weighted(BOOKING_STATUSES)
+    payments = _weighted(PAYMENT_STATUSES)
+    now = datetime.datetime.now()
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    def customer_rows():
+        for index in range(customers):
+            yield (
+                100000000 + index,
+                f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                f'09{rng.randint(0, 999999999):09d}',
+                f'user{index}@example.com' if rng.random() < 0.4 else None,
+            )
+
+    def reservation_rows():
+        for index in range(reservations):
+            customer_index = rng.randrange(customers)
+            service = rng.choice(services)
+            total = rng.randrange(2_000_000, 40_000_000, 100_000)
+            created = now - datetime.timedelta(seconds=rng.randrange(730 * 86400))
+            details = {
+                'service_type': service,
+                'guest_count': rng.randint(30, 500),
+                'cameras': rng.randint(1, 5),
+                'photographers': rng.randint(1, 4),
+                'helishot': rng.random() < 0.3,
+            }
+            event_day = PersianDateUtils.jalali_to_gregorian(
+                rng.randint(1402, 1405), rng.randint(1, 12), rng.randint(1, 29)
+            )
+            yield (
+                customer_index + 1,
+                100000000 + customer_index,
+                make_code(index),
+                service,
+                json.dumps(details, ensure_ascii=False),
+                PersianDateUtils.format_jalali_date(event_day),
+                event_day.isoformat(),
+                f'{rng.randint(10, 22)}:{rng.choice(("00", "30"))}',
+                rng.choice(LOCATIONS),
+                total,
+                total // 2,
+                rng.choice(payments),
+                rng.choice(bookings),
+                created.strftime('%Y-%m-%d %H:%M:%S'),
+            )
+
+    def insert(sql: str, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(sql, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(sql, batch)
+
+    with conn:
+        insert(
+            'INSERT INTO customers (telegram_id, name, phone, email) VALUES (?, ?, ?, ?)',
+            customer_rows()
+        )
+        insert('''
+            INSERT INTO reservations (
+                customer_id, telegram_id, reservation_code, service_type, service_details,
+                event_date, event_date_iso, event_time, location, total_cost, deposit_amount,
+                payment_status, booking_status, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', reservation_rows())
+    conn.close()
+    return time.perf_counter() - start
+
+
+def count_rows(db_path: str, table: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def jalali_month(year: int, month: int) -> tuple:
+    """بازه میلادی (YYYY-MM-DD) یک ماه شمسی، مطابق ستون event_date_iso"""
+    first = PersianDateUtils.jalali_to_gregorian(year, month, 1)
+    last = PersianDateUtils.jalali_to_gregorian(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return first.isoformat(), last.isoformat()
+
+
+def build_cases(db: DatabaseManager, customers: int, rng: random.Random) -> Dict[str, Callable]:
+    """متدهای مورد سنجش؛ هر فراخوانی با ورودی تازه انجام می‌شود"""
+
+    def telegram_id():
+        return 100000000 + rng.randrange(customers)
+
+    return {
+        'search_reservations[code]': lambda: db.search_reservations(make_code(rng.randrange(customers))[:4], 'code'),
+        'search_reservations[name]': lambda: db.search_reservations(rng.choice(LAST_NAMES), 'name'),
+        'search_reservations[phone]': lambda: db.search_reservations(f'{rng.randint(0, 9999):04d}', 'phone'),
+        'search_reservations[all]': lambda: db.search_reservations(rng.choice(FIRST_NAMES), 'all'),
+        'get_statistics': db.get_statistics,
+        'get_user_reservations': lambda: db.get_user_reservations(telegram_id()),
+        'get_reservations_by_date_range': lambda: db.get_reservations_by_date_range(
+            *jalali_month(1404, rng.randint(1, 12))
+        ),
+        'check_rate_limit': lambda: db.check_rate_limit(telegram_id(), 'button_click', 30, 1),
+        'backup_data': db.backup_data,
+    }
+
+
+def time_case(func: Callable, repeat: int, warmup: int = 1) -> dict:
+    """اجرای یک مورد و محاسبه آمار زمان (میلی‌ثانیه)"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if isinstance(result, list):
+            rows = len(result)
+
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'min_ms': timings[0],
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max_ms': timings[-1],
+        'rows': rows,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def run(args) -> dict:
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='mandani_bench_'), 'bench.db')
+    # پیش‌فرض بدون cache تا زمان‌ها هزینه واقعی SQLite را نشان دهند
+    db = DatabaseManager(db_path, cache=QueryCache(args.cache_size) if args.cache_size else None)
+
+    seed_time = None
+    existing = count_rows(db_path, 'reservations')
+    if existing != args.reservations:
+        if existing:
+            raise SystemExit(f"❌ {db_path} شامل {existing} رزرو است؛ فایل دیگری انتخاب کنید")
+        print(f"🌱 ساخت {args.customers:,} مشتری و {args.reservations:,} رزرو ...", file=sys.stderr)
+        seed_time = seed_database(db_path, args.customers, args.reservations, args.batch_size, args.seed)
+        print(f"   انجام شد در {seed_time:.1f}s", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    cases = build_cases(db, args.customers, rng)
+    selected = [name for name in cases
+                if (not args.only or any(o in name for o in args.only))
+                and not any(s in name for s in args.skip)]
+
+    results = {}
+    for name in selected:
+        repeat = args.backup_repeat if name == 'backup_data' else args.repeat
+        results[name] = time_case(cases[name], repeat, warmup=0 if name == 'backup_data' else 1)
+        stats = results[name]
+        print(f"{name:<34} median={stats['median_ms']:>9.2f}ms  p95={stats['p95_ms']:>9.2f}ms  "
+              f"rows={stats['rows']}", file=sys.stderr)
+
+    if not args.db:
+        os.remove(db_path)
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'customers': args.customers,
+            'reservations': args.reservations,
+            'seed': args.seed,
+            'seed_seconds': seed_time,
+            'cache_size': args.cache_size,
+        },
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='سنجش کارایی DatabaseManager با داده مصنوعی')
+    parser.add_argument('--customers', type=int, default=20000, help='تعداد مشتریان')
+    parser.add_argument('--reservations', type=int, default=100000, help='تعداد رزروها (تا ۱٬۰۰۰٬۰۰۰ و بیشتر)')
+    parser.add_argument('--batch-size', type=int, default=10000, help='اندازه دسته executemany')
+    parser.add_argument('--repeat', type=int, default=10, help='تعداد تکرار هر مورد')
+    parser.add_argument('--backup-repeat', type=int, default=1, help='تعداد تکرار backup_data')
+    parser.add_argument('--seed', type=int, default=42, help='seed مولد تصادفی')
+    parser.add_argument('--cache-size', type=int, default=0, help='اندازه cache کوئری (0 = بدون cache)')
+    parser.add_argument('--db', help='مسیر پایگاه داده (برای استفاده مجدد از داده ساخته شده)')
+    parser.add_argument('--only', nargs='*', default=[], help='فقط مواردی که شامل این نام‌ها هستند')
+    parser.add_argument('--skip', nargs='*', default=[], help='رد کردن مواردی که شامل این نام‌ها هستند')
+    parser.add_argument('--json', metavar='PATH', help='ذخیره نتیجه به صورت JSON (- برای stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json == '-':
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
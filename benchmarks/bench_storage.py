@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+💽 سنجش پروفایل‌های ذخیره‌سازی SQLite
+Storage profile benchmark (journal mode, synchronous, cache and mmap)
+
+برای هر پروفایل STORAGE_PROFILES یک پایگاه داده مصنوعی جداگانه (همان داده
+bench_database) ساخته می‌شود و این موارد اندازه‌گیری می‌شوند:
+
+    نوشتن ترتیبی     create_reservation و update_reservation_status (هزینه commit و fsync)
+    خواندن ترتیبی     get_reservation_by_code، get_user_reservations و جستجوی نام
+    بار همزمان       یک نویسنده و چند خواننده در thread های جدا برای مدت ثابت؛
+                     تعداد عملیات، صدک‌های خواندن و خطاهای database is locked
+
+پیش‌فرض DB_STORAGE_PROFILE بر اساس همین سنجش انتخاب شده است. پایگاه داده را روی
+همان دیسکی بسازید که ربات اجرا می‌شود (--dir)؛ tmpfs هزینه fsync را پنهان می‌کند.
+
+مثال:
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --dir /var/lib/mandani --readers 8 --json storage.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from benchmarks.bench_database import (  # noqa: E402
+    LAST_NAMES, git_revision, make_code, seed_database, time_case
+)
+from database import STORAGE_PROFILES, DatabaseManager  # noqa: E402
+
+
+def _percentile(timings: List[float], fraction: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))] if timings else 0.0
+
+
+def run_mixed(db: DatabaseManager, customers: int, readers: int, duration: float, seed: int) -> dict:
+    """یک نویسنده و چند خواننده همزمان به مدت duration ثانیه"""
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'writes': 0, 'reads': 0, 'locked': 0}
+    read_timings: List[float] = []
+    write_timings: List[float] = []
+
+    def writer():
+        index = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                db.create_reservation(100000000 + index % customers, f'MIX{seed}{index:08d}', 'wedding', {},
+                                      event_date='1404/05/10', total_cost=1000)
+            except sqlite3.OperationalError:
+                with lock:
+                    stats['locked'] += 1
+            else:
+                write_timings.append((time.perf_counter() - start) * 1000)
+            index += 1
+        with lock:
+            stats['writes'] += len(write_timings)
+
+    def reader(number: int):
+        rng = random.Random(seed + number)
+        timings = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if rng.random() < 0.5:
+                    db.get_reservation_by_code(make_code(rng.randrange(customers)))
+                else:
+                    db.get_user_reservations(100000000 + rng.randrange(customers))
+            except sqlite3.OperationalError:
+                with lock:
+                    stats['locked'] += 1
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+        with lock:
+            stats['reads'] += len(timings)
+            read_timings.extend(timings)
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader, args=(number,)) for number in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    read_timings.sort()
+    write_timings.sort()
+    return {
+        'duration_s': duration,
+        'readers': readers,
+        'writes_per_s': stats['writes'] / duration,
+        'reads_per_s': stats['reads'] / duration,
+        'locked_errors': stats['locked'],
+        'read_p50_ms': _percentile(read_timings, 0.50),
+        'read_p99_ms': _percentile(read_timings, 0.99),
+        'write_p50_ms': _percentile(write_timings, 0.50),
+        'write_p99_ms': _percentile(write_timings, 0.99),
+    }
+
+
+def bench_profile(profile: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix=f'mandani_storage_{profile}_', dir=args.dir)
+    try:
+        db_path = os.path.join(directory, 'bench.db')
+        DatabaseManager(db_path)  # ساخت جداول
+        seed_database(db_path, args.customers, args.reservations, seed=args.seed)
+        db = DatabaseManager(db_path, storage_profile=profile)
+        rng = random.Random(args.seed)
+        counter = iter(range(10 ** 9))
+
+        cases = {
+            'create_reservation': lambda: db.create_reservation(
+                100000000 + rng.randrange(args.customers), f'W{next(counter):09d}', 'wedding', {},
+                event_date='1404/05/10', total_cost=1000
+            ),
+            'update_reservation_status': lambda: db.update_reservation_status(
+                make_code(rng.randrange(args.reservations)), rng.choice(('pending', 'confirmed'))
+            ),
+            'get_reservation_by_code': lambda: db.get_reservation_by_code(make_code(rng.randrange(args.reservations))),
+            'get_user_reservations': lambda: db.get_user_reservations(100000000 + rng.randrange(args.customers)),
+            'search_reservations[name]': lambda: db.search_reservations(rng.choice(LAST_NAMES), 'name'),
+        }
+        results = {}
+        for name, func in cases.items():
+            repeat = args.writes if name in ('create_reservation', 'update_reservation_status') else args.repeat
+            results[name] = time_case(func, repeat)
+        results['mixed'] = run_mixed(db, args.customers, args.readers, args.duration, args.seed)
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_table(report: dict):
+    profiles = list(report['results'])
+    first = report['results'][profiles[0]]
+    print(f"\n{'median ms':<28}" + ''.join(f'{profile:>14}' for profile in profiles))
+    for case in first:
+        if case == 'mixed':
+            continue
+        print(f'{case:<28}' + ''.join(f"{report['results'][p][case]['median_ms']:>14.3f}" for p in profiles))
+    print(f"\n{'mixed (1 writer + readers)':<28}" + ''.join(f'{profile:>14}' for profile in profiles))
+    for metric in ('writes_per_s', 'reads_per_s', 'read_p99_ms', 'write_p99_ms', 'locked_errors'):
+        print(f'{metric:<28}' + ''.join(f"{report['results'][p]['mixed'][metric]:>14.1f}" for p in profiles))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='سنجش پروفایل‌های ذخیره‌سازی SQLite')
+    parser.add_argument('--profiles', nargs='*', default=list(STORAGE_PROFILES), choices=list(STORAGE_PROFILES))
+    parser.add_argument('--customers', type=int, default=5000, help='تعداد مشتریان')
+    parser.add_argument('--reservations', type=int, default=50000, help='تعداد رزروها')
+    parser.add_argument('--writes', type=int, default=300, help='تعداد تکرار موارد نوشتن')
+    parser.add_argument('--repeat', type=int, default=500, help='تعداد تکرار موارد خواندن')
+    parser.add_argument('--readers', type=int, default=4, help='تعداد thread های خواننده در بار همزمان')
+    parser.add_argument('--duration', type=float, default=5, help='مدت بار همزمان (ثانیه)')
+    parser.add_argument('--seed', type=int, default=42, help='seed مولد تصادفی')
+    parser.add_argument('--dir', help='پوشه فایل‌های موقت (روی دیسک واقعی ربات)')
+    parser.add_argument('--json', metavar='PATH', help='ذخیره نتیجه به صورت JSON (- برای stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for profile in args.profiles:
+        print(f"💽 {profile} ...", file=sys.stderr)
+        results[profile] = bench_profile(profile, args)
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'customers': args.customers,
+            'reservations': args.reservations,
+            'readers': args.readers,
+            'profiles': {profile: STORAGE_PROFILES[profile] for profile in args.profiles},
+        },
+        'results': results,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    else:
+        print_table(report)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+🔬 سنجش کارایی توابع پرکاربرد utils
+Microbenchmarks for utils.py hot paths with regression thresholds
+
+هر مورد با timeit اجرا می‌شود (تعداد حلقه با autorange تعیین شده و بهترین زمان
+از چند تکرار گزارش می‌شود). نتیجه را می‌توان به عنوان baseline ذخیره کرد و
+اجراهای بعدی را با آن مقایسه کرد؛ اگر یک مسیر بیش از آستانه درصدی کندتر شده باشد
+دستور compare با کد خروج ۱ پایان می‌یابد.
+
+baseline ها وابسته به ماشین هستند و همراه مخزن ارائه نمی‌شوند؛ پیش از اولین compare
+آنها را روی همان ماشینی که مقایسه انجام می‌شود بسازید.
+
+مثال:
+    python -m benchmarks.bench_utils baseline
+    python -m benchmarks.bench_utils compare --threshold 10
+    python -m benchmarks.bench_utils run --only validate --json -
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from availability import Booking, Crew  # noqa: E402
+from crew_scheduler import assign_crew  # noqa: E402
+from pricing import get_engine  # noqa: E402
+from utils import (  # noqa: E402
+    CostCalculator, MessageFormatter, PDFGenerator, PersianDateUtils, ValidationUtils
+)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baselines' / 'utils.json'
+
+WEDDING_DETAILS = {
+    'service_type': 'wedding',
+    'name': 'علی',
+    'family_name': 'محمدی',
+    'phone': '09123456789',
+    'bride_name': 'مریم',
+    'guest_count': 250,
+    'event_date': '۱۴۰۴/۰۵/۱۵',
+    'event_time': '18:30',
+    'location': 'تهران، تالار بهار',
+    'duration': '6 ساعت',
+    'cameras': 4,
+    'camera_quality': '4K',
+    'helishot': True,
+    'photographers': 3,
+    'discount_percent': 10,
+}
+
+RESERVATION = {
+    'reservation_code': 'K7M3QX',
+    'service_type': 'wedding',
+    'customer_name': 'علی محمدی',
+    'event_date': '1404/05/15',
+    'delivery_date': '2026-12-01',
+    'booking_status': 'confirmed',
+    'payment_status': 'partial',
+}
+
+
+def build_season(count: int = 1500) -> list:
+    """رزروهای مصنوعی یک فصل: چند مراسم متداخل در هر روز"""
+    base = 739000 * 1440
+    return [
+        Booking(f'S{i:05d}', base + (i // 8) * 1440 + 600 + (i % 8) * 90,
+                base + (i // 8) * 1440 + 600 + (i % 8) * 90 + 240,
+                Crew(1 + i % 2, 1 + i % 3, int(i % 5 == 0)), 'confirmed')
+        for i in range(count)
+    ]
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """موارد سنجش: نام ← تابع بدون آرگومان"""
+    breakdown = CostCalculator.calculate_service_cost('wedding', WEDDING_DETAILS)
+    pdf_generator = PDFGenerator()
+    engine = get_engine()
+    season = build_season()
+    stored = [('wedding', WEDDING_DETAILS), ('birthday', {'cameras': 3}), ('engagement', {})] * 334
+    # پیکربندی‌های یکتا: محاسبه تکراری‌ها در quote_many کمکی نمی‌کند
+    custom = [('other', {'custom_cost': 1_000_000 + i, 'cameras': i % 6}) for i in range(1000)]
+
+    return {
+        'persian_to_english_digits': lambda: PersianDateUtils.persian_to_english_digits('۱۴۰۴/۰۵/۱۵ ساعت ۱۸:۳۰'),
+        'english_to_persian_digits': lambda: PersianDateUtils.english_to_persian_digits('1404/05/15 - 12,500,000'),
+        'validate_phone': lambda: ValidationUtils.validate_phone('0912 345 6789'),
+        'validate_email': lambda: ValidationUtils.validate_email('user.name@example.com'),
+        'validate_date': lambda: ValidationUtils.validate_date('۱۴۰۴/۰۵/۱۵'),
+        'validate_time': lambda: ValidationUtils.validate_time('۶ عصر'),
+        'validate_persian_text': lambda: ValidationUtils.validate_persian_text('علی محمدی', 2, 50),
+        'calculate_service_cost': lambda: CostCalculator.calculate_service_cost('wedding', WEDDING_DETAILS),
+        'quote_many_1000': lambda: engine.quote_many(stored),
+        'quote_many_1000_totals': lambda: engine.quote_many(stored, totals_only=True),
+        'quote_many_1000_unique': lambda: engine.quote_many(custom),
+        'quote_many_1000_unique_totals': lambda: engine.quote_many(custom, totals_only=True),
+        'assign_crew_season_1500': lambda: assign_crew(season, Crew(6, 10, 1), 60),
+        'format_currency': lambda: CostCalculator.format_currency(12_500_000),
+        'format_reservation_summary': lambda: MessageFormatter.format_reservation_summary(RESERVATION),
+        'format_cost_breakdown': lambda: MessageFormatter.format_cost_breakdown(breakdown),
+        'generate_invoice_pdf': lambda: pdf_generator.generate_invoice_pdf(RESERVATION, breakdown),
+    }
+
+
+def measure(func: Callable, repeat: int, min_time: float) -> dict:
+    """
+    اندازه‌گیری یک مورد
+
+    Returns:
+        زمان هر فراخوانی به میکروثانیه (بهترین و میانه تکرارها)
+    """
+    timer = timeit.Timer(func)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+
+    per_call = [total / loops * 1e6 for total in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        'loops': loops,
+        'best_us': min(per_call),
+        'median_us': statistics.median(per_call),
+    }
+
+
+def run_suite(only=(), repeat: int = 5, min_time: float = 0.2, verbose: bool = True) -> dict:
+    cases = build_cases()
+    results = {}
+    for name, func in cases.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = measure(func, repeat, min_time)
+        if verbose:
+            stats = results[name]
+            print(f"{name:<30} best={stats['best_us']:>12.2f}µs  median={stats['median_us']:>12.2f}µs  "
+                  f"loops={stats['loops']}", file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    مقایسه با baseline (بر اساس بهترین زمان)
+
+    Returns:
+        لیست (نام، زمان baseline، زمان فعلی، درصد تغییر، کندشدگی بیش از آستانه)
+    """
+    rows = []
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            continue
+        change = (stats['best_us'] / base['best_us'] - 1) * 100
+        rows.append((name, base['best_us'], stats['best_us'], change, change > threshold))
+    return rows
+
+
+def _write_json(data: dict, path: str):
+    if path == '-':
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='سنجش کارایی توابع پرکاربرد utils.py')
+    parser.add_argument('command', choices=('run', 'baseline', 'compare'),
+                        help='run: فقط اجرا | baseline: ذخیره baseline | compare: مقایسه با baseline')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='مسیر فایل baseline')
+    parser.add_argument('--threshold', type=float, default=10.0, help='حداکثر کندشدگی مجاز (درصد)')
+    parser.add_argument('--repeat', type=int, default=5, help='تعداد تکرار هر مورد')
+    parser.add_argument('--min-time', type=float, default=0.2, help='حداقل زمان هر تکرار (ثانیه)')
+    parser.add_argument('--only', nargs='*', default=[], help='فقط مواردی که شامل این نام‌ها هستند')
+    parser.add_argument('--json', metavar='PATH', help='ذخیره نتیجه اجرا به صورت JSON (- برای stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    current = run_suite(args.only, args.repeat, args.min_time)
+
+    if args.json:
+        _write_json(current, args.json)
+
+    if args.command == 'baseline':
+        _write_json(current, args.baseline)
+        print(f"💾 baseline ذخیره شد: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if args.command == 'compare':
+        try:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ baseline یافت نشد: {args.baseline} (ابتدا دستور baseline را اجرا کنید)", file=sys.stderr)
+            return 2
+
+        rows = compare(current, baseline, args.threshold)
+        print(f"\n{'case':<30}{'baseline µs':>14}{'current µs':>14}{'change':>10}", file=sys.stderr)
+        for name, base, now, change, regressed in rows:
+            marker = '  ❌' if regressed else ''
+            print(f"{name:<30}{base:>14.2f}{now:>14.2f}{change:>+9.1f}%{marker}", file=sys.stderr)
+
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\n❌ کندشدگی بیش از {args.threshold:g}%: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print(f"\n✅ هیچ مسیری بیش از {args.threshold:g}% کندتر نشده است", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
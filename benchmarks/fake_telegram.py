@@ -0,0 +1,341 @@
+"""
+🧪 سرور جعلی Bot API تلگرام
+Local fake Telegram Bot API server for load testing
+
+این سرور متدهای اصلی Bot API را شبیه‌سازی می‌کند تا بتوان ربات را بدون اتصال به
+تلگرام زیر بار برد. update های کاربران شبیه‌سازی شده از طریق getUpdates تحویل
+ربات شده و پیام‌های ارسالی ربات به صندوق هر چت تحویل داده می‌شوند.
+
+تأخیر شبکه و خطای 429 (Too Many Requests) قابل تنظیم است.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# متدهایی که تأخیر و خطای 429 روی آنها اعمال می‌شود
+THROTTLED_METHODS = ('sendMessage', 'editMessageText', 'editMessageReplyMarkup', 'answerCallbackQuery', 'sendDocument')
+
+BOT_USER = {
+    'id': 1000,
+    'is_bot': True,
+    'first_name': 'Mandani Test Bot',
+    'username': 'mandani_test_bot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+
+@dataclass
+class BotCall:
+    """یک پیام ارسالی یا ویرایش شده توسط ربات"""
+    method: str
+    chat_id: int
+    message_id: int
+    text: str = ''
+    reply_markup: Optional[dict] = None
+    received_at: float = field(default_factory=time.perf_counter)
+
+
+class FakeBotAPI:
+    """شبیه‌ساز Bot API با تأخیر و خطای 429 قابل تنظیم"""
+
+    def __init__(self, token: str = '1000:TEST_TOKEN', latency: float = 0.0,
+                 jitter: float = 0.0, rate_limit_ratio: float = 0.0, retry_after: int = 1):
+        """
+        Args:
+            token: توکن ربات (بخشی از مسیر درخواست‌ها)
+            latency: تأخیر پایه هر درخواست ارسالی ربات (ثانیه)
+            jitter: حداکثر تأخیر تصادفی اضافه (ثانیه)
+            rate_limit_ratio: احتمال پاسخ 429 به درخواست‌های ارسالی (۰ تا ۱)
+            retry_after: مقدار retry_after در پاسخ‌های 429
+        """
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+
+        self._updates: List[dict] = []
+        # تعداد update های ابتدای صف که در پاسخ قبلی getUpdates تحویل داده شده‌اند
+        self._delivered = 0
+        self._new_update = asyncio.Event()
+        self._next_update_id = 1
+        self._next_message_id: Dict[int, int] = {}
+        self._inboxes: Dict[int, asyncio.Queue] = {}
+
+        # آخرین پیام ربات در هر چت (برای ساخت callback_query روی دکمه‌های آن)
+        self.last_message: Dict[int, dict] = {}
+
+        self.polling_started = asyncio.Event()
+        self.last_call_at = time.perf_counter()
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.runner = None
+
+    # ========================================
+    # سرور HTTP
+    # ========================================
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_post('/bot{token}/{method}', self.handle_method)
+        app.router.add_get('/bot{token}/{method}', self.handle_method)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081):
+        """شروع سرور روی event loop جاری"""
+        self.runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        if request.match_info['token'] != self.token:
+            return self._error(401, 'Unauthorized')
+
+        params = await self._read_params(request)
+        self.calls[method] += 1
+
+        if method in THROTTLED_METHODS:
+            self.last_call_at = time.perf_counter()
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+            if self.rate_limit_ratio and random.random() < self.rate_limit_ratio:
+                self.rate_limited[method] += 1
+                return self._error(
+                    429, f'Too Many Requests: retry after {self.retry_after}',
+                    parameters={'retry_after': self.retry_after}
+                )
+
+        handler = getattr(self, f'api_{method}', None)
+        if handler is None:
+            # متدهای جانبی (deleteWebhook، setMyCommands و ...) فقط تأیید می‌شوند
+            return self._ok(True)
+        return self._ok(await handler(params))
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict:
+        """خواندن پارامترها (form، multipart یا JSON)"""
+        if request.content_type == 'application/json':
+            return await request.json()
+
+        params = {}
+        for key, value in (await request.post()).items():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value) if key in ('reply_markup', 'allowed_updates') else value
+                except ValueError:
+                    pass
+            params[key] = value
+        return params
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({'ok': True, 'result': result})
+
+    @staticmethod
+    def _error(code: int, description: str, parameters: dict = None) -> web.Response:
+        payload = {'ok': False, 'error_code': code, 'description': description}
+        if parameters:
+            payload['parameters'] = parameters
+        return web.json_response(payload, status=code)
+
+    # ========================================
+    # متدهای Bot API
+    # ========================================
+
+    async def api_getMe(self, params: dict):
+        return BOT_USER
+
+    async def api_getUpdates(self, params: dict):
+        self.polling_started.set()
+
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        # هر فراخوانی جدید، تحویل پاسخ قبلی را تأیید می‌کند. حذف بر اساس ترتیب است نه offset،
+        # تا update های تکراری با شناسه قدیمی (بازپخش ارسال مجدد تلگرام) هم به ربات برسند.
+        del self._updates[:self._delivered]
+        self._delivered = 0
+
+        if not self._updates and timeout:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        batch = self._updates[:limit]
+        self._delivered = len(batch)
+        return batch
+
+    async def api_sendMessage(self, params: dict):
+        chat_id = int(params['chat_id'])
+        message = self._bot_message(chat_id, self._new_message_id(chat_id), params)
+        self._deliver('sendMessage', message, params)
+        return message
+
+    async def api_editMessageText(self, params: dict):
+        if 'inline_message_id' in params:
+            return True
+        chat_id = int(params['chat_id'])
+        message = self._bot_message(chat_id, int(params['message_id']), params)
+        message['edit_date'] = int(time.time())
+        self._deliver('editMessageText', message, params)
+        return message
+
+    async def api_editMessageReplyMarkup(self, params: dict):
+        if 'inline_message_id' in params:
+            return True
+        chat_id = int(params['chat_id'])
+        previous = self.last_message.get(chat_id, {})
+        message = self._bot_message(chat_id, int(params['message_id']), {
+            'text': previous.get('text', ''),
+            'reply_markup': params.get('reply_markup'),
+        })
+        message['edit_date'] = int(time.time())
+        self._deliver('editMessageReplyMarkup', message, params)
+        return message
+
+    async def api_answerCallbackQuery(self, params: dict):
+        return True
+
+    async def api_sendDocument(self, params: dict):
+        chat_id = int(params['chat_id'])
+        document = params.get('document')
+        message = self._bot_message(chat_id, self._new_message_id(chat_id), {
+            'text': params.get('caption', ''),
+            'reply_markup': params.get('reply_markup'),
+        })
+        message.pop('text')
+        message['caption'] = params.get('caption', '')
+        message['document'] = {
+            'file_id': f'doc_{message["message_id"]}',
+            'file_unique_id': f'doc_{message["message_id"]}',
+            'file_name': getattr(document, 'filename', None) or 'document',
+        }
+        self._deliver('sendDocument', message, params)
+        return message
+
+    # ========================================
+    # پیام‌های ربات
+    # ========================================
+
+    def _new_message_id(self, chat_id: int) -> int:
+        message_id = self._next_message_id.get(chat_id, 1)
+        self._next_message_id[chat_id] = message_id + 1
+        return message_id
+
+    @staticmethod
+    def _bot_message(chat_id: int, message_id: int, params: dict) -> dict:
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+        # مانند تلگرام فقط کیبورد inline در پیام برگردانده می‌شود (نه کیبورد معمولی)
+        if params.get('reply_markup') and 'inline_keyboard' in params['reply_markup']:
+            message['reply_markup'] = params['reply_markup']
+        return message
+
+    def _deliver(self, method: str, message: dict, params: dict):
+        chat_id = message['chat']['id']
+        self.last_message[chat_id] = message
+
+        inbox = self._inboxes.get(chat_id)
+        if inbox is not None:
+            inbox.put_nowait(BotCall(
+                method, chat_id, message['message_id'],
+                message.get('text') or message.get('caption') or '',
+                message.get('reply_markup')
+            ))
+
+    def inbox(self, chat_id: int) -> asyncio.Queue:
+        """صندوق پیام‌های ربات برای یک چت"""
+        if chat_id not in self._inboxes:
+            self._inboxes[chat_id] = asyncio.Queue()
+        return self._inboxes[chat_id]
+
+    # ========================================
+    # update های کاربران
+    # ========================================
+
+    @property
+    def pending_updates(self) -> int:
+        """update هایی که هنوز توسط ربات تأیید نشده‌اند"""
+        return len(self._updates)
+
+    def _push(self, update: dict, update_id: int = None) -> int:
+        if update_id is None:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+        update['update_id'] = update_id
+        self._updates.append(update)
+        self._new_update.set()
+        return update_id
+
+    def push_update(self, update: dict) -> int:
+        """ارسال یک update ضبط شده با شناسه جدید (کلیدهای update_id آن جایگزین می‌شوند)"""
+        return self._push(dict(update))
+
+    def push_duplicate(self, update: dict, update_id: int) -> int:
+        """ارسال مجدد یک update با همان شناسه (مثل ارسال دوباره توسط تلگرام)"""
+        return self._push(dict(update), update_id)
+
+    @staticmethod
+    def _user(user_id: int, first_name: str) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': first_name, 'language_code': 'fa'}
+
+    def push_message(self, user_id: int, text: str, first_name: str = 'کاربر') -> int:
+        """ارسال پیام متنی از طرف کاربر"""
+        message = {
+            'message_id': self._new_message_id(user_id),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': first_name},
+            'from': self._user(user_id, first_name),
+            'text': text,
+        }
+        if text.startswith('/'):
+            command = text.split()[0]
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        return self._push({'message': message})
+
+    def push_web_app_data(self, user_id: int, data: str, first_name: str = 'کاربر',
+                          button_text: str = '📝 فرم رزرو') -> int:
+        """ارسال فرم Mini App (Telegram.WebApp.sendData) از طرف کاربر"""
+        return self._push({'message': {
+            'message_id': self._new_message_id(user_id),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': first_name},
+            'from': self._user(user_id, first_name),
+            'web_app_data': {'data': data, 'button_text': button_text},
+        }})
+
+    def push_callback(self, user_id: int, data: str, first_name: str = 'کاربر') -> int:
+        """زدن دکمه inline روی آخرین پیام ربات در چت کاربر"""
+        message = self.last_message.get(user_id) or self._bot_message(user_id, 0, {})
+        return self._push({'callback_query': {
+            'id': f'{user_id}_{self._next_update_id}',
+            'from': self._user(user_id, first_name),
+            'chat_instance': str(user_id),
+            'message': message,
+            'data': data,
+        }})
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+🏋️ تست بار انتها به انتها ربات استودیو ماندنی
+End-to-end load test for Mandani Studio Bot
+
+ربات (main.py) در یک پردازه جداگانه با TELEGRAM_API_BASE_URL به سمت سرور جعلی
+Bot API اجرا می‌شود و N کاربر شبیه‌سازی شده کل مسیر رزرو (نام ← تلفن ← نوع خدمت
+← تاریخ ← ... ← تایید) را طی می‌کنند. زمان هر مرحله از ارسال update تا دریافت
+پاسخ ربات در همان چت اندازه‌گیری می‌شود.
+
+مثال:
+    python -m benchmarks.loadtest --users 200 --concurrency 50 --latency 0.05
+    python -m benchmarks.loadtest --users 100 --rate-limit 0.02 --json result.json
+    python -m benchmarks.loadtest --users 200 --webapp    # رزرو یکجا با فرم Mini App
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.fake_telegram import FakeBotAPI
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+FIRST_NAMES = ['علی', 'مریم', 'رضا', 'زهرا', 'حسین', 'فاطمه', 'محمد', 'سارا', 'امیر', 'نگار']
+LAST_NAMES = ['محمدی', 'احمدی', 'رضایی', 'کریمی', 'حسینی', 'موسوی', 'جعفری', 'صادقی']
+LOCATIONS = ['تهران، تالار بهار', 'کرج، باغ تالار ارغوان', 'تهران، هتل آزادی', 'شیراز، باغ ارم']
+
+# پاسخ‌هایی که با این نشانه‌ها شروع شوند خطا محسوب می‌شوند
+ERROR_MARKERS = ('❌', '⚠️')
+
+RESERVATION_CODE = re.compile(r'کد رزرو شما: `(\w+)`')
+
+
+def booking_flow(index: int) -> List[tuple]:
+    """مراحل مسیر رزرو عروسی: (نام مرحله، نوع update، محتوا)"""
+    first_name = random.choice(FIRST_NAMES)
+    # انتخاب روز از تقویم دکمه‌ای (ordinal میلادی یک روز آینده در ماه جاری یا بعدی)
+    event_day = datetime.date.today() + datetime.timedelta(days=random.randint(1, 25))
+    return [
+        ('start', 'message', '/start'),
+        ('new_reservation', 'callback', 'new_reservation'),
+        ('name', 'message', first_name),
+        ('family_name', 'message', random.choice(LAST_NAMES)),
+        ('phone', 'message', f'09{random.randint(0, 999999999):09d}'),
+        ('email', 'message', f'user{index}@example.com'),
+        ('service_type', 'callback', 'service_wedding'),
+        ('bride_name', 'message', random.choice(FIRST_NAMES)),
+        ('guest_count', 'message', str(random.randint(50, 400))),
+        ('event_date', 'callback', f'dp:d:{event_day.toordinal()}'),
+        ('event_time', 'message', f'{random.randint(10, 21)}:{random.choice(["00", "30"])}'),
+        ('location', 'message', random.choice(LOCATIONS)),
+        ('duration', 'callback', f'duration_{random.randint(2, 6)}'),
+        ('special_requests', 'callback', 'skip_special_requests'),
+        ('cameras', 'callback', f'cameras_{random.randint(1, 5)}'),
+        ('camera_quality', 'callback', random.choice(['quality_4K', 'quality_fullhd', 'quality_hd'])),
+        ('helishot', 'callback', random.choice(['helishot_yes', 'helishot_no'])),
+        ('photographers', 'callback', f'photographers_{random.randint(1, 4)}'),
+        ('confirm', 'callback', 'confirm_reservation'),
+    ]
+
+
+def webapp_flow(index: int, user_id: int, first_name: str, token: str) -> List[tuple]:
+    """مسیر رزرو با فرم Mini App: همه فیلدها در یک update web_app_data با initData امضا شده"""
+    from webapp import sign_init_data
+
+    event_day = datetime.date.today() + datetime.timedelta(days=random.randint(1, 25))
+    init_data = sign_init_data({
+        'auth_date': str(int(time.time())),
+        'user': json.dumps({'id': user_id, 'first_name': first_name}, ensure_ascii=False),
+    }, token)
+    booking = {
+        'name': first_name,
+        'family_name': random.choice(LAST_NAMES),
+        'phone': f'09{random.randint(0, 999999999):09d}',
+        'email': f'user{index}@example.com',
+        'service_type': 'wedding',
+        'bride_name': random.choice(FIRST_NAMES),
+        'guest_count': random.randint(50, 400),
+        'event_date': event_day.isoformat(),
+        'event_time': f'{random.randint(10, 21)}:{random.choice(["00", "30"])}',
+        'location': random.choice(LOCATIONS),
+        'duration': str(random.randint(2, 6)),
+        'special_requests': '',
+        'cameras': random.randint(1, 5),
+        'camera_quality': random.choice(['4K', 'fullhd', 'hd']),
+        'helishot': random.choice([True, False]),
+        'photographers': random.randint(1, 4),
+    }
+    return [
+        ('start', 'message', '/start'),
+        ('book', 'message', '/book'),
+        ('webapp', 'web_app_data', json.dumps({'init_data': init_data, 'booking': booking}, ensure_ascii=False)),
+    ]
+
+
+class LoadTestResult:
+    """جمع‌آوری زمان‌ها و خطاهای هر مرحله"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.attempts: Dict[str, int] = defaultdict(int)
+        self.steps: List[str] = []
+        self.completed = 0
+        self.failed = 0
+        self.updates_sent = 0
+        self.duration = 0.0
+        self.reservation_codes: List[str] = []
+
+    def add(self, step: str, elapsed: Optional[float], ok: bool):
+        if step not in self.steps:
+            self.steps.append(step)
+        self.attempts[step] += 1
+        if elapsed is not None:
+            self.latencies[step].append(elapsed)
+        if not ok:
+            self.errors[step] += 1
+
+    @staticmethod
+    def percentile(values: List[float], percent: float) -> float:
+        """صدک به روش nearest-rank"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def summary(self) -> dict:
+        steps = {}
+        for step in self.steps:
+            values = self.latencies[step]
+            steps[step] = {
+                'count': self.attempts[step],
+                'errors': self.errors[step],
+                'error_rate': self.errors[step] / self.attempts[step],
+                'p50_ms': self.percentile(values, 50) * 1000,
+                'p95_ms': self.percentile(values, 95) * 1000,
+                'p99_ms': self.percentile(values, 99) * 1000,
+                'max_ms': max(values, default=0.0) * 1000,
+            }
+        sessions = self.completed + self.failed
+        return {
+            'sessions': sessions,
+            'completed': self.completed,
+            'failed': self.failed,
+            'session_error_rate': self.failed / max(1, sessions),
+            'duration_s': self.duration,
+            'sessions_per_s': self.completed / self.duration if self.duration else 0.0,
+            'updates_per_s': self.updates_sent / self.duration if self.duration else 0.0,
+            'steps': steps,
+        }
+
+    def format_report(self, api: FakeBotAPI) -> str:
+        data = self.summary()
+        lines = [
+            f"📊 جلسات: {data['sessions']} | موفق: {data['completed']} | ناموفق: {data['failed']} "
+            f"({data['session_error_rate']:.1%})",
+            f"⏱️ مدت: {data['duration_s']:.2f}s | رزرو/ثانیه: {data['sessions_per_s']:.2f} | "
+            f"update/ثانیه: {data['updates_per_s']:.1f}",
+            '',
+            f"{'step':<18}{'count':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+        ]
+        for step, stats in data['steps'].items():
+            lines.append(
+                f"{step:<18}{stats['count']:>7}{stats['errors']:>6}{stats['p50_ms']:>10.1f}"
+                f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+            )
+        lines.append('')
+        lines.append('🌐 فراخوانی‌های API: ' + ', '.join(f'{k}={v}' for k, v in sorted(api.calls.items())))
+        if api.rate_limited:
+            lines.append('🚦 پاسخ‌های 429: ' + ', '.join(f'{k}={v}' for k, v in sorted(api.rate_limited.items())))
+        return '\n'.join(lines)
+
+
+async def run_user(api: FakeBotAPI, user_id: int, index: int, result: LoadTestResult,
+                   step_timeout: float, think_time: float, webapp: bool = False):
+    """اجرای کامل مسیر رزرو برای یک کاربر"""
+    inbox = api.inbox(user_id)
+    first_name = random.choice(FIRST_NAMES)
+    flow = webapp_flow(index, user_id, first_name, api.token) if webapp else booking_flow(index)
+
+    for step, kind, payload in flow:
+        # پیام‌های دیررس مرحله قبل نباید به حساب این مرحله گذاشته شوند
+        while not inbox.empty():
+            inbox.get_nowait()
+
+        start = time.perf_counter()
+        if kind == 'message':
+            api.push_message(user_id, payload, first_name)
+        elif kind == 'web_app_data':
+            api.push_web_app_data(user_id, payload, first_name)
+        else:
+            api.push_callback(user_id, payload, first_name)
+        result.updates_sent += 1
+
+        try:
+            reply = await asyncio.wait_for(inbox.get(), step_timeout)
+        except asyncio.TimeoutError:
+            result.add(step, None, ok=False)
+            result.failed += 1
+            return
+
+        elapsed = reply.received_at - start
+        ok = not reply.text.lstrip().startswith(ERROR_MARKERS)
+        result.add(step, elapsed, ok)
+        if not ok:
+            result.failed += 1
+            return
+
+        if step in ('confirm', 'webapp'):
+            match = RESERVATION_CODE.search(reply.text)
+            if match:
+                result.reservation_codes.append(match.group(1))
+
+        if think_time:
+            await asyncio.sleep(random.uniform(0, think_time))
+
+    result.completed += 1
+
+
+def start_bot_process(api_url: str, token: str, workdir: str, log_file, database_path: str = None,
+                      webapp: bool = False):
+    """اجرای main.py در حالت polling با Bot API جعلی"""
+    env = dict(os.environ)
+    env.update({
+        'BOT_TOKEN': token,
+        'MAIN_ADMIN_ID': env.get('MAIN_ADMIN_ID', '1'),
+        'TELEGRAM_API_BASE_URL': api_url,
+        'DATABASE_PATH': database_path or os.path.join(workdir, 'loadtest.db'),
+        'ENVIRONMENT': 'development',
+        'DROP_PENDING_UPDATES': 'false',
+        'METRICS_PORT': env.get('METRICS_PORT', '0'),
+        'TRAFFIC_RECORD': 'false',
+        # ظرفیت استودیو نامحدود تا تاریخ‌های تصادفی تکراری مسیر رزرو را قطع نکنند
+        'STUDIO_PHOTOGRAPHERS': env.get('STUDIO_PHOTOGRAPHERS', '1000000'),
+        'STUDIO_CAMERAS': env.get('STUDIO_CAMERAS', '1000000'),
+        'STUDIO_DRONES': env.get('STUDIO_DRONES', '1000000'),
+    })
+    if webapp:
+        # آدرس فرم فقط در دکمه /book قرار می‌گیرد؛ فرم واقعاً باز نمی‌شود
+        env.setdefault('WEBAPP_URL', 'https://example.com/webapp/')
+    return asyncio.create_subprocess_exec(
+        sys.executable, str(PROJECT_DIR / 'main.py'),
+        cwd=workdir, env=env, stdout=log_file, stderr=asyncio.subprocess.STDOUT
+    )
+
+
+async def run_load_test(args) -> LoadTestResult:
+    api = FakeBotAPI(
+        latency=args.latency, jitter=args.jitter,
+        rate_limit_ratio=args.rate_limit, retry_after=args.retry_after
+    )
+    await api.start(args.host, args.port)
+    api_url = f'http://{args.host}:{args.port}/bot'
+
+    process = None
+    workdir = tempfile.mkdtemp(prefix='mandani_loadtest_')
+    log_path = os.path.join(workdir, 'bot.log')
+    log_file = open(log_path, 'wb')
+    result = LoadTestResult()
+
+    try:
+        if args.no_spawn:
+            print(f"⏳ منتظر اتصال ربات با TELEGRAM_API_BASE_URL={api_url} و BOT_TOKEN={api.token}")
+        else:
+            process = await start_bot_process(api_url, api.token, workdir, log_file, webapp=args.webapp)
+            print(f"🤖 ربات اجرا شد (pid={process.pid}, لاگ: {log_path})")
+
+        try:
+            await asyncio.wait_for(api.polling_started.wait(), args.startup_timeout)
+        except asyncio.TimeoutError:
+            raise SystemExit(f"❌ ربات در {args.startup_timeout} ثانیه شروع به polling نکرد (لاگ: {log_path})")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(index: int):
+            async with semaphore:
+                await run_user(api, args.first_user_id + index, index, result,
+                               args.step_timeout, args.think_time, args.webapp)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited(i) for i in range(args.users)))
+        result.duration = time.perf_counter() - started
+    finally:
+        if process and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+        log_file.close()
+        await api.stop()
+
+    print(result.format_report(api))
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='تست بار انتها به انتها ربات با Bot API جعلی')
+    parser.add_argument('--users', type=int, default=50, help='تعداد کاربران شبیه‌سازی شده')
+    parser.add_argument('--concurrency', type=int, default=10, help='حداکثر کاربران همزمان')
+    parser.add_argument('--latency', type=float, default=0.0, help='تأخیر پایه Bot API (ثانیه)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='تأخیر تصادفی اضافه (ثانیه)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='احتمال پاسخ 429 (۰ تا ۱)')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after پاسخ‌های 429')
+    parser.add_argument('--step-timeout', type=float, default=15.0, help='حداکثر انتظار برای پاسخ هر مرحله')
+    parser.add_argument('--think-time', type=float, default=0.0, help='حداکثر مکث تصادفی کاربر بین مراحل')
+    parser.add_argument('--startup-timeout', type=float, default=60.0, help='حداکثر انتظار برای شروع ربات')
+    parser.add_argument('--first-user-id', type=int, default=500000, help='شناسه اولین کاربر')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--webapp', action='store_true', help='رزرو با فرم Mini App به جای مسیر گفتگو')
+    parser.add_argument('--no-spawn', action='store_true', help='ربات را اجرا نکن (ربات خارجی)')
+    parser.add_argument('--json', metavar='PATH', help='ذخیره نتیجه به صورت JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = asyncio.run(run_load_test(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result.summary(), f, ensure_ascii=False, indent=2)
+    return 1 if result.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
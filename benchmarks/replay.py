@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+⏯️ بازپخش ترافیک ضبط شده
+Deterministic replay of recorded traffic against the fake Bot API
+
+update های ضبط شده توسط traffic_recorder.py به ترتیب اصلی به ربات (main.py روی
+سرور جعلی Bot API) داده می‌شوند؛ با فاصله‌های زمانی اصلی (قابل تسریع با --speed)
+یا با حداکثر سرعت. update های تکراری ضبط شده با همان شناسه دوباره ارسال می‌شوند.
+
+مثال:
+    python -m benchmarks.replay recordings/ --pacing max
+    python -m benchmarks.replay recordings/updates.ndjson.gz --pacing original --speed 10
+    python -m benchmarks.replay recordings/ --database mandani_studio.db
+    python -m benchmarks.replay recordings/ --no-spawn   # ربات جداگانه اجرا شده (مثلاً زیر profiler)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from benchmarks.fake_telegram import FakeBotAPI  # noqa: E402
+from benchmarks.loadtest import start_bot_process  # noqa: E402
+from traffic_recorder import read_recording, recording_files  # noqa: E402
+from update_dedup import UpdateDeduplicator  # noqa: E402
+
+
+def update_kind(update: dict) -> str:
+    """نوع update (message، callback_query و ...)"""
+    for key in update:
+        if key != 'update_id':
+            return key
+    return 'unknown'
+
+
+async def wait_until_idle(api: FakeBotAPI, idle: float, timeout: float) -> bool:
+    """انتظار تا مصرف همه update ها و توقف فراخوانی‌های ربات به مدت idle ثانیه"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if api.pending_updates == 0 and time.perf_counter() - api.last_call_at >= idle:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def replay(api: FakeBotAPI, records, pacing: str, speed: float) -> Counter:
+    """ارسال update ها به سرور جعلی"""
+    kinds = Counter()
+    id_map = {}
+    first_ts = None
+    started = time.perf_counter()
+
+    for ts, update in records:
+        if pacing == 'original':
+            if first_ts is None:
+                first_ts = ts
+            delay = (ts - first_ts) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        original_id = update.get('update_id')
+        if original_id in id_map:
+            api.push_duplicate(update, id_map[original_id])
+            kinds['duplicate'] += 1
+        else:
+            id_map[original_id] = api.push_update(update)
+        kinds[update_kind(update)] += 1
+
+        # در حالت max هم گاهی کنترل به event loop داده می‌شود تا سرور جعلی پاسخ دهد
+        if pacing == 'max' and sum(kinds.values()) % 100 == 0:
+            await asyncio.sleep(0)
+
+    return kinds
+
+
+def prepare_database(source: str, target: str):
+    """
+    کپی پایگاه داده اولیه برای بازپخش
+
+    کپی با API پشتیبان‌گیری SQLite انجام می‌شود تا commit های هنوز در فایل -wal (حالت WAL
+    پروفایل balanced) هم در کپی باشند و کپی از پایگاه داده در حال استفاده سازگار بماند.
+
+    سرور جعلی شناسه update ها را از ۱ شماره‌گذاری می‌کند؛ high-water mark ذخیره شده
+    UpdateDeduplicator حذف می‌شود تا update های بازپخش تکراری شمرده نشوند.
+    """
+    # mode=ro: نبود فایل مبدأ خطا است و فایل خالی ساخته نمی‌شود
+    source_conn = sqlite3.connect(Path(source).resolve().as_uri() + '?mode=ro', uri=True)
+    conn = sqlite3.connect(target)
+    try:
+        source_conn.backup(conn)
+        conn.execute('DELETE FROM bot_state WHERE key = ?', (UpdateDeduplicator.STATE_KEY,))
+        conn.commit()
+    finally:
+        conn.close()
+        source_conn.close()
+
+
+async def run_replay(args) -> dict:
+    if args.database and args.no_spawn:
+        raise SystemExit("❌ --database فقط برای ربات اجرا شده توسط replay است؛ با --no-spawn ربات خارجی کپی را نمی‌بیند")
+    files = []
+    for path in args.recordings:
+        files.extend(recording_files(path))
+    if not files:
+        raise SystemExit("❌ فایل ضبطی یافت نشد")
+    records = list(read_recording(files))
+
+    api = FakeBotAPI(latency=args.latency, jitter=args.jitter, rate_limit_ratio=args.rate_limit)
+    await api.start(args.host, args.port)
+    api_url = f'http://{args.host}:{args.port}/bot'
+
+    workdir = tempfile.mkdtemp(prefix='mandani_replay_')
+    database_path = os.path.join(workdir, 'replay.db')
+    if args.database:
+        # ربات روی کپی پایگاه داده اجرا می‌شود تا فایل اصلی تغییر نکند
+        prepare_database(args.database, database_path)
+
+    log_path = os.path.join(workdir, 'bot.log')
+    log_file = open(log_path, 'wb')
+    process = None
+
+    try:
+        if args.no_spawn:
+            print(f"⏳ منتظر اتصال ربات با TELEGRAM_API_BASE_URL={api_url} و BOT_TOKEN={api.token}")
+        else:
+            process = await start_bot_process(api_url, api.token, workdir, log_file, database_path)
+            print(f"🤖 ربات اجرا شد (pid={process.pid}, لاگ: {log_path})")
+
+        try:
+            await asyncio.wait_for(api.polling_started.wait(), args.startup_timeout)
+        except asyncio.TimeoutError:
+            raise SystemExit(f"❌ ربات در {args.startup_timeout} ثانیه شروع به polling نکرد (لاگ: {log_path})")
+
+        print(f"⏯️ بازپخش {len(records)} update از {len(files)} فایل (pacing={args.pacing})")
+        started = time.perf_counter()
+        kinds = await replay(api, records, args.pacing, args.speed)
+        fed = time.perf_counter() - started
+
+        drained = await wait_until_idle(api, args.idle, args.drain_timeout)
+        # اگر ربات پس از شروع بازپخش هیچ فراخوانی نداشته باشد، زمان سپری شده ملاک است
+        if drained and api.last_call_at > started:
+            duration = api.last_call_at - started
+        else:
+            duration = time.perf_counter() - started
+    finally:
+        if process and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+        log_file.close()
+        await api.stop()
+
+    return {
+        'updates': len(records),
+        'files': [str(path) for path in files],
+        'pacing': args.pacing,
+        'speed': args.speed,
+        'update_kinds': dict(kinds),
+        'feed_seconds': fed,
+        'duration_seconds': duration,
+        'drained': drained,
+        'updates_per_s': len(records) / duration if duration else 0.0,
+        'api_calls': dict(api.calls),
+        'rate_limited': dict(api.rate_limited),
+        'bot_log': log_path,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='بازپخش ترافیک ضبط شده روی سرور جعلی Bot API')
+    parser.add_argument('recordings', nargs='+', help='فایل‌ها یا پوشه‌های ضبط')
+    parser.add_argument('--pacing', choices=('original', 'max'), default='max',
+                        help='original: فاصله‌های زمانی اصلی | max: حداکثر سرعت')
+    parser.add_argument('--speed', type=float, default=1.0, help='ضریب تسریع در حالت original')
+    parser.add_argument('--database', help='پایگاه داده اولیه (یک کپی از آن استفاده می‌شود؛ بدون --no-spawn)')
+    parser.add_argument('--latency', type=float, default=0.0, help='تأخیر پایه Bot API (ثانیه)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='تأخیر تصادفی اضافه (ثانیه)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='احتمال پاسخ 429 (۰ تا ۱)')
+    parser.add_argument('--idle', type=float, default=2.0, help='مدت سکوت ربات برای پایان بازپخش (ثانیه)')
+    parser.add_argument('--drain-timeout', type=float, default=600.0, help='حداکثر انتظار پس از ارسال همه update ها')
+    parser.add_argument('--startup-timeout', type=float, default=60.0, help='حداکثر انتظار برای شروع ربات')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--no-spawn', action='store_true', help='ربات را اجرا نکن (مثلاً ربات زیر profiler)')
+    parser.add_argument('--json', metavar='PATH', help='ذخیره نتیجه به صورت JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = asyncio.run(run_replay(args))
+
+    print(f"✅ {result['updates']} update در {result['duration_seconds']:.2f}s "
+          f"({result['updates_per_s']:.1f} update/ثانیه)"
+          + ('' if result['drained'] else ' ⚠️ ربات در زمان مقرر به سکون نرسید'))
+    print('📨 انواع update: ' + ', '.join(f'{k}={v}' for k, v in sorted(result['update_kinds'].items())))
+    print('🌐 فراخوانی‌های API: ' + ', '.join(f'{k}={v}' for k, v in sorted(result['api_calls'].items())))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if result['drained'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -32,6 +32,11 @@ class Config:
     
     DATABASE_PATH: str = os.getenv('DATABASE_PATH', 'mandani_studio.db')
     AUTO_BACKUP_INTERVAL: int = int(os.getenv('AUTO_BACKUP_INTERVAL', '24'))
+    DB_PROFILE: bool = os.getenv('DB_PROFILE', 'false').lower() == 'true'
+    DB_SLOW_QUERY_MS: float = float(os.getenv('DB_SLOW_QUERY_MS', '50'))
+    DB_CACHE_SIZE: int = int(os.getenv('DB_CACHE_SIZE', '1024'))
+    DB_CACHE_TTL: float = float(os.getenv('DB_CACHE_TTL', '300'))
+    DB_STORAGE_PROFILE: str = os.getenv('DB_STORAGE_PROFILE', 'balanced')
     
     # ========================================
     # 💰 تنظیمات مالی
@@ -40,6 +45,9 @@ class Config:
     DEPOSIT_PERCENTAGE: int = int(os.getenv('DEPOSIT_PERCENTAGE', '50'))
     TAX_RATE: float = float(os.getenv('TAX_RATE', '9')) / 100  # تبدیل به اعشار
     CURRENCY: str = os.getenv('CURRENCY', 'تومان')
+    PRICING_RULES_FILE: str = os.getenv('PRICING_RULES_FILE', 'pricing_rules.json')
+    PRICING_RELOAD_INTERVAL: float = float(os.getenv('PRICING_RELOAD_INTERVAL', '5'))  # ثانیه
+    PRICING_CACHE_SIZE: int = int(os.getenv('PRICING_CACHE_SIZE', '1024'))
     
     # ========================================
     # 🏪 اطلاعات استودیو
@@ -53,6 +61,25 @@ class Config:
     STUDIO_CARD_NUMBER: str = os.getenv('STUDIO_CARD_NUMBER', '1234-5678-9012-3456')
     STUDIO_CARD_HOLDER: str = os.getenv('STUDIO_CARD_HOLDER', 'استودیو ماندنی')
     
+    # ظرفیت همزمان نیرو و تجهیزات (برای جلوگیری از رزرو بیش از ظرفیت)
+    STUDIO_PHOTOGRAPHERS: int = int(os.getenv('STUDIO_PHOTOGRAPHERS', '4'))
+    STUDIO_CAMERAS: int = int(os.getenv('STUDIO_CAMERAS', '8'))
+    STUDIO_DRONES: int = int(os.getenv('STUDIO_DRONES', '1'))
+    BOOKING_BUFFER_MINUTES: int = int(os.getenv('BOOKING_BUFFER_MINUTES', '60'))
+    BOOKING_DEFAULT_HOURS: int = int(os.getenv('BOOKING_DEFAULT_HOURS', '2'))
+    BOOKING_DAY_START_HOUR: int = int(os.getenv('BOOKING_DAY_START_HOUR', '8'))
+    BOOKING_DAY_END_HOUR: int = int(os.getenv('BOOKING_DAY_END_HOUR', '24'))
+    DATE_PICKER_MONTHS_AHEAD: int = int(os.getenv('DATE_PICKER_MONTHS_AHEAD', '12'))
+    BOOKING_WIZARD: bool = os.getenv('BOOKING_WIZARD', 'false').lower() == 'true'
+    WIZARD_DELETE_INPUT: bool = os.getenv('WIZARD_DELETE_INPUT', 'true').lower() == 'true'
+    WIZARD_DELETE_BATCH: int = int(os.getenv('WIZARD_DELETE_BATCH', '100'))
+    WEBAPP_URL: str = os.getenv('WEBAPP_URL', '')
+    WEBAPP_DIR: str = os.getenv('WEBAPP_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webapp')
+    WEBAPP_AUTH_MAX_AGE: int = int(os.getenv('WEBAPP_AUTH_MAX_AGE', '86400'))
+    WEBAPP_CACHE_MAX_AGE: int = int(os.getenv('WEBAPP_CACHE_MAX_AGE', '2592000'))
+    INLINE_PAGE_SIZE: int = int(os.getenv('INLINE_PAGE_SIZE', '20'))
+    INLINE_CACHE_TIME: int = int(os.getenv('INLINE_CACHE_TIME', '10'))
+    
     # ========================================
     # 🔔 تنظیمات یادآوری
     # ========================================
@@ -68,6 +95,7 @@ class Config:
     RATE_LIMIT_GENERAL: int = int(os.getenv('RATE_LIMIT_GENERAL', '10'))
     RATE_LIMIT_SEARCH: int = int(os.getenv('RATE_LIMIT_SEARCH', '5'))
     RATE_LIMIT_BUTTON: int = int(os.getenv('RATE_LIMIT_BUTTON', '30'))
+    IDEMPOTENCY_WINDOW_SECONDS: int = int(os.getenv('IDEMPOTENCY_WINDOW_SECONDS', '300'))
     
     # ========================================
     # 📧 تنظیمات ایمیل
@@ -87,6 +115,13 @@ class Config:
     LOG_FILE: str = os.getenv('LOG_FILE', 'mandani_bot.log')
     LOG_MAX_SIZE: int = int(os.getenv('LOG_MAX_SIZE', '10'))  # مگابایت
     LOG_BACKUP_COUNT: int = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_SAMPLE_RATES: str = os.getenv('LOG_SAMPLE_RATES', '')  # مثلاً DEBUG=0.1,INFO=0.5
+    LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    TRAFFIC_RECORD: bool = os.getenv('TRAFFIC_RECORD', 'false').lower() == 'true'
+    TRAFFIC_RECORD_DIR: str = os.getenv('TRAFFIC_RECORD_DIR', 'recordings')
+    TRAFFIC_RECORD_MAX_SIZE: int = int(os.getenv('TRAFFIC_RECORD_MAX_SIZE', '50'))  # مگابایت
+    TRAFFIC_RECORD_BACKUP_COUNT: int = int(os.getenv('TRAFFIC_RECORD_BACKUP_COUNT', '10'))
+    TRAFFIC_SCRUB: str = os.getenv('TRAFFIC_SCRUB', 'names,phones,emails')
     
     # ========================================
     # 🌍 تنظیمات منطقه زمانی
@@ -103,7 +138,21 @@ class Config:
     ENVIRONMENT: str = os.getenv('ENVIRONMENT', 'development')
     DEBUG: bool = os.getenv('DEBUG', 'false').lower() == 'true'
     WEBHOOK_URL: Optional[str] = os.getenv('WEBHOOK_URL')
+    TELEGRAM_API_BASE_URL: str = os.getenv('TELEGRAM_API_BASE_URL', '')
     WEBHOOK_PORT: int = int(os.getenv('WEBHOOK_PORT', '8443'))
+    WEBHOOK_SECRET_TOKEN: str = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+    DROP_PENDING_UPDATES: bool = os.getenv('DROP_PENDING_UPDATES', 'false').lower() == 'true'
+    UPDATE_DEDUP_WINDOW: int = int(os.getenv('UPDATE_DEDUP_WINDOW', '4096'))
+    UPDATE_DEDUP_PERSIST_EVERY: int = int(os.getenv('UPDATE_DEDUP_PERSIST_EVERY', '64'))
+    METRICS_PORT: int = int(os.getenv('METRICS_PORT', '0'))
+    LOOP_MONITOR: bool = os.getenv('LOOP_MONITOR', 'true').lower() == 'true'
+    LOOP_LAG_THRESHOLD_MS: float = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '100'))
+    LOOP_STALL_BUFFER: int = int(os.getenv('LOOP_STALL_BUFFER', '20'))
+    PROFILE_MAX_SECONDS: int = int(os.getenv('PROFILE_MAX_SECONDS', '60'))
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '10'))
+    PROFILE_MAX_OVERHEAD_PERCENT: float = float(os.getenv('PROFILE_MAX_OVERHEAD_PERCENT', '5'))
+    MEMSNAP_MAX_SECONDS: int = int(os.getenv('MEMSNAP_MAX_SECONDS', '60'))
     
     # ========================================
     # 🔗 تنظیمات API های خارجی
@@ -163,10 +212,6 @@ class Config:
 
 
 # نمونه سینگلتون برای دسترسی آسان
+# اعتبارسنجی در نقطه ورود برنامه (main) انجام می‌شود تا import این ماژول
+# (در ابزارها، worker ها و بنچمارک‌ها) باعث خروج برنامه نشود
 config = Config()
-
-# اعتبارسنجی تنظیمات هنگام import
-if not config.validate():
-    import sys
-    print("⚠️ لطفاً فایل .env را بررسی کنید و تنظیمات ضروری را وارد کنید")
-    sys.exit(1)
@@ -0,0 +1,165 @@
+"""
+👥 ماژول تخصیص نیرو و تجهیزات
+Crew and equipment assignment for concurrent events
+
+هر عکاس، دوربین و پهپاد هلی‌شات یک واحد شماره‌دار است. رزروهای فعال یک بازه به ترتیب
+زمان شروع پیمایش می‌شوند. برای هر نوع منبع دو heap نگهداری می‌شود: واحدهای آزاد (به
+ترتیب شماره) و واحدهای مشغول (به ترتیب زمان آزاد شدن = پایان مراسم + فاصله لازم).
+این همان رنگ‌آمیزی حریصانه گراف بازه‌ای است. در هر لحظه تعداد واحدهای مشغول برابر
+بار همان لحظه است، بنابراین اگر تخصیصی ممکن باشد این روش آن را پیدا می‌کند.
+هزینه کل O(n log n) است و برای رزروهای یک فصل در چند میلی‌ثانیه تمام می‌شود.
+
+مراسمی که در لحظه شروع واحد آزاد کافی ندارد، «قابل تأمین نیست» علامت می‌خورد و
+کمبود آن گزارش می‌شود. چنین مراسمی هیچ واحدی را اشغال نمی‌کند.
+"""
+
+import heapq
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from availability import ACTIVE_STATUSES, AvailabilityIndex, Booking, Crew, MINUTES_PER_DAY, format_minutes
+from utils import PersianDateUtils
+
+logger = logging.getLogger(__name__)
+
+UNIT_LABELS = ('عکاس', 'دوربین', 'پهپاد')
+
+_PERSIAN_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+
+
+class Assignment(NamedTuple):
+    """واحدهای تخصیص یافته به یک مراسم (شماره واحدها از ۱)"""
+    booking: Booking
+    photographers: Tuple[int, ...]
+    cameras: Tuple[int, ...]
+    drones: Tuple[int, ...]
+
+
+class Unfilled(NamedTuple):
+    """مراسمی که با ظرفیت موجود قابل تأمین نیست"""
+    booking: Booking
+    shortage: Crew
+
+
+class CrewSchedule(NamedTuple):
+    """نتیجه تخصیص یک بازه"""
+    assignments: Tuple[Assignment, ...]
+    unfilled: Tuple[Unfilled, ...]
+    peak: Crew
+    elapsed_ms: float
+
+
+class _UnitPool:
+    """واحدهای یک نوع منبع: heap آزادها (شماره) و heap مشغول‌ها (زمان آزاد شدن)"""
+
+    __slots__ = ('free', 'busy', 'peak')
+
+    def __init__(self, size: int):
+        self.free = list(range(1, size + 1))  # لیست صعودی خودش یک heap است
+        self.busy: List[Tuple[int, int]] = []
+        self.peak = 0
+
+    def release(self, now: int):
+        busy, free = self.busy, self.free
+        while busy and busy[0][0] <= now:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+
+    def take(self, count: int, until: int) -> Tuple[int, ...]:
+        units = tuple(heapq.heappop(self.free) for _ in range(count))
+        for unit in units:
+            heapq.heappush(self.busy, (until, unit))
+        self.peak = max(self.peak, len(self.busy))
+        return units
+
+
+def assign_crew(bookings: Iterable[Booking], capacity: Crew, buffer_minutes: int = 0) -> CrewSchedule:
+    """
+    تخصیص واحدهای شماره‌دار به مراسم‌ها
+
+    Args:
+        bookings: مراسم‌ها (ترتیب دلخواه)
+        capacity: تعداد عکاس، دوربین و پهپاد استودیو
+        buffer_minutes: فاصله لازم پیش از استفاده دوباره از یک واحد
+    """
+    started = time.perf_counter()
+    pools = [_UnitPool(size) for size in capacity]
+    assignments, unfilled = [], []
+
+    for booking in sorted(bookings, key=lambda b: (b.start, b.end)):
+        for pool in pools:
+            pool.release(booking.start)
+        available = Crew(*(len(pool.free) for pool in pools))
+        if not booking.crew.fits(available):
+            shortage = Crew(*(max(need - have, 0) for need, have in zip(booking.crew, available)))
+            unfilled.append(Unfilled(booking, shortage))
+            continue
+        until = booking.end + buffer_minutes
+        assignments.append(Assignment(booking, *(pool.take(need, until)
+                                                 for pool, need in zip(pools, booking.crew))))
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return CrewSchedule(tuple(assignments), tuple(unfilled),
+                        Crew(*(pool.peak for pool in pools)), elapsed_ms)
+
+
+def schedule_reservations(reservations: Iterable[Dict], index: AvailabilityIndex) -> CrewSchedule:
+    """تخصیص برای ردیف‌های رزرو (فقط رزروهای فعال با تاریخ معتبر)"""
+    bookings = []
+    for reservation in reservations:
+        if (reservation.get('booking_status') or 'pending') not in ACTIVE_STATUSES:
+            continue
+        booking = index.booking_from_reservation(reservation)
+        if booking:
+            bookings.append(booking)
+    schedule = assign_crew(bookings, index.capacity, index.buffer)
+    logger.info(f"👥 تخصیص نیرو: {len(schedule.assignments)} مراسم، "
+                f"{len(schedule.unfilled)} غیرقابل تأمین ({schedule.elapsed_ms:.1f}ms)")
+    return schedule
+
+
+def _persian(value) -> str:
+    return str(value).translate(_PERSIAN_DIGITS)
+
+
+def _window(booking: Booking) -> str:
+    start = booking.start % MINUTES_PER_DAY
+    end = start + booking.end - booking.start
+    return f"{format_minutes(start)}–{format_minutes(end) if end < MINUTES_PER_DAY else '۲۴:۰۰'}"
+
+
+def _units(label: str, units: Tuple[int, ...]) -> str:
+    return f"{label} {'،'.join(_persian(unit) for unit in units)}" if units else ''
+
+
+def format_schedule(schedule: CrewSchedule, capacity: Crew, limit: int = 40) -> str:
+    """گزارش متنی تخصیص به تفکیک روز (بدون Markdown؛ کد رزروها ممکن است _ داشته باشند)"""
+    lines = [
+        f"👥 تخصیص نیرو و تجهیزات: {_persian(len(schedule.assignments))} مراسم",
+        "📊 بیشترین استفاده همزمان: " + '، '.join(
+            f"{label} {_persian(used)}/{_persian(total)}"
+            for label, used, total in zip(UNIT_LABELS, schedule.peak, capacity)),
+    ]
+
+    if schedule.unfilled:
+        lines += ["", f"⚠️ مراسم غیرقابل تأمین: {_persian(len(schedule.unfilled))}"]
+        for item in schedule.unfilled[:limit]:
+            shortage = '، '.join(f"{_persian(count)} {label}"
+                                for label, count in zip(UNIT_LABELS, item.shortage) if count)
+            lines.append(f"• {PersianDateUtils.format_jalali_date(item.booking.day)} {_window(item.booking)} "
+                         f"{item.booking.code}: کمبود {shortage}")
+
+    current_day = None
+    for assignment in schedule.assignments[:limit]:
+        booking = assignment.booking
+        if booking.day != current_day:
+            current_day = booking.day
+            lines += ["", f"📅 {PersianDateUtils.format_jalali_date(current_day)}"]
+        units = ' | '.join(filter(None, (
+            _units(label, units) for label, units in zip(UNIT_LABELS, assignment[1:]))))
+        lines.append(f"• {_window(booking)} {booking.code}: {units}")
+
+    hidden = len(schedule.assignments) - limit
+    if hidden > 0:
+        lines += ["", f"… و {_persian(hidden)} مراسم دیگر"]
+    return '\n'.join(lines)
@@ -7,33 +7,145 @@ Database module for Mandani Studio Bot
 
 import sqlite3
 import json
+import threading
 import datetime
 from typing import Optional, List, Dict, Any
 import logging
 
+from metrics import instrument_db_methods
+from query_cache import QueryCache
+from utils import PersianDateUtils
 
+# پروفایل‌های ذخیره‌سازی SQLite (DB_STORAGE_PROFILE)
+#   durable     رفتار پیش‌فرض SQLite: rollback journal و دو fsync در هر commit
+#   balanced    WAL (خواننده‌ها و نویسنده یکدیگر را مسدود نمی‌کنند) و fsync فقط در checkpoint؛
+#               با قطع برق ممکن است آخرین تراکنش‌ها از دست بروند ولی فایل خراب نمی‌شود
+#   throughput  بدون fsync؛ فقط برای سنجش و بارگذاری انبوه داده
+# journal_mode در فایل ذخیره شده و یک بار هنگام راه‌اندازی اعمال می‌شود؛ بقیه یک بار برای
+# اتصال ماندگار هر thread (get_connection)، تا page cache و mmap بین کوئری‌ها حفظ شوند.
+# مقایسه: python -m benchmarks.bench_storage
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    'durable': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,            # ۲ مگابایت (پیش‌فرض SQLite)
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,           # ۱۶ مگابایت
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,           # ۶۴ مگابایت
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+}
+
+
+@instrument_db_methods(exclude=('get_connection', 'add_write_listener'))
 class DatabaseManager:
     """مدیر پایگاه داده برای ربات استودیو"""
     
-    def __init__(self, db_path: str = "mandani_studio.db"):
+    # نسخه schema (در PRAGMA user_version ذخیره می‌شود)؛ با هر تغییر جداول افزایش دهید
+    SCHEMA_VERSION = 2
+    
+    def __init__(self, db_path: str = "mandani_studio.db", profiler=None, cache: QueryCache = None,
+                 storage_profile: str = 'balanced'):
         """
         راه‌اندازی پایگاه داده
         
         Args:
             db_path: مسیر فایل پایگاه داده
+            profiler: QueryProfiler اختیاری برای اندازه‌گیری زمان دستورات SQL
+            cache: QueryCache اختیاری برای نتایج رزرو، رزروهای کاربر و جستجو
+            storage_profile: یکی از کلیدهای STORAGE_PROFILES
         """
+        if storage_profile not in STORAGE_PROFILES:
+            raise ValueError(f"پروفایل ذخیره‌سازی نامعتبر: {storage_profile} (مجاز: {', '.join(STORAGE_PROFILES)})")
         self.db_path = db_path
+        self.profiler = profiler
+        self.storage_profile = storage_profile
+        pragmas = STORAGE_PROFILES[storage_profile]
+        # با executescript اجرا می‌شود تا در QueryProfiler به عنوان کوئری ثبت نشود
+        self._connection_pragmas = ''.join(
+            f'PRAGMA {name} = {value};' for name, value in pragmas.items() if name != 'journal_mode'
+        )
+        self.cache = cache if cache is not None else QueryCache(max_entries=0)
+        # یک اتصال ماندگار برای هر thread (اتصال sqlite3 بین thread ها قابل اشتراک نیست)
+        self._local = threading.local()
+        # توابعی که پس از ایجاد یا تغییر وضعیت رزرو فراخوانی می‌شوند: listener(db, reservation_code)
+        self._write_listeners = []
+        self._set_journal_mode(pragmas['journal_mode'])
         self.init_database()
         
-    def get_connection(self):
-        """ایجاد اتصال به پایگاه داده"""
-        conn = sqlite3.connect(self.db_path)
+    def add_write_listener(self, listener):
+        """ثبت listener تغییرات رزرو (مثلاً به‌روزرسانی ایندکس ظرفیت)"""
+        self._write_listeners.append(listener)
+    
+    def _invalidate_reservation(self, reservation_code: str, telegram_id: Optional[int]):
+        """ابطال cache رزرو، رزروهای کاربر و نتایج جستجو پس از هر نوشتن روی رزرو"""
+        tags = [f'reservation:{reservation_code}', 'search']
+        if telegram_id is not None:
+            tags.append(f'user:{telegram_id}')
+        self.cache.invalidate(*tags)
+    
+    def _notify_reservation_changed(self, reservation_code: str):
+        for listener in self._write_listeners:
+            try:
+                listener(self, reservation_code)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"خطا در listener تغییر رزرو {reservation_code}: {e}")
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self.profiler:
+            conn = sqlite3.connect(self.db_path, factory=self.profiler.connection_class)
+        else:
+            conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row  # برای دسترسی آسان به ستون‌ها
+        conn.executescript(self._connection_pragmas)
         return conn
     
+    def get_connection(self):
+        """
+        اتصال ماندگار thread جاری به پایگاه داده
+        
+        با `with` استفاده شود (commit یا rollback در پایان بلوک)؛ اتصال بسته نمی‌شود و
+        page cache آن (cache_size پروفایل) بین کوئری‌ها باقی می‌ماند.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    def _set_journal_mode(self, journal_mode: str):
+        """اعمال journal_mode پروفایل (در فایل پایگاه داده ماندگار است)"""
+        # تغییر journal_mode به اتصال جداگانه و بدون اتصال باز دیگر نیاز دارد
+        conn = self._connect()
+        try:
+            mode = conn.execute(f'PRAGMA journal_mode = {journal_mode}').fetchone()[0]
+        finally:
+            conn.close()
+        # پایگاه داده حافظه‌ای WAL ندارد
+        if mode.upper() != journal_mode and self.db_path != ':memory:':
+            logging.getLogger(__name__).warning(f"journal_mode={journal_mode} اعمال نشد (فعلی: {mode})")
+    
     def init_database(self):
         """ایجاد جداول پایگاه داده"""
         with self.get_connection() as conn:
+            # schema به‌روز است؛ DDL در هر راه‌اندازی تکرار نمی‌شود
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= self.SCHEMA_VERSION:
+                return
+            
             # جدول مشتریان
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS customers (
@@ -56,7 +168,8 @@ class DatabaseManager:
                     reservation_code TEXT UNIQUE NOT NULL,
                     service_type TEXT NOT NULL,
                     service_details TEXT, -- JSON string
-                    event_date DATE,
+                    event_date DATE, -- تاریخ شمسی نمایشی (۱۴۰۳/۰۸/۱۵)
+                    event_date_iso TEXT, -- همان تاریخ به میلادی YYYY-MM-DD (برای پرس‌وجوی بازه)
                     event_time TIME,
                     delivery_date DATE,
                     location TEXT,
@@ -110,14 +223,61 @@ class DatabaseManager:
                 )
             ''')
             
+            # جدول وضعیت داخلی ربات (مثل آخرین update_id پردازش شده)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS bot_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # پایگاه داده‌های قدیمی: افزودن ستون تاریخ میلادی و تبدیل ردیف‌های موجود
+            self._migrate_event_dates(conn)
+            
             # ایندکس‌گذاری برای عملکرد بهتر
             conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_telegram_id ON reservations(telegram_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_code ON reservations(reservation_code)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_event_date_iso ON reservations(event_date_iso)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_delivery_date ON reservations(delivery_date)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_customers_telegram_id ON customers(telegram_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_user_id ON logs(user_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_user_action ON rate_limits(user_id, action_type)')
             
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
             conn.commit()
+    
+    def _migrate_event_dates(self, conn, batch_size: int = 5000):
+        """
+        افزودن ستون event_date_iso (در صورت نبود) و پر کردن آن برای ردیف‌های قبلی
+        
+        event_date ردیف‌های قابل تبدیل نیز به قالب استاندارد شمسی بازنویسی می‌شود؛
+        ردیف‌های غیرقابل تبدیل دست نخورده باقی می‌مانند.
+        """
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(reservations)')}
+        if 'event_date_iso' not in columns:
+            conn.execute('ALTER TABLE reservations ADD COLUMN event_date_iso TEXT')
+        
+        rows = conn.execute('''
+            SELECT id, event_date FROM reservations
+            WHERE event_date IS NOT NULL AND event_date_iso IS NULL
+        ''').fetchall()
+        updates, skipped = [], 0
+        for row_id, event_date in rows:
+            display, iso = PersianDateUtils.normalize_event_date(event_date)
+            if iso is None:
+                skipped += 1
+                continue
+            updates.append((display, iso, row_id))
+        for start in range(0, len(updates), batch_size):
+            conn.executemany(
+                'UPDATE reservations SET event_date = ?, event_date_iso = ? WHERE id = ?',
+                updates[start:start + batch_size]
+            )
+        if rows:
+            logging.getLogger(__name__).info(
+                f"🗓️ مهاجرت تاریخ‌ها: {len(updates)} رزرو تبدیل شد، {skipped} تاریخ نامعتبر"
+            )
 
     def add_customer(self, telegram_id: int, name: str, phone: str, email: str = None) -> int:
         """
@@ -163,7 +323,7 @@ class DatabaseManager:
             reservation_code: کد رزرو منحصربه‌فرد
             service_type: نوع خدمت
             service_details: جزئیات خدمت (dict)
-            event_date: تاریخ مراسم
+            event_date: تاریخ مراسم (شمسی؛ به قالب استاندارد و ISO میلادی تبدیل می‌شود)
             event_time: زمان مراسم
             delivery_date: تاریخ تحویل
             location: مکان مراسم
@@ -174,22 +334,74 @@ class DatabaseManager:
         """
         customer = self.get_customer_by_telegram_id(telegram_id)
         customer_id = customer['id'] if customer else None
+        event_date, event_date_iso = PersianDateUtils.normalize_event_date(event_date)
         
         with self.get_connection() as conn:
             cursor = conn.execute('''
                 INSERT INTO reservations (
                     customer_id, telegram_id, reservation_code, service_type,
-                    service_details, event_date, event_time, delivery_date,
+                    service_details, event_date, event_date_iso, event_time, delivery_date,
                     location, total_cost
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (customer_id, telegram_id, reservation_code, service_type,
                   json.dumps(service_details, ensure_ascii=False), 
-                  event_date, event_time, delivery_date, location, total_cost))
+                  event_date, event_date_iso, event_time, delivery_date, location, total_cost))
             conn.commit()
-            return cursor.lastrowid
+        self._invalidate_reservation(reservation_code, telegram_id)
+        self._notify_reservation_changed(reservation_code)
+        return cursor.lastrowid
+
+    def create_booking(self, telegram_id: int, customer: Dict, reservation_code: str,
+                       service_type: str, service_details: Dict, total_cost: float = 0) -> int:
+        """
+        ثبت کامل یک رزرو فرم Mini App در یک تراکنش: مشتری، رزرو و لاگ
+
+        به جای add_customer + create_reservation + log_action (سه اتصال و سه commit)،
+        هر سه INSERT با یک commit انجام می‌شوند؛ در صورت خطا هیچ‌کدام ثبت نمی‌شود.
+
+        Args:
+            telegram_id: شناسه تلگرام کاربر
+            customer: name، phone و email (اختیاری)
+            reservation_code: کد رزرو منحصربه‌فرد
+            service_type: نوع خدمت
+            service_details: جزئیات خدمت (event_date، event_time و location از همین dict خوانده می‌شوند)
+            total_cost: هزینه کل
+
+        Returns:
+            شناسه رزرو در پایگاه داده
+        """
+        event_date, event_date_iso = PersianDateUtils.normalize_event_date(service_details.get('event_date'))
+
+        with self.get_connection() as conn:
+            customer_id = conn.execute('''
+                INSERT INTO customers (telegram_id, name, phone, email)
+                VALUES (?, ?, ?, ?)
+            ''', (telegram_id, customer['name'], customer['phone'], customer.get('email'))).lastrowid
+            reservation_id = conn.execute('''
+                INSERT INTO reservations (
+                    customer_id, telegram_id, reservation_code, service_type,
+                    service_details, event_date, event_date_iso, event_time,
+                    location, total_cost
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (customer_id, telegram_id, reservation_code, service_type,
+                  json.dumps(service_details, ensure_ascii=False),
+                  event_date, event_date_iso, service_details.get('event_time'),
+                  service_details.get('location'), total_cost)).lastrowid
+            conn.execute('''
+                INSERT INTO logs (user_id, action, details)
+                VALUES (?, ?, ?)
+            ''', (telegram_id, "reservation_created", reservation_code))
+            conn.commit()
+        self._invalidate_reservation(reservation_code, telegram_id)
+        self._notify_reservation_changed(reservation_code)
+        return reservation_id
 
     def get_reservation_by_code(self, reservation_code: str) -> Optional[Dict]:
-        """جستجوی رزرو بر اساس کد رزرو"""
+        """جستجوی رزرو بر اساس کد رزرو (نتیجه از cache مشترک است؛ تغییر ندهید)"""
+        key = f'reservation:{reservation_code}'
+        return self.cache.get_or_load(key, lambda: self._load_reservation_by_code(reservation_code), (key,))
+
+    def _load_reservation_by_code(self, reservation_code: str) -> Optional[Dict]:
         with self.get_connection() as conn:
             cursor = conn.execute('''
                 SELECT r.*, c.name as customer_name, c.phone as customer_phone
@@ -206,7 +418,14 @@ class DatabaseManager:
             return None
 
     def get_user_reservations(self, telegram_id: int, limit: int = 10) -> List[Dict]:
-        """دریافت رزروهای کاربر"""
+        """دریافت رزروهای کاربر (نتیجه از cache مشترک است؛ تغییر ندهید)"""
+        return self.cache.get_or_load(
+            f'user:{telegram_id}:{limit}',
+            lambda: self._load_user_reservations(telegram_id, limit),
+            (f'user:{telegram_id}',)
+        )
+
+    def _load_user_reservations(self, telegram_id: int, limit: int) -> List[Dict]:
         with self.get_connection() as conn:
             cursor = conn.execute('''
                 SELECT r.*, c.name as customer_name
@@ -231,7 +450,16 @@ class DatabaseManager:
         Args:
             query: متن جستجو
             search_type: نوع جستجو (code, name, phone, all)
+
+        نتیجه از cache مشترک است؛ تغییر ندهید.
         """
+        return self.cache.get_or_load(
+            f'search:{search_type}:{query}',
+            lambda: self._load_search_results(query, search_type),
+            ('search',)
+        )
+
+    def _load_search_results(self, query: str, search_type: str) -> List[Dict]:
         with self.get_connection() as conn:
             if search_type == 'code':
                 sql = '''
@@ -300,7 +528,12 @@ class DatabaseManager:
         with self.get_connection() as conn:
             cursor = conn.execute(sql, params)
             conn.commit()
-            return cursor.rowcount > 0
+            telegram_id = self._get_reservation_owner(conn, reservation_code) if cursor.rowcount > 0 else None
+        if cursor.rowcount > 0:
+            self._invalidate_reservation(reservation_code, telegram_id)
+        if booking_status and cursor.rowcount > 0:
+            self._notify_reservation_changed(reservation_code)
+        return cursor.rowcount > 0
 
     def update_payment_info(self, reservation_code: str, payment_method: str,
                            transaction_id: str = None, deposit_amount: float = None) -> bool:
@@ -313,8 +546,17 @@ class DatabaseManager:
                 WHERE reservation_code = ?
             ''', (payment_method, transaction_id, deposit_amount, reservation_code))
             conn.commit()
+            if cursor.rowcount > 0:
+                self._invalidate_reservation(reservation_code, self._get_reservation_owner(conn, reservation_code))
             return cursor.rowcount > 0
 
+    @staticmethod
+    def _get_reservation_owner(conn, reservation_code: str) -> Optional[int]:
+        row = conn.execute(
+            'SELECT telegram_id FROM reservations WHERE reservation_code = ?', (reservation_code,)
+        ).fetchone()
+        return row['telegram_id'] if row else None
+
     def is_admin(self, telegram_id: int) -> bool:
         """بررسی ادمین بودن کاربر"""
         with self.get_connection() as conn:
@@ -350,6 +592,24 @@ class DatabaseManager:
             ''', (user_id, action, details))
             conn.commit()
 
+    def get_state(self, key: str, default: str = None) -> Optional[str]:
+        """خواندن مقدار وضعیت داخلی ربات"""
+        with self.get_connection() as conn:
+            cursor = conn.execute('SELECT value FROM bot_state WHERE key = ?', (key,))
+            result = cursor.fetchone()
+            return result['value'] if result else default
+
+    def set_state(self, key: str, value: str):
+        """ذخیره مقدار وضعیت داخلی ربات"""
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO bot_state (key, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                                               updated_at = CURRENT_TIMESTAMP
+            ''', (key, value))
+            conn.commit()
+
     def check_rate_limit(self, user_id: int, action_type: str, limit: int, window_minutes: int = 1) -> bool:
         """
         بررسی محدودیت نرخ درخواست
@@ -467,14 +727,21 @@ class DatabaseManager:
             return backup
 
     def get_reservations_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
-        """دریافت رزروهای بازه زمانی مشخص"""
+        """دریافت رزروهای بازه زمانی مشخص (تاریخ مراسم؛ تاریخ‌ها به میلادی YYYY-MM-DD)"""
+        return self._get_reservations_between('event_date_iso', start_date, end_date)
+    
+    def get_reservations_by_delivery_date_range(self, start_date: str, end_date: str) -> List[Dict]:
+        """دریافت رزروهایی که تاریخ تحویل آنها در بازه است (تاریخ‌ها به میلادی YYYY-MM-DD)"""
+        return self._get_reservations_between('delivery_date', start_date, end_date)
+    
+    def _get_reservations_between(self, column: str, start_date: str, end_date: str) -> List[Dict]:
         with self.get_connection() as conn:
-            cursor = conn.execute('''
+            cursor = conn.execute(f'''
                 SELECT r.*, c.name as customer_name, c.phone as customer_phone
                 FROM reservations r
                 LEFT JOIN customers c ON r.customer_id = c.id
-                WHERE r.event_date BETWEEN ? AND ?
-                ORDER BY r.event_date, r.event_time
+                WHERE r.{column} BETWEEN ? AND ?
+                ORDER BY r.{column}, r.event_time
             ''', (start_date, end_date))
             
             results = []
@@ -485,6 +752,33 @@ class DatabaseManager:
                 results.append(result)
             return results
 
+    def get_active_reservations(self) -> List[Dict]:
+        """رزروهای در انتظار و تأیید شده دارای تاریخ (برای ساخت ایندکس ظرفیت)"""
+        with self.get_connection() as conn:
+            cursor = conn.execute('''
+                SELECT reservation_code, event_date, event_date_iso, event_time, service_details, booking_status
+                FROM reservations
+                WHERE booking_status IN ('pending', 'confirmed') AND event_date IS NOT NULL
+            ''')
+            results = []
+            for row in cursor.fetchall():
+                result = dict(row)
+                if result['service_details']:
+                    result['service_details'] = json.loads(result['service_details'])
+                results.append(result)
+            return results
+
+    def get_search_rows(self) -> List[Dict]:
+        """ستون‌های لازم ایندکس جستجو برای همه رزروها (بدون service_details)"""
+        with self.get_connection() as conn:
+            cursor = conn.execute('''
+                SELECT r.id, r.reservation_code, r.service_type, r.event_date, r.booking_status,
+                       c.name as customer_name, c.phone as customer_phone
+                FROM reservations r
+                LEFT JOIN customers c ON r.customer_id = c.id
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_upcoming_events(self, days_ahead: int = 7) -> List[Dict]:
         """دریافت مراسم‌های آتی"""
         from datetime import date, timedelta
@@ -0,0 +1,155 @@
+"""
+🗓️ ماژول تقویم شمسی دکمه‌ای
+Inline-keyboard Jalali date picker for Mandani Studio Bot
+
+انتخاب تاریخ با یک لمس، به جای تایپ و اعتبارسنجی متن. شبکه روزهای هر ماه (شنبه تا
+جمعه) فقط یک بار برای هر (سال، ماه) محاسبه می‌شود. کیبورد نهایی نیز با کلید
+(سال، ماه، امروز، نسخه ایندکس ظرفیت) در یک LRU نگهداری می‌شود. با هر تغییر رزروها
+نسخه ایندکس عوض می‌شود و روزهای تکمیل شده دوباره محاسبه می‌شوند.
+
+callback_data فشرده است (حداکثر ۶۴ بایت در تلگرام):
+    dp:m:<سال×۱۲ + ماه - ۱>    رفتن به ماه
+    dp:d:<ordinal میلادی روز>   انتخاب روز
+    dp:x                       دکمه غیرفعال (عنوان، روز گذشته یا تکمیل)
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from availability import AvailabilityIndex
+from utils import PersianDateUtils
+
+PREFIX = 'dp'
+NOOP = f'{PREFIX}:x'
+WEEKDAY_LABELS = ('ش', 'ی', 'د', 'س', 'چ', 'پ', 'ج')
+
+_PERSIAN_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+
+
+@lru_cache(maxsize=256)
+def month_grid(year: int, month: int) -> Tuple[Tuple[Optional[int], ...], ...]:
+    """هفته‌های یک ماه شمسی (شنبه تا جمعه)؛ هر خانه ordinal میلادی روز یا None"""
+    first = PersianDateUtils.jalali_to_gregorian(year, month, 1).toordinal()
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    length = PersianDateUtils.jalali_to_gregorian(next_year, next_month, 1).toordinal() - first
+    # date.weekday(): دوشنبه=۰ ... شنبه=۵ ← ستون شنبه=۰
+    offset = (date.fromordinal(first).weekday() + 2) % 7
+    cells = [None] * offset + list(range(first, first + length))
+    cells += [None] * (-len(cells) % 7)
+    return tuple(tuple(cells[i:i + 7]) for i in range(0, len(cells), 7))
+
+
+def _shift(year: int, month: int, delta: int) -> Tuple[int, int]:
+    index = year * 12 + month - 1 + delta
+    return index // 12, index % 12 + 1
+
+
+class DatePicker:
+    """کیبورد تقویم با روزهای گذشته و تکمیل شده غیرفعال"""
+
+    def __init__(self, availability: AvailabilityIndex, months_ahead: int = 12, cache_size: int = 64):
+        """
+        Args:
+            availability: ایندکس ظرفیت برای تشخیص روزهای تکمیل
+            months_ahead: حداکثر چند ماه بعد قابل انتخاب است
+            cache_size: تعداد کیبوردهای ماهانه نگهداری شده
+        """
+        self.availability = availability
+        self.months_ahead = months_ahead
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def month_range(self, today: date) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """اولین و آخرین ماه قابل نمایش"""
+        year, month, _ = PersianDateUtils.gregorian_to_jalali(today)
+        return (year, month), _shift(year, month, self.months_ahead)
+
+    def is_selectable(self, day: date, today: date = None) -> bool:
+        today = today or date.today()
+        _, last = self.month_range(today)
+        last_day = PersianDateUtils.jalali_to_gregorian(*_shift(*last, 1), 1).toordinal() - 1
+        return (today.toordinal() <= day.toordinal() <= last_day
+                and not self.availability.is_day_full(day))
+
+    def keyboard(self, year: int = None, month: int = None, today: date = None) -> InlineKeyboardMarkup:
+        """کیبورد یک ماه (پیش‌فرض: ماه جاری)"""
+        today = today or date.today()
+        first, last = self.month_range(today)
+        if year is None or not first <= (year, month) <= last:
+            year, month = first
+
+        key = (year, month, today.toordinal(), self.availability.version)
+        with self._lock:
+            markup = self._cache.get(key)
+            if markup is not None:
+                self._cache.move_to_end(key)
+                return markup
+
+        markup = self._build(year, month, today, first, last)
+        with self._lock:
+            self._cache[key] = markup
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return markup
+
+    def _build(self, year: int, month: int, today: date, first, last) -> InlineKeyboardMarkup:
+        today_ordinal = today.toordinal()
+        title = f"{PersianDateUtils.PERSIAN_MONTHS[month - 1]} {year}".translate(_PERSIAN_DIGITS)
+        rows = [
+            [InlineKeyboardButton(f"📅 {title}", callback_data=NOOP)],
+            [InlineKeyboardButton(label, callback_data=NOOP) for label in WEEKDAY_LABELS],
+        ]
+        for week in month_grid(year, month):
+            row = []
+            for ordinal in week:
+                if ordinal is None:
+                    row.append(InlineKeyboardButton(' ', callback_data=NOOP))
+                    continue
+                label = str(PersianDateUtils.gregorian_to_jalali(date.fromordinal(ordinal))[2])
+                label = label.translate(_PERSIAN_DIGITS)
+                if ordinal < today_ordinal:
+                    row.append(InlineKeyboardButton('·', callback_data=NOOP))
+                elif self.availability.is_day_full(date.fromordinal(ordinal)):
+                    row.append(InlineKeyboardButton('✖️', callback_data=NOOP))
+                else:
+                    row.append(InlineKeyboardButton(label, callback_data=f'{PREFIX}:d:{ordinal}'))
+            rows.append(row)
+
+        navigation = []
+        if (year, month) > first:
+            previous = _shift(year, month, -1)
+            navigation.append(InlineKeyboardButton(
+                '« ماه قبل', callback_data=f'{PREFIX}:m:{previous[0] * 12 + previous[1] - 1}'))
+        if (year, month) < last:
+            following = _shift(year, month, 1)
+            navigation.append(InlineKeyboardButton(
+                'ماه بعد »', callback_data=f'{PREFIX}:m:{following[0] * 12 + following[1] - 1}'))
+        if navigation:
+            rows.append(navigation)
+        rows.append([InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")])
+        return InlineKeyboardMarkup(rows)
+
+    @staticmethod
+    def parse(data: str):
+        """
+        تفسیر callback_data
+
+        Returns:
+            ('month', (سال، ماه))، ('day', date) یا ('noop', None)
+        """
+        parts = (data or '').split(':')
+        try:
+            if len(parts) == 3 and parts[1] == 'm':
+                index = int(parts[2])
+                return 'month', (index // 12, index % 12 + 1)
+            if len(parts) == 3 and parts[1] == 'd':
+                return 'day', date.fromordinal(int(parts[2]))
+        except (ValueError, OverflowError):
+            pass
+        return 'noop', None
@@ -0,0 +1,207 @@
+"""
+🐢 ماژول پروفایل کوئری‌های پایگاه داده
+SQL query profiler for Mandani Studio Bot
+
+این ماژول زمان اجرای هر دستور SQL را اندازه گرفته و بر اساس متن نرمال‌شده دستور
+تجمیع می‌کند. SQLite در execute فقط اولین ردیف را می‌خواند؛ زمان خواندن ردیف‌های بعدی
+(fetchone/fetchall/پیمایش) هم به همان دستور اضافه شده و دستور پس از پایان ردیف‌ها یا
+بسته شدن cursor ثبت می‌شود. دستورات کندتر از آستانه همراه با خروجی EXPLAIN QUERY PLAN
+(یک بار برای هر شکل دستور) در لاگ ثبت می‌شوند.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# دستوراتی که EXPLAIN QUERY PLAN برای آنها معنی دارد
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+_COMMENT = re.compile(r'--[^\n]*')
+
+
+def normalize_sql(sql: str) -> str:
+    """نرمال‌سازی متن SQL (حذف فاصله‌ها، توضیحات و مقادیر ثابت)"""
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """آمار تجمیعی یک شکل دستور SQL"""
+
+    __slots__ = ('sql', 'count', 'total_time', 'max_time', 'slow_count', 'plan')
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.slow_count = 0
+        self.plan: Optional[List[str]] = None
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+
+class QueryProfiler:
+    """اندازه‌گیری و تجمیع زمان اجرای دستورات SQL"""
+
+    def __init__(self, slow_threshold_ms: float = 50, capture_plans: bool = True):
+        """
+        Args:
+            slow_threshold_ms: آستانه دستور کند (میلی‌ثانیه)
+            capture_plans: ثبت EXPLAIN QUERY PLAN برای دستورات کند
+        """
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.capture_plans = capture_plans
+        self._stats: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+        self.connection_class = self._make_connection_class()
+
+    def _make_connection_class(self):
+        """ساخت کلاس اتصال SQLite که دستورات را به این profiler گزارش می‌دهد"""
+        profiler = self
+
+        class ProfiledCursor(sqlite3.Cursor):
+            """cursor که زمان خواندن ردیف‌ها را به زمان دستور اضافه می‌کند"""
+
+            _pending = None  # [sql, parameters, elapsed] تا پایان ردیف‌ها
+
+            def _fetch(self, method, *args):
+                start = time.perf_counter()
+                try:
+                    return method(self, *args)
+                finally:
+                    if self._pending is not None:
+                        self._pending[2] += time.perf_counter() - start
+
+            def _finish(self):
+                pending, self._pending = self._pending, None
+                if pending is not None:
+                    profiler.record(self.connection, *pending)
+
+            def fetchone(self):
+                row = self._fetch(sqlite3.Cursor.fetchone)
+                if row is None:
+                    self._finish()
+                return row
+
+            def fetchmany(self, size=None):
+                size = self.arraysize if size is None else size
+                rows = self._fetch(sqlite3.Cursor.fetchmany, size)
+                if len(rows) < size:
+                    self._finish()
+                return rows
+
+            def fetchall(self):
+                rows = self._fetch(sqlite3.Cursor.fetchall)
+                self._finish()
+                return rows
+
+            def __next__(self):
+                try:
+                    return self._fetch(sqlite3.Cursor.__next__)
+                except StopIteration:
+                    self._finish()
+                    raise
+
+            def close(self):
+                self._finish()
+                super().close()
+
+            def __del__(self):
+                # ردیف‌های خوانده نشده (مثلاً فقط یک fetchone) هنگام رها شدن cursor
+                self._finish()
+
+        class ProfiledConnection(sqlite3.Connection):
+            def execute(self, sql, parameters=()):
+                cursor = self.cursor(ProfiledCursor)
+                start = time.perf_counter()
+                sqlite3.Cursor.execute(cursor, sql, parameters)
+                elapsed = time.perf_counter() - start
+                if cursor.description is None:
+                    profiler.record(self, sql, parameters, elapsed)
+                else:
+                    cursor._pending = [sql, parameters, elapsed]
+                return cursor
+
+            def executemany(self, sql, seq_of_parameters):
+                start = time.perf_counter()
+                cursor = super().executemany(sql, seq_of_parameters)
+                profiler.record(self, sql, None, time.perf_counter() - start)
+                return cursor
+
+        return ProfiledConnection
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters, elapsed: float):
+        """ثبت زمان اجرای یک دستور"""
+        shape = normalize_sql(sql)
+
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = QueryStats(shape)
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+
+            is_slow = elapsed >= self.slow_threshold
+            needs_plan = is_slow and self.capture_plans and stats.plan is None
+            if is_slow:
+                stats.slow_count += 1
+
+        if not is_slow:
+            return
+
+        if needs_plan:
+            stats.plan = self._explain(conn, sql, parameters)
+
+        plan_text = '\n    '.join(stats.plan or [])
+        logger.warning(
+            f"🐢 کوئری کند ({elapsed * 1000:.1f}ms): {shape}"
+            + (f"\n    {plan_text}" if plan_text else '')
+        )
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+        """دریافت EXPLAIN QUERY PLAN یک دستور"""
+        if parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            return [str(row[-1]) for row in rows]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN ناموفق: {e}"]
+
+    def top(self, limit: int = 10, order_by: str = 'total_time') -> List[QueryStats]:
+        """دستورات پرهزینه‌تر بر اساس مجموع (یا میانگین/حداکثر) زمان"""
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda s: getattr(s, order_by), reverse=True)[:limit]
+
+    def reset(self):
+        """پاک کردن آمار"""
+        with self._lock:
+            self._stats.clear()
+
+    def format_report(self, limit: int = 10) -> str:
+        """گزارش متنی دستورات پرهزینه"""
+        lines = []
+        for index, stats in enumerate(self.top(limit), 1):
+            lines.append(
+                f"{index}. total={stats.total_time * 1000:.1f}ms count={stats.count} "
+                f"avg={stats.avg_time * 1000:.2f}ms max={stats.max_time * 1000:.1f}ms "
+                f"slow={stats.slow_count}\n   {stats.sql[:300]}"
+            )
+            if stats.plan:
+                lines.append('   plan: ' + ' | '.join(stats.plan))
+        return '\n\n'.join(lines)
@@ -15,16 +15,6 @@ from pathlib import Path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-# تنظیم logging برای production
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/tmp/mandani_bot.log'),
-        logging.StreamHandler()
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 def setup_environment():
@@ -53,6 +43,9 @@ def setup_environment():
 
 def main():
     """تابع اصلی deployment"""
+    # تنظیم logging برای production (ربات اصلی همین تنظیمات را دوباره اعمال نمی‌کند)
+    from logging_setup import setup_logging
+    setup_logging(log_file=os.getenv('LOG_FILE', '/tmp/mandani_bot.log'))
     logger.info("🚀 شروع deployment ربات استودیو مندانی...")
     
     # تنظیم محیط
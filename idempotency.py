@@ -0,0 +1,87 @@
+"""
+🔐 ماژول کلیدهای idempotency
+Idempotency keys for side-effecting callbacks
+
+دو بار زدن دکمه‌هایی مثل «✅ تایید و ادامه» نباید دو رزرو، دو کد و دو نوتیفیکیشن بسازد.
+این ماژول نتیجه اولین اجرای هر کلید را برای مدت مشخصی نگه می‌دارد و تکرارها
+به جای اجرای دوباره، همان نتیجه را دریافت می‌کنند.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyGuard:
+    """اجرای یک‌باره عملیات دارای اثر جانبی به ازای هر کلید"""
+
+    def __init__(self, window_seconds: int = 300, max_entries: int = 10000):
+        """
+        Args:
+            window_seconds: مدت نگهداری نتیجه هر کلید (ثانیه)
+            max_entries: حداکثر تعداد کلیدهای نگهداری شده
+        """
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # تعداد اجراهای تکراری که جلوی آنها گرفته شد
+        self.suppressed_count = 0
+
+    @staticmethod
+    def make_key(user_id: int, action: str, payload: Dict, message_id: int = None) -> str:
+        """
+        ساخت کلید idempotency از محتوای پیش‌نویس و شناسه پیام
+
+        Args:
+            user_id: شناسه کاربر
+            action: نام عملیات (مثلاً callback_data)
+            payload: محتوای پیش‌نویس کاربر
+            message_id: شناسه پیامی که دکمه روی آن زده شده
+        """
+        content = json.dumps(payload or {}, sort_keys=True, ensure_ascii=False, default=str)
+        raw = f"{user_id}:{action}:{message_id}:{content}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _evict(self, now: float):
+        """حذف کلیدهای منقضی و کلیدهای مازاد"""
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    async def run(self, key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        اجرای func فقط برای اولین درخواست هر کلید
+
+        درخواست‌های تکراری در بازه زمانی، منتظر اجرای اول مانده و نتیجه آن را
+        دریافت می‌کنند. در صورت خطا، کلید حذف می‌شود تا کاربر بتواند دوباره تلاش کند.
+        """
+        now = time.monotonic()
+        self._evict(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.suppressed_count += 1
+            logger.info(f"🔐 اجرای تکراری متوقف شد (مجموع: {self.suppressed_count})")
+            return await asyncio.shield(entry[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (now + self.window_seconds, future)
+
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException:
+            self._entries.pop(key, None)
+            future.set_result(None)
+            raise
+
+        future.set_result(result)
+        return result
@@ -0,0 +1,120 @@
+"""
+📦 ماژول خروجی گروهی فاکتورها
+Batch invoice export for Mandani Studio Bot
+
+این ماژول فاکتورهای یک بازه زمانی را به صورت موازی در پروسه‌های جداگانه
+تولید کرده و به تدریج داخل یک فایل ZIP می‌نویسد
+"""
+
+import asyncio
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+import time
+
+from utils import CostCalculator, PDFGenerator
+
+logger = logging.getLogger(__name__)
+
+# نمونه PDFGenerator هر پروسه کارگر (در initializer ساخته می‌شود)
+_worker_generator: Optional[PDFGenerator] = None
+
+
+def _init_worker():
+    """راه‌اندازی پروسه کارگر"""
+    global _worker_generator
+    _worker_generator = PDFGenerator()
+
+
+def render_invoice(reservation: Dict) -> Tuple[str, bytes]:
+    """
+    تولید PDF فاکتور یک رزرو (اجرا در پروسه کارگر)
+
+    Args:
+        reservation: اطلاعات رزرو (خروجی get_reservations_by_date_range)
+
+    Returns:
+        (نام فایل داخل ZIP، محتوای PDF)
+    """
+    generator = _worker_generator or PDFGenerator()
+    cost_breakdown = CostCalculator.calculate_service_cost(
+        reservation.get('service_type') or '',
+        reservation.get('service_details') or {}
+    )
+    buffer = generator.generate_invoice_pdf(reservation, cost_breakdown)
+    return f"invoice_{reservation['reservation_code']}.pdf", buffer.getvalue()
+
+
+class InvoiceBatchExporter:
+    """تولید موازی فاکتورها و نوشتن تدریجی در ZIP"""
+
+    def __init__(self, max_workers: int = None, max_in_flight: int = None,
+                 progress_interval: float = 2.0):
+        """
+        Args:
+            max_workers: تعداد پروسه‌های کارگر (پیش‌فرض: تعداد هسته‌ها)
+            max_in_flight: حداکثر فاکتورهای در حال تولید/منتظر نوشتن
+            progress_interval: حداقل فاصله بین گزارش‌های پیشرفت (ثانیه)
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        # محدود کردن کارهای هم‌زمان تا همه PDF ها با هم در حافظه نمانند
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+        self.progress_interval = progress_interval
+
+    async def export(self, reservations: List[Dict], zip_path: str,
+                     progress: Callable[[int, int, int], Awaitable[None]] = None) -> Tuple[int, int]:
+        """
+        تولید فاکتورها و نوشتن آنها در فایل ZIP
+
+        Args:
+            reservations: لیست رزروها
+            zip_path: مسیر فایل ZIP خروجی
+            progress: تابع async برای گزارش پیشرفت (done, failed, total)
+
+        Returns:
+            (تعداد فاکتورهای نوشته شده، تعداد فاکتورهای ناموفق)
+        """
+        loop = asyncio.get_running_loop()
+        total = len(reservations)
+        done = 0
+        failed = 0
+        last_report = 0.0
+        pending = set()
+        queue = iter(reservations)
+
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker) as pool, \
+                zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+
+            def submit_next() -> bool:
+                reservation = next(queue, None)
+                if reservation is None:
+                    return False
+                pending.add(loop.run_in_executor(pool, render_invoice, reservation))
+                return True
+
+            while len(pending) < self.max_in_flight and submit_next():
+                pass
+
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    pending.discard(future)
+                    try:
+                        filename, content = future.result()
+                    except Exception as e:
+                        logger.error(f"خطا در تولید فاکتور: {e}")
+                        failed += 1
+                    else:
+                        # نوشتن در ZIP خارج از event loop
+                        await asyncio.to_thread(archive.writestr, filename, content)
+                        done += 1
+                    submit_next()
+
+                now = time.monotonic()
+                if progress and (now - last_report >= self.progress_interval or not pending):
+                    last_report = now
+                    await progress(done, failed, total)
+
+        return done, failed
@@ -0,0 +1,158 @@
+"""
+📝 ماژول تنظیم لاگ
+Asynchronous, size-rotated structured logging for Mandani Studio Bot
+
+فراخوانی logger ها فقط رکورد را در یک صف قرار می‌دهد؛ یک QueueListener در thread
+جداگانه رکوردها را به صورت JSON در فایل چرخشی (LOG_MAX_SIZE / LOG_BACKUP_COUNT)
+و به صورت متنی در کنسول می‌نویسد، تا event loop هرگز منتظر I/O فایل نماند.
+لاگ‌های پرتعداد با نرخ نمونه‌برداری هر سطح (LOG_SAMPLE_RATES) کاهش می‌یابند.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+JSON_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """
+    تبدیل متن نرخ نمونه‌برداری به دیکشنری
+
+    Args:
+        spec: مثلاً "DEBUG=0.1,INFO=0.5" (سطوح ذکر نشده: ۱)
+    """
+    rates = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, value = item.split('=', 1)
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = min(1.0, max(0.0, float(value)))
+    return rates
+
+
+class LevelSamplingFilter(logging.Filter):
+    """نگهداری درصدی از رکوردهای هر سطح (سطوح ذکر نشده کامل نگهداری می‌شوند)"""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler که در صورت پر بودن صف، رکورد را دور می‌ریزد (بدون مسدود کردن)"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # پیام با آرگومان‌ها ادغام می‌شود ولی exc_info حفظ می‌شود تا formatter فایل
+        # traceback را به صورت فیلد جداگانه JSON بنویسد (صف درون‌پردازه‌ای است)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: str = None, log_file: str = None, max_size_mb: int = None,
+                  backup_count: int = None, sample_rates: str = None,
+                  queue_size: int = None) -> logging.Logger:
+    """
+    تنظیم سیستم لاگ (فقط بار اول اعمال می‌شود؛ فراخوانی‌های بعدی بی‌اثر هستند)
+
+    مقادیر پیش‌فرض از Config خوانده می‌شوند.
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger()
+    if _listener is not None:
+        return root
+
+    from config import Config
+
+    level = level or Config.LOG_LEVEL
+    log_file = log_file or Config.LOG_FILE
+    max_size_mb = Config.LOG_MAX_SIZE if max_size_mb is None else max_size_mb
+    backup_count = Config.LOG_BACKUP_COUNT if backup_count is None else backup_count
+    sample_rates = Config.LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+    queue_size = Config.LOG_QUEUE_SIZE if queue_size is None else queue_size
+
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=max_size_mb * 1024 * 1024, backupCount=backup_count,
+        encoding='utf-8', delay=True
+    )
+    file_handler.setFormatter(JsonFormatter(JSON_FORMAT, json_ensure_ascii=False))
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(LevelSamplingFilter(parse_sample_rates(sample_rates)))
+
+    # جایگزینی handler های قبلی (مثلاً basicConfig کتابخانه‌ها)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    _register_metrics()
+    return root
+
+
+def shutdown_logging():
+    """تخلیه صف و توقف thread نوشتن لاگ"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _register_metrics():
+    import metrics
+
+    metrics.registry.counter(
+        'mandani_log_dropped_total', 'Log records dropped because the log queue was full'
+    ).set_function(lambda: _queue_handler.dropped if _queue_handler else 0)
+    metrics.registry.counter(
+        'mandani_log_sampled_out_total', 'Log records discarded by per-level sampling'
+    ).set_function(lambda: sum(
+        f.sampled_out for f in (_queue_handler.filters if _queue_handler else ())
+        if isinstance(f, LevelSamplingFilter)
+    ))
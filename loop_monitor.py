@@ -0,0 +1,206 @@
+"""
+⏱️ ماژول پایش تأخیر event loop
+Event-loop lag and blocking-call detector for Mandani Studio Bot
+
+یک task در event loop به صورت دوره‌ای بیدار شده و تأخیر زمان‌بندی (lag) را اندازه
+می‌گیرد و ضربان (heartbeat) ثبت می‌کند. یک thread نمونه‌بردار جداگانه اگر ضربان
+بیش از آستانه متوقف شود، stack thread اجرا کننده loop را با sys._current_frames()
+برمی‌دارد تا مشخص شود کدام متد MandaniStudioBot یا فراخوانی DatabaseManager
+loop را مسدود کرده است. آخرین توقف‌ها در یک بافر حلقوی نگهداری و با /loopstalls
+نمایش داده می‌شوند.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# عمق حداکثر stack ذخیره شده برای هر نمونه
+MAX_STACK_DEPTH = 40
+
+LOOP_LAG = metrics.registry.histogram(
+    'mandani_event_loop_lag_seconds', 'Event loop scheduling lag measured by the watchdog task',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_STALLS = metrics.registry.counter(
+    'mandani_event_loop_stalls_total', 'Event loop stalls longer than the lag threshold'
+)
+LOOP_STALL_SECONDS = metrics.registry.counter(
+    'mandani_event_loop_stall_seconds_total', 'Total time the event loop spent stalled'
+)
+
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(PROJECT_DIR + os.sep) and os.sep + 'site-packages' + os.sep not in filename
+
+
+class Stall:
+    """یک توقف ثبت شده event loop"""
+
+    __slots__ = ('started_at', 'duration', 'samples', 'stack', 'culprit')
+
+    def __init__(self, started_at: float, duration: float, samples: int, stack: tuple):
+        self.started_at = started_at
+        self.duration = duration
+        self.samples = samples
+        self.stack = stack
+        # درونی‌ترین frame کد پروژه (مثلاً متد ربات یا DatabaseManager)
+        project_frames = [label for label, project in stack if project]
+        self.culprit = project_frames[-1] if project_frames else (stack[-1][0] if stack else '?')
+
+    @property
+    def project_stack(self) -> List[str]:
+        return [label for label, project in self.stack if project]
+
+
+class LoopMonitor:
+    """watchdog تأخیر event loop و نمونه‌بردار stack هنگام توقف"""
+
+    def __init__(self, threshold_ms: float = 100, interval: float = 0.05,
+                 sample_interval: float = 0.01, buffer_size: int = 20):
+        """
+        Args:
+            threshold_ms: آستانه توقف (میلی‌ثانیه)
+            interval: فاصله بیدار شدن task پایش (ثانیه)
+            sample_interval: فاصله نمونه‌برداری stack در حین توقف (ثانیه)
+            buffer_size: تعداد توقف‌های اخیر نگهداری شده
+        """
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.stalls = deque(maxlen=buffer_size)
+        self.max_lag = 0.0
+
+        self._heartbeat = time.perf_counter()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        metrics.registry.gauge(
+            'mandani_event_loop_max_lag_seconds', 'Largest event loop lag seen since start or last reset'
+        ).set_function(lambda: self.max_lag)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """شروع پایش روی event loop جاری (باید از درون loop فراخوانی شود)"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._watchdog())
+        self._thread = threading.Thread(target=self._sampler, name='loop-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"⏱️ پایش event loop شروع شد (آستانه {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        """توقف task پایش و thread نمونه‌بردار"""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _watchdog(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    # ========================================
+    # نمونه‌برداری stack (thread جداگانه)
+    # ========================================
+
+    def _capture_stack(self) -> Optional[Tuple[Tuple[str, bool], ...]]:
+        """stack فعلی thread event loop: (محل، آیا کد پروژه است)"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        stack = []
+        for entry in traceback.extract_stack(frame, limit=MAX_STACK_DEPTH):
+            project = _is_project_frame(entry.filename)
+            filename = os.path.relpath(entry.filename, PROJECT_DIR) if project else os.path.basename(entry.filename)
+            stack.append((f"{filename}:{entry.lineno} {entry.name}", project))
+        return tuple(stack)
+
+    def _sampler(self):
+        stack_counts = Counter()
+        stall_started = None
+
+        while not self._stop.wait(self.sample_interval):
+            behind = time.perf_counter() - self._heartbeat - self.interval
+            if behind > self.threshold:
+                if stall_started is None:
+                    stall_started = time.time() - behind
+                stack = self._capture_stack()
+                if stack:
+                    stack_counts[stack] += 1
+            elif stall_started is not None:
+                self._record_stall(stall_started, stack_counts)
+                stack_counts = Counter()
+                stall_started = None
+
+    def _record_stall(self, started_at: float, stack_counts: Counter):
+        duration = time.time() - started_at
+        samples = sum(stack_counts.values())
+        stack = stack_counts.most_common(1)[0][0] if stack_counts else ()
+        stall = Stall(started_at, duration, samples, stack)
+        with self._lock:
+            self.stalls.append(stall)
+        LOOP_STALLS.inc()
+        LOOP_STALL_SECONDS.inc(duration)
+        logger.warning(f"⏱️ event loop برای {duration * 1000:.0f}ms مسدود شد: {stall.culprit}")
+
+    # ========================================
+    # گزارش
+    # ========================================
+
+    def reset(self):
+        with self._lock:
+            self.stalls.clear()
+        self.max_lag = 0.0
+
+    def recent_stalls(self, limit: int = 5) -> List[Stall]:
+        with self._lock:
+            return list(self.stalls)[-limit:][::-1]
+
+    def format_report(self, limit: int = 5, stack_depth: int = 8) -> str:
+        """متن گزارش توقف‌های اخیر برای دستور /loopstalls"""
+        lines = [
+            f"⏱️ بیشترین تأخیر loop: {self.max_lag * 1000:.0f}ms | "
+            f"توقف‌ها: {LOOP_STALLS.value():.0f} (مجموع {LOOP_STALL_SECONDS.value():.1f}s)"
+        ]
+        for stall in self.recent_stalls(limit):
+            when = time.strftime('%H:%M:%S', time.localtime(stall.started_at))
+            lines.append(f"\n🕒 {when} — {stall.duration * 1000:.0f}ms ({stall.samples} نمونه)")
+            lines.append(f"🎯 {stall.culprit}")
+            for line in (stall.project_stack or [label for label, _ in stall.stack])[-stack_depth:]:
+                lines.append(f"   {line}")
+        return '\n'.join(lines)
@@ -17,11 +17,12 @@ import logging
 # telegram bot imports
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup,
-    KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
+    KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove, WebAppInfo,
+    InlineQueryResultArticle, InputTextMessageContent
 )
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
-    ConversationHandler, filters, ContextTypes, JobQueue
+    ConversationHandler, TypeHandler, InlineQueryHandler, filters, ContextTypes, JobQueue
 )
 from telegram.constants import ParseMode
 
@@ -32,6 +33,22 @@ from utils import (
     PDFGenerator, MessageFormatter, SmartRecommendations,
     PersianDateUtils, logger
 )
+from invoice_export import InvoiceBatchExporter
+from update_dedup import UpdateDeduplicator
+from idempotency import IdempotencyGuard
+from db_profiler import QueryProfiler
+from query_cache import QueryCache
+from traffic_recorder import TrafficRecorder
+from loop_monitor import LoopMonitor
+from availability import AvailabilityIndex, Crew, parse_event_date, parse_event_time
+from crew_scheduler import format_schedule, schedule_reservations
+from date_picker import DatePicker
+from wizard import BookingWizard
+from webapp import WEBAPP_BOOKINGS, WEBAPP_REJECTED, parse_submission
+from search_index import INLINE_QUERIES, ReservationSearchIndex
+from logging_setup import setup_logging
+import metrics
+import profiling
 from config import config
 
 # Bot Configuration
@@ -49,14 +66,79 @@ MAIN_ADMIN_ID = config.MAIN_ADMIN_ID
 class MandaniStudioBot:
     """کلاس اصلی ربات استودیو ماندنی"""
     
+    EVENT_DATE_PROMPT = "📅 لطفاً روز مراسم را از تقویم انتخاب کنید (یا تایپ کنید، مثال: ۱۴۰۳/۰۸/۱۵):"
+    
     def __init__(self):
         """راه‌اندازی ربات"""
-        self.db = DatabaseManager()
-        self.pdf_generator = PDFGenerator()
+        profiler = QueryProfiler(config.DB_SLOW_QUERY_MS) if config.DB_PROFILE else None
+        cache = QueryCache(config.DB_CACHE_SIZE, config.DB_CACHE_TTL)
+        self.db = DatabaseManager(
+            config.DATABASE_PATH, profiler=profiler, cache=cache, storage_profile=config.DB_STORAGE_PROFILE
+        )
+        self._pdf_generator = None  # در اولین استفاده ساخته می‌شود (reportlab سنگین است)
         
         # اضافه کردن ادمین اصلی
         self.db.add_admin(MAIN_ADMIN_ID, "main_admin", "ادمین اصلی", MAIN_ADMIN_ID)
         
+        # ایندکس ظرفیت رزروها؛ با هر ایجاد رزرو یا تغییر وضعیت به‌روز می‌شود
+        self.availability = AvailabilityIndex(
+            Crew(config.STUDIO_PHOTOGRAPHERS, config.STUDIO_CAMERAS, config.STUDIO_DRONES),
+            buffer_minutes=config.BOOKING_BUFFER_MINUTES,
+            default_minutes=config.BOOKING_DEFAULT_HOURS * 60,
+            day_start_hour=config.BOOKING_DAY_START_HOUR,
+            day_end_hour=config.BOOKING_DAY_END_HOUR
+        )
+        self.availability.load(self.db)
+        self.db.add_write_listener(self.availability.on_reservation_changed)
+        # ایندکس پیشوندی جستجوی inline ادمین‌ها (کد رزرو، نام مشتری، شماره تلفن)
+        self.search_index = ReservationSearchIndex()
+        self.search_index.load(self.db)
+        self.db.add_write_listener(self.search_index.on_reservation_changed)
+        self.date_picker = DatePicker(self.availability, config.DATE_PICKER_MONTHS_AHEAD)
+        self.wizard = BookingWizard(
+            self.get_progress_indicator,
+            enabled=config.BOOKING_WIZARD,
+            delete_input=config.WIZARD_DELETE_INPUT,
+            delete_batch=config.WIZARD_DELETE_BATCH,
+        )
+        
+        # حذف update های تکراری (ارسال مجدد webhook و راه‌اندازی مجدد)
+        self.update_dedup = UpdateDeduplicator(
+            self.db,
+            window_size=config.UPDATE_DEDUP_WINDOW,
+            persist_every=config.UPDATE_DEDUP_PERSIST_EVERY
+        )
+        
+        # جلوگیری از اجرای دوباره callback های دارای اثر جانبی (دابل‌کلیک)
+        self.idempotency = IdempotencyGuard(window_seconds=config.IDEMPOTENCY_WINDOW_SECONDS)
+        
+        # ضبط ترافیک ورودی برای بازپخش (روشن/خاموش در حین اجرا با /record)
+        self.traffic_recorder = TrafficRecorder(
+            config.TRAFFIC_RECORD_DIR,
+            max_bytes=config.TRAFFIC_RECORD_MAX_SIZE * 1024 * 1024,
+            backup_count=config.TRAFFIC_RECORD_BACKUP_COUNT,
+            scrub=[option.strip() for option in config.TRAFFIC_SCRUB.split(',') if option.strip()]
+        )
+        if config.TRAFFIC_RECORD:
+            self.traffic_recorder.start()
+        
+        # پایش تأخیر event loop (پس از شروع loop در post_init فعال می‌شود)
+        self.loop_monitor = LoopMonitor(
+            threshold_ms=config.LOOP_LAG_THRESHOLD_MS,
+            buffer_size=config.LOOP_STALL_BUFFER
+        )
+        # سرور /health، /metrics و /webapp/ در حالت polling (در post_init ساخته می‌شود)
+        self.health_server = None
+        
+        # متریک‌ها: پوشاندن handler ها پیش از ثبت در Application
+        metrics.instrument_bot(self)
+        metrics.registry.counter(
+            'mandani_duplicate_updates_total', 'Updates dropped by update_id de-duplication'
+        ).set_function(lambda: self.update_dedup.duplicate_count)
+        metrics.registry.counter(
+            'mandani_idempotent_suppressed_total', 'Side-effecting callbacks suppressed as duplicates'
+        ).set_function(lambda: self.idempotency.suppressed_count)
+        
         # ذخیره اطلاعات موقت کاربران
         self.user_data = {}
         self.reservation_drafts = {}  # ذخیره پیش‌نویس رزروها
@@ -206,6 +288,7 @@ class MandaniStudioBot:
                 InlineKeyboardButton("👨‍💼 افزودن ادمین", callback_data="admin_add_admin"),
                 InlineKeyboardButton("💾 پشتیبان‌گیری", callback_data="admin_backup")
             ],
+            [InlineKeyboardButton("📦 فاکتورهای ماه جاری", callback_data="admin_export_invoices")],
             [InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")]
         ]
         return InlineKeyboardMarkup(keyboard)
@@ -298,6 +381,8 @@ class MandaniStudioBot:
         
         user_id = query.from_user.id
         data = query.data
+        # پیام دارای دکمه، پیام ویزارد رزرو است (حالت تک‌پیامی)
+        self.wizard.attach(context, query.message)
         
         # بررسی محدودیت نرخ
         if not self.db.check_rate_limit(user_id, "button_click", 30, 1):
@@ -306,6 +391,7 @@ class MandaniStudioBot:
         
         # منوی اصلی
         if data == "back_to_main":
+            self.wizard.finish(context, query.message.chat_id)
             is_admin = self.db.is_admin(user_id)
             await query.edit_message_text(
                 "🏠 منوی اصلی:",
@@ -314,7 +400,7 @@ class MandaniStudioBot:
         
         # رزرو جدید
         elif data == "new_reservation":
-            await self.start_new_reservation(query, context)
+            return await self.start_new_reservation(query, context)
         
         # جستجوی رزرو
         elif data == "search_reservation":
@@ -380,10 +466,8 @@ class MandaniStudioBot:
                 # برای سایر خدمات، مستقیم به تاریخ مراسم برو
                 await query.edit_message_text(
                     f"{self.get_progress_indicator('event_details')}\n"
-                    f"🎬 **{service_name}**\n\n📅 لطفاً تاریخ مراسم را وارد کنید (فرمت: ۱۴۰۳/۰۸/۱۵):",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
-                    ]]),
+                    f"🎬 **{service_name}**\n\n{self.EVENT_DATE_PROMPT}",
+                    reply_markup=self.date_picker.keyboard(),
                     parse_mode=ParseMode.MARKDOWN
                 )
                 context.user_data['state'] = WAITING_EVENT_DATE
@@ -415,7 +499,14 @@ class MandaniStudioBot:
         
         # سایر callback ها
         else:
-            await self.handle_other_callbacks(query, context, data)
+            return await self.handle_other_callbacks(query, context, data)
+    
+    @property
+    def pdf_generator(self) -> PDFGenerator:
+        """تولیدکننده PDF فاکتور (ساخت با تأخیر)"""
+        if self._pdf_generator is None:
+            self._pdf_generator = PDFGenerator()
+        return self._pdf_generator
     
     def get_progress_indicator(self, current_step: str) -> str:
         """نمایش progress indicator برای کاربر"""
@@ -503,9 +594,8 @@ class MandaniStudioBot:
         # بر اساس state، کاربر را به نقطه مناسب هدایت کن
         if state == WAITING_EVENT_DATE:
             await query.edit_message_text(
-                f"{self.get_progress_indicator('event_details')}\n"
-                "📅 لطفاً تاریخ مراسم را وارد کنید (فرمت: ۱۴۰۳/۰۸/۱۵):",
-                reply_markup=self.get_navigation_keyboard(),
+                f"{self.get_progress_indicator('event_details')}\n{self.EVENT_DATE_PROMPT}",
+                reply_markup=self.date_picker.keyboard(),
                 parse_mode=ParseMode.MARKDOWN
             )
             return WAITING_EVENT_DATE
@@ -586,6 +676,8 @@ class MandaniStudioBot:
                 reply_markup=self.get_service_type_keyboard(),
                 parse_mode=ParseMode.MARKDOWN
             )
+            context.user_data['state'] = WAITING_SERVICE_TYPE
+            return WAITING_SERVICE_TYPE
         else:
             # کاربر جدید - دریافت اطلاعات
             await query.edit_message_text(
@@ -596,6 +688,7 @@ class MandaniStudioBot:
                 ]]),
                 parse_mode=ParseMode.MARKDOWN
             )
+            context.user_data['state'] = WAITING_NAME
             return WAITING_NAME
     
     # REMOVED: handle_service_selection - moved to button_callback
@@ -648,7 +741,15 @@ class MandaniStudioBot:
             await self.show_pending_reservations(query, context)
         
         elif data == "admin_backup":
-            await self.create_backup(query, context)
+            key = self.get_admin_action_key(query, data)
+            await self.idempotency.run(key, self.create_backup, query, context)
+        
+        elif data == "admin_export_invoices":
+            start_date, end_date = self.get_export_date_range([])
+            key = self.get_admin_action_key(query, data)
+            await self.idempotency.run(
+                key, self.export_invoices, query.message, context, user_id, start_date, end_date
+            )
         
         elif data == "admin_add_admin":
             await query.edit_message_text(
@@ -660,6 +761,13 @@ class MandaniStudioBot:
             )
             return WAITING_ADMIN_USERNAME
     
+    def get_admin_action_key(self, query, data: str) -> str:
+        """کلید idempotency عملیات ادمین (با زمان آخرین ویرایش پیام، تا درخواست بعدی مجاز باشد)"""
+        message = query.message
+        return self.idempotency.make_key(
+            query.from_user.id, data, {'edit_date': message.edit_date}, message.message_id
+        )
+    
     async def show_statistics(self, query, context):
         """نمایش آمار"""
         stats = self.db.get_statistics()
@@ -801,6 +909,51 @@ class MandaniStudioBot:
         
         return ConversationHandler.END
     
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """جستجوی inline رزرو برای ادمین‌ها (‎@bot کد، نام یا شماره تلفن) از ایندکس درون حافظه"""
+        inline_query = update.inline_query
+        
+        # نتایج شخصی هستند (is_personal) تا cache تلگرام پاسخ ادمین را به کاربر دیگری نشان ندهد
+        if not self.db.is_admin(inline_query.from_user.id):
+            INLINE_QUERIES.inc(result='denied')
+            await inline_query.answer([], cache_time=config.INLINE_CACHE_TIME, is_personal=True)
+            return
+        
+        try:
+            offset = int(inline_query.offset or 0)
+        except ValueError:
+            offset = 0
+        entries, next_offset = self.search_index.search(inline_query.query, offset, config.INLINE_PAGE_SIZE)
+        INLINE_QUERIES.inc(result='hit' if entries else 'miss')
+        
+        statuses = {'pending': ('⏳', 'در انتظار'), 'confirmed': ('✅', 'تأیید شده'), 'canceled': ('❌', 'لغو شده')}
+        results = []
+        for entry in entries:
+            service_name = CostCalculator.get_service_name(entry.service_type)
+            status_emoji, status_text = statuses.get(entry.status, ('❔', entry.status))
+            event_date = PersianDateUtils.english_to_persian_digits(entry.event_date or 'نامشخص')
+            results.append(InlineQueryResultArticle(
+                id=entry.code,
+                title=f"{status_emoji} {entry.code} - {entry.name or 'نامشخص'}",
+                description=f"{service_name} | 📅 {event_date} | 📞 {entry.phone or '-'}",
+                input_message_content=InputTextMessageContent(
+                    f"📋 **رزرو** `{entry.code}`\n\n"
+                    f"🔹 نوع خدمت: {service_name}\n"
+                    f"🔹 نام مشتری: {entry.name or 'نامشخص'}\n"
+                    f"🔹 شماره تماس: {entry.phone or 'نامشخص'}\n"
+                    f"🔹 تاریخ مراسم: {event_date}\n"
+                    f"🔹 وضعیت: {status_emoji} {status_text}",
+                    parse_mode=ParseMode.MARKDOWN
+                )
+            ))
+        
+        await inline_query.answer(
+            results,
+            cache_time=config.INLINE_CACHE_TIME,
+            is_personal=True,
+            next_offset=str(next_offset) if next_offset is not None else ''
+        )
+    
     async def handle_name_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """مدیریت ورودی نام"""
         user_id = update.effective_user.id
@@ -808,7 +961,8 @@ class MandaniStudioBot:
         
         # اعتبارسنجی نام
         if not ValidationUtils.validate_persian_text(name, 2, 50):
-            await update.message.reply_text(
+            await self.wizard.show(
+                update, context, 'personal_info',
                 "❌ نام نامعتبر است!\n\n"
                 "� **شرایط نام:**\n"
                 "• حداقل ۲ کاراکتر\n"
@@ -830,7 +984,8 @@ class MandaniStudioBot:
         # ذخیره پیش‌نویس
         self.save_reservation_draft(user_id, WAITING_FAMILY_NAME)
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'personal_info',
             f"✅ نام ثبت شد: **{name}**\n\n👨‍👩‍👧‍👦 لطفاً نام خانوادگی خود را وارد کنید:",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 انصراف", callback_data="back_to_main")
@@ -847,12 +1002,13 @@ class MandaniStudioBot:
         family_name = update.message.text.strip()
         
         if len(family_name) < 2:
-            await update.message.reply_text("❌ لطفاً نام خانوادگی خود را وارد کنید (حداقل ۲ کاراکتر)")
+            await self.wizard.show(update, context, 'personal_info', "❌ لطفاً نام خانوادگی خود را وارد کنید (حداقل ۲ کاراکتر)")
             return WAITING_FAMILY_NAME
         
         self.user_data[user_id]['family_name'] = family_name
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'personal_info',
             f"✅ نام خانوادگی ثبت شد: {family_name}\n\n📱 لطفاً شماره تلفن خود را وارد کنید:",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
@@ -868,14 +1024,16 @@ class MandaniStudioBot:
         phone = update.message.text.strip()
         
         if not ValidationUtils.validate_phone(phone):
-            await update.message.reply_text(
+            await self.wizard.show(
+                update, context, 'personal_info',
                 "❌ شماره تلفن نامعتبر است!\n\nلطفاً شماره تلفن صحیح وارد کنید:\n• موبایل: ۰۹۱۲۳۴۵۶۷۸۹\n• تلفن ثابت: ۰۲۱۱۲۳۴۵۶۷۸"
             )
             return WAITING_PHONE
         
         self.user_data[user_id]['phone'] = phone
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'personal_info',
             "✅ شماره تلفن ثبت شد!\n\n📧 لطفاً ایمیل خود را وارد کنید (اختیاری - برای رد کردن /skip بنویسید):",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("⏭️ رد کردن", callback_data="skip_email"),
@@ -894,7 +1052,7 @@ class MandaniStudioBot:
         if email.lower() == '/skip':
             email = None
         elif not ValidationUtils.validate_email(email):
-            await update.message.reply_text("❌ ایمیل نامعتبر است! لطفاً ایمیل صحیح وارد کنید یا /skip بنویسید.")
+            await self.wizard.show(update, context, 'personal_info', "❌ ایمیل نامعتبر است! لطفاً ایمیل صحیح وارد کنید یا /skip بنویسید.")
             return WAITING_EMAIL
         
         self.user_data[user_id]['email'] = email
@@ -909,7 +1067,8 @@ class MandaniStudioBot:
                 email=email
             )
             
-            await update.message.reply_text(
+            await self.wizard.show(
+                update, context, 'service_type',
                 f"{self.get_progress_indicator('service_type')}\n"
                 f"✅ اطلاعات شما ثبت شد!\n\n🎬 حالا لطفاً نوع خدمت مورد نظرتان را انتخاب کنید:",
                 reply_markup=self.get_service_type_keyboard(),
@@ -921,7 +1080,8 @@ class MandaniStudioBot:
             
         except Exception as e:
             logger.error(f"خطا در ثبت مشتری: {e}")
-            await update.message.reply_text("❌ خطا در ثبت اطلاعات! لطفاً دوباره تلاش کنید.")
+            await self.wizard.show(update, context, 'personal_info', "❌ خطا در ثبت اطلاعات! لطفاً دوباره تلاش کنید.")
+            self.wizard.finish(context, update.effective_chat.id)
             return ConversationHandler.END
     
     async def handle_bride_name_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -930,12 +1090,13 @@ class MandaniStudioBot:
         bride_name = update.message.text.strip()
         
         if len(bride_name) < 2:
-            await update.message.reply_text("❌ لطفاً نام عروس را وارد کنید (حداقل ۲ کاراکتر)")
+            await self.wizard.show(update, context, 'event_details', "❌ لطفاً نام عروس را وارد کنید (حداقل ۲ کاراکتر)")
             return WAITING_BRIDE_NAME
         
         self.user_data[user_id]['bride_name'] = bride_name
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'event_details',
             f"✅ نام عروس ثبت شد: {bride_name}\n\n👥 لطفاً تعداد مهمانان را وارد کنید:",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
@@ -954,45 +1115,62 @@ class MandaniStudioBot:
             if guest_count < 1 or guest_count > 10000:
                 raise ValueError("تعداد نامعتبر")
         except ValueError:
-            await update.message.reply_text("❌ لطفاً تعداد مهمانان را به صورت عدد وارد کنید (مثال: 150)")
+            await self.wizard.show(update, context, 'event_details', "❌ لطفاً تعداد مهمانان را به صورت عدد وارد کنید (مثال: 150)")
             return WAITING_GUEST_COUNT
         
         self.user_data[user_id]['guest_count'] = guest_count
         
-        await update.message.reply_text(
-            f"✅ تعداد مهمانان ثبت شد: {guest_count} نفر\n\n📅 لطفاً تاریخ مراسم را وارد کنید (فرمت: ۱۴۰۳/۰۸/۱۵):",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
-            ]])
+        await self.wizard.show(
+            update, context, 'event_details',
+            f"✅ تعداد مهمانان ثبت شد: {guest_count} نفر\n\n{self.EVENT_DATE_PROMPT}",
+            reply_markup=self.date_picker.keyboard()
         )
         
         return WAITING_EVENT_DATE
     
     async def handle_event_date_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """مدیریت ورودی تاریخ مراسم"""
+        """مدیریت ورودی تاریخ مراسم (تایپ شده؛ انتخاب از تقویم در handle_date_picker_callback)"""
         user_id = update.effective_user.id
         event_date = update.message.text.strip()
         
         # اعتبارسنجی تاریخ
         if not ValidationUtils.validate_date(event_date):
-            await update.message.reply_text(
+            await self.wizard.show(
+                update, context, 'event_details',
                 "❌ تاریخ نامعتبر است!\n\n"
                 "📅 **فرمت صحیح:**\n"
                 "• ۱۴۰۳/۰۸/۱۵\n"
                 "• سال/ماه/روز\n"
                 "• از اعداد فارسی استفاده کنید\n"
-                "• سال باید بین ۱۴۰۰ تا ۱۴۱۰ باشد",
+                "• سال باید بین ۱۴۰۰ تا ۱۴۱۰ باشد\n\n"
+                "یا روز را از تقویم انتخاب کنید:",
+                reply_markup=self.date_picker.keyboard(),
                 parse_mode=ParseMode.MARKDOWN
             )
             return WAITING_EVENT_DATE
         
-        self.user_data[user_id]['event_date'] = event_date
+        # بررسی ظرفیت روز
+        day = parse_event_date(event_date)
+        if day is None:
+            await self.wizard.show(
+                update, context, 'event_details',
+                "❌ این تاریخ در تقویم وجود ندارد! لطفاً روز را از تقویم انتخاب کنید:",
+                reply_markup=self.date_picker.keyboard()
+            )
+            return WAITING_EVENT_DATE
         
-        # ذخیره پیش‌نویس
-        self.save_reservation_draft(user_id, WAITING_EVENT_TIME)
+        if self.availability.is_day_full(day):
+            await self.wizard.show(
+                update, context, 'event_details',
+                f"📅 متأسفانه ظرفیت استودیو در تاریخ {event_date} تکمیل است.\n\n"
+                "لطفاً یکی از روزهای آزاد تقویم را انتخاب کنید:",
+                reply_markup=self.date_picker.keyboard()
+            )
+            return WAITING_EVENT_DATE
         
-        await update.message.reply_text(
-            f"✅ تاریخ مراسم ثبت شد: {event_date}\n\n� لطفاً ساعت شروع مراسم را وارد کنید (مثال: ۱۸:۳۰):",
+        await self.wizard.show(
+            update, context, 'event_details',
+            self.accept_event_date(user_id, day),
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
             ]])
@@ -1000,6 +1178,61 @@ class MandaniStudioBot:
         
         return WAITING_EVENT_TIME
     
+    async def handle_date_picker_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """دکمه‌های تقویم: رفتن به ماه دیگر یا انتخاب روز"""
+        query = update.callback_query
+        user_id = query.from_user.id
+        action, value = DatePicker.parse(query.data)
+        self.wizard.attach(context, query.message)
+        
+        if action == 'noop':
+            await query.answer()
+            return WAITING_EVENT_DATE
+        
+        if not self.db.check_rate_limit(user_id, "button_click", 30, 1):
+            await query.answer("⚠️ تعداد درخواست‌های شما بیش از حد مجاز است.", show_alert=True)
+            return WAITING_EVENT_DATE
+        
+        if action == 'month':
+            await query.answer()
+            await query.edit_message_reply_markup(reply_markup=self.date_picker.keyboard(*value))
+            return WAITING_EVENT_DATE
+        
+        # ممکن است روز پس از نمایش تقویم تکمیل شده باشد
+        if not self.date_picker.is_selectable(value):
+            year, month, _ = PersianDateUtils.gregorian_to_jalali(value)
+            await query.answer("📅 این روز دیگر قابل انتخاب نیست (گذشته یا تکمیل)؛ روز دیگری انتخاب کنید.",
+                               show_alert=True)
+            await query.edit_message_reply_markup(reply_markup=self.date_picker.keyboard(year, month))
+            return WAITING_EVENT_DATE
+        
+        await query.answer()
+        await query.edit_message_text(
+            self.accept_event_date(user_id, value),
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
+            ]])
+        )
+        return WAITING_EVENT_TIME
+    
+    def accept_event_date(self, user_id: int, day) -> str:
+        """ثبت تاریخ مراسم معتبر و متن درخواست ساعت"""
+        # ذخیره به قالب استاندارد (ارقام فارسی با صفر پیشرو)
+        event_date = PersianDateUtils.format_jalali_date(day)
+        self.user_data[user_id]['event_date'] = event_date
+        
+        # ذخیره پیش‌نویس
+        self.save_reservation_draft(user_id, WAITING_EVENT_TIME)
+        
+        busy_note = ""
+        if self.availability.day_bookings(day):
+            busy_note = (
+                "\n\n🕐 بازه‌های آزاد این روز: "
+                f"{self.availability.format_free_windows(day, self.availability.required_crew({}))}"
+            )
+        
+        return f"✅ تاریخ مراسم ثبت شد: {event_date}{busy_note}\n\n🕐 لطفاً ساعت شروع مراسم را وارد کنید (مثال: ۱۸:۳۰):"
+    
     async def handle_event_time_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """مدیریت ورودی زمان مراسم"""
         user_id = update.effective_user.id
@@ -1007,7 +1240,8 @@ class MandaniStudioBot:
         
         # اعتبارسنجی زمان
         if not ValidationUtils.validate_time(event_time):
-            await update.message.reply_text(
+            await self.wizard.show(
+                update, context, 'event_details',
                 "❌ زمان نامعتبر است!\n\n"
                 "🕐 **فرمت‌های صحیح:**\n"
                 "• ۱۸:۳۰ (24 ساعته)\n"
@@ -1019,12 +1253,28 @@ class MandaniStudioBot:
             )
             return WAITING_EVENT_TIME
         
+        # بررسی تداخل با مدت پیش‌فرض (مدت و تجهیزات در مراحل بعد مشخص می‌شوند)
+        day = parse_event_date(self.user_data[user_id].get('event_date'))
+        start_minutes = parse_event_time(event_time)
+        if day and start_minutes is not None:
+            crew = self.availability.required_crew(self.user_data[user_id])
+            start, end = self.availability.event_window(day, start_minutes, None)
+            if not self.availability.check(start, end, crew).fits:
+                await self.wizard.show(
+                    update, context, 'event_details',
+                    f"⏰ این ساعت با مراسم دیگری تداخل دارد.\n\n"
+                    f"🕐 بازه‌های آزاد این روز: {self.availability.format_free_windows(day, crew)}\n\n"
+                    "لطفاً ساعت دیگری وارد کنید:"
+                )
+                return WAITING_EVENT_TIME
+        
         self.user_data[user_id]['event_time'] = event_time
         
         # ذخیره پیش‌نویس
         self.save_reservation_draft(user_id, WAITING_LOCATION)
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'event_details',
             f"✅ زمان شروع مراسم ثبت شد: {event_time}\n\n📍 لطفاً مکان مراسم را وارد کنید:",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")
@@ -1039,12 +1289,13 @@ class MandaniStudioBot:
         location = update.message.text.strip()
         
         if len(location) < 3:
-            await update.message.reply_text("❌ لطفاً مکان مراسم را به طور کامل وارد کنید")
+            await self.wizard.show(update, context, 'event_details', "❌ لطفاً مکان مراسم را به طور کامل وارد کنید")
             return WAITING_LOCATION
         
         self.user_data[user_id]['location'] = location
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'event_details',
             f"✅ مکان مراسم ثبت شد: {location}\n\n⏱️ لطفاً مدت زمان مراسم را وارد کنید (مثال: ۴ ساعت):",
             reply_markup=InlineKeyboardMarkup([
                 [
@@ -1072,12 +1323,13 @@ class MandaniStudioBot:
         
         # اگر کاربر متن وارد کرده، اعتبارسنجی کن
         if len(duration) < 2:
-            await update.message.reply_text("❌ لطفاً مدت زمان مراسم را وارد کنید (مثال: ۴ ساعت)")
+            await self.wizard.show(update, context, 'event_details', "❌ لطفاً مدت زمان مراسم را وارد کنید (مثال: ۴ ساعت)")
             return WAITING_DURATION
         
         self.user_data[user_id]['duration'] = duration
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'event_details',
             f"✅ مدت زمان مراسم ثبت شد: {duration}\n\n📝 آیا درخواست یا نیاز خاصی دارید؟ (اختیاری)",
             reply_markup=InlineKeyboardMarkup([
                 [
@@ -1096,7 +1348,8 @@ class MandaniStudioBot:
         
         self.user_data[user_id]['special_requests'] = special_requests
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'technical_specs',
             f"✅ درخواست‌های خاص ثبت شد: {special_requests}\n\n📷 لطفاً تعداد دوربین مورد نظر را انتخاب کنید:",
             reply_markup=self.get_number_keyboard(1, 5, "cameras")
         )
@@ -1110,7 +1363,8 @@ class MandaniStudioBot:
         
         self.user_data[user_id]['camera_quality'] = quality
         
-        await update.message.reply_text(
+        await self.wizard.show(
+            update, context, 'technical_specs',
             f"✅ کیفیت دوربین ثبت شد: {quality}\n\n🚁 آیا نیاز به هلی‌شات دارید؟",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("بله ✅", callback_data="helishot_yes"),
@@ -1244,11 +1498,18 @@ class MandaniStudioBot:
         
         # رد کردن ایمیل
         elif data == "skip_email":
-            await self.handle_email_skip(query, context)
+            key = self.idempotency.make_key(
+                user_id, data, self.user_data.get(user_id), query.message.message_id
+            )
+            await self.idempotency.run(key, self.handle_email_skip, query, context)
             
-        # تایید نهایی رزرو
+        # تایید نهایی رزرو (کلید بر اساس پیش‌نویس و پیام، تا دابل‌کلیک دو رزرو نسازد)
         elif data == "confirm_reservation":
-            await self.calculate_and_show_cost(query, context, user_id)
+            key = self.idempotency.make_key(
+                user_id, data, self.user_data.get(user_id), query.message.message_id
+            )
+            await self.idempotency.run(key, self.calculate_and_show_cost, query, context, user_id)
+            self.wizard.finish(context, query.message.chat_id)
             
         # ویرایش اطلاعات
         elif data == "edit_reservation_info":
@@ -1349,10 +1610,21 @@ class MandaniStudioBot:
             parse_mode=ParseMode.MARKDOWN
         )
     
-    async def calculate_and_show_cost(self, query, context, user_id):
-        """محاسبه و نمایش هزینه"""
+    async def calculate_and_show_cost(self, query, context, user_id) -> Optional[str]:
+        """محاسبه و نمایش هزینه (بازگشت: کد رزرو ایجاد شده)"""
         user_data = self.user_data[user_id]
         
+        # بررسی نهایی ظرفیت با مدت و تجهیزات انتخاب شده
+        shortage = self.get_capacity_shortage_text(user_data)
+        if shortage:
+            await query.edit_message_text(
+                shortage + "\n\nلطفاً با پشتیبانی تماس بگیرید یا رزرو جدیدی با زمان دیگر ثبت کنید.",
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton("🔙 منوی اصلی", callback_data="back_to_main")
+                ]])
+            )
+            return None
+        
         # محاسبه هزینه
         cost_breakdown = CostCalculator.calculate_service_cost(
             user_data['service_type'],
@@ -1372,25 +1644,12 @@ class MandaniStudioBot:
                 event_date=user_data.get('event_date'),
                 event_time=user_data.get('event_time'),
                 location=user_data.get('location'),
-                total_cost=cost_breakdown['total']
+                total_cost=cost_breakdown.total
             )
             
             # نمایش هزینه و فاکتور
-            cost_text = MessageFormatter.format_cost_breakdown(cost_breakdown)
-            cost_text += f"\n\n📋 **کد رزرو شما: `{reservation_code}`**\n\n"
-            cost_text += "💳 برای تکمیل رزرو، لطفاً بیعانه را پرداخت کنید:"
-            
-            keyboard = [
-                [InlineKeyboardButton("💰 پرداخت بیعانه", callback_data=f"payment_{reservation_code}")],
-                [InlineKeyboardButton("📄 دانلود فاکتور", callback_data=f"invoice_{reservation_code}")],
-                [InlineKeyboardButton("🔙 منوی اصلی", callback_data="back_to_main")]
-            ]
-            
-            await query.edit_message_text(
-                cost_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode=ParseMode.MARKDOWN
-            )
+            cost_text, keyboard = self.get_cost_message(cost_breakdown, reservation_code)
+            await query.edit_message_text(cost_text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
             
             # ثبت لاگ
             self.db.log_action(user_id, "reservation_created", reservation_code)
@@ -1398,9 +1657,117 @@ class MandaniStudioBot:
             # ارسال نوتیفیکیشن به ادمین‌ها
             await self.send_admin_notification(user_data, reservation_code, context)
             
+            return reservation_code
+            
         except Exception as e:
             logger.error(f"خطا در ایجاد رزرو: {e}")
             await query.edit_message_text("❌ خطا در ایجاد رزرو! لطفاً دوباره تلاش کنید.")
+            return None
+    
+    def get_capacity_shortage_text(self, user_data: Dict) -> Optional[str]:
+        """بررسی ظرفیت با تاریخ، ساعت، مدت و تجهیزات رزرو (None = ظرفیت کافی است)"""
+        day = parse_event_date(user_data.get('event_date'))
+        if not day:
+            return None
+        start, end = self.availability.event_window(
+            day, parse_event_time(user_data.get('event_time')), user_data.get('duration')
+        )
+        availability = self.availability.check(start, end, self.availability.required_crew(user_data))
+        if availability.fits:
+            return None
+        remaining = availability.remaining
+        return (
+            "⚠️ متأسفانه ظرفیت استودیو در این زمان برای تجهیزات انتخاب شده کافی نیست.\n\n"
+            f"👥 عکاس آزاد: {PersianDateUtils.english_to_persian_digits(str(max(remaining.photographers, 0)))}\n"
+            f"📷 دوربین آزاد: {PersianDateUtils.english_to_persian_digits(str(max(remaining.cameras, 0)))}\n"
+            f"🚁 هلی‌شات: {'آزاد' if remaining.drones > 0 else 'رزرو شده'}"
+        )
+    
+    def get_cost_message(self, cost_breakdown, reservation_code: str) -> tuple:
+        """متن هزینه و کیبورد پرداخت یک رزرو ثبت شده"""
+        cost_text = MessageFormatter.format_cost_breakdown(cost_breakdown)
+        cost_text += f"\n\n📋 **کد رزرو شما: `{reservation_code}`**\n\n"
+        cost_text += "💳 برای تکمیل رزرو، لطفاً بیعانه را پرداخت کنید:"
+        
+        keyboard = [
+            [InlineKeyboardButton("💰 پرداخت بیعانه", callback_data=f"payment_{reservation_code}")],
+            [InlineKeyboardButton("📄 دانلود فاکتور", callback_data=f"invoice_{reservation_code}")],
+            [InlineKeyboardButton("🔙 منوی اصلی", callback_data="back_to_main")]
+        ]
+        return cost_text, InlineKeyboardMarkup(keyboard)
+    
+    async def book_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """دستور /book: باز کردن فرم رزرو Mini App (تمام اطلاعات در یک مرحله)"""
+        if not config.WEBAPP_URL:
+            await update.message.reply_text(
+                "📝 فرم رزرو آنلاین فعال نیست؛ لطفاً از منوی اصلی گزینه «رزرو جدید» را انتخاب کنید.",
+                reply_markup=self.get_main_menu_keyboard(self.db.is_admin(update.effective_user.id))
+            )
+            return
+        
+        # sendData فقط برای Mini App باز شده از دکمه کیبورد معمولی (نه inline) کار می‌کند
+        await update.message.reply_text(
+            "📝 برای ثبت رزرو، فرم زیر را باز کنید و همه اطلاعات را یکجا وارد کنید:",
+            reply_markup=ReplyKeyboardMarkup(
+                [[KeyboardButton("📝 فرم رزرو", web_app=WebAppInfo(config.WEBAPP_URL))]],
+                resize_keyboard=True,
+                one_time_keyboard=True
+            )
+        )
+    
+    async def handle_web_app_data(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """دریافت فرم Mini App: بررسی امضا، اعتبارسنجی و قیمت‌گذاری یکجا و ثبت در یک تراکنش"""
+        message = update.effective_message
+        user_id = update.effective_user.id
+        
+        booking, cost_breakdown, errors = parse_submission(
+            message.web_app_data.data, BOT_TOKEN, user_id, config.WEBAPP_AUTH_MAX_AGE
+        )
+        if errors:
+            WEBAPP_REJECTED.inc()
+            await message.reply_text(
+                "❌ فرم رزرو ثبت نشد:\n" + "\n".join(f"• {error}" for error in errors)
+                + "\n\nلطفاً فرم را دوباره باز کرده و اصلاح کنید (/book)."
+            )
+            return
+        
+        # ارسال دوباره همان فرم (دابل‌کلیک یا ارسال مجدد) رزرو دوم نمی‌سازد
+        key = self.idempotency.make_key(user_id, "web_app_booking", booking)
+        await self.idempotency.run(key, self.create_web_app_booking, message, context, user_id, booking, cost_breakdown)
+    
+    async def create_web_app_booking(self, message, context, user_id: int, booking: Dict,
+                                     cost_breakdown) -> Optional[str]:
+        """ثبت رزرو فرم Mini App (بازگشت: کد رزرو ایجاد شده)"""
+        shortage = self.get_capacity_shortage_text(booking)
+        if shortage:
+            WEBAPP_REJECTED.inc()
+            await message.reply_text(shortage + "\n\nلطفاً زمان دیگری را در فرم انتخاب کنید (/book).")
+            return None
+        
+        reservation_code = ReservationCodeGenerator.generate_code()
+        try:
+            self.db.create_booking(
+                telegram_id=user_id,
+                customer={
+                    'name': f"{booking['name']} {booking['family_name']}",
+                    'phone': booking['phone'],
+                    'email': booking.get('email'),
+                },
+                reservation_code=reservation_code,
+                service_type=booking['service_type'],
+                service_details=booking,
+                total_cost=cost_breakdown.total
+            )
+        except Exception as e:
+            logger.error(f"خطا در ایجاد رزرو Mini App: {e}")
+            await message.reply_text("❌ خطا در ایجاد رزرو! لطفاً دوباره تلاش کنید.")
+            return None
+        
+        WEBAPP_BOOKINGS.inc()
+        cost_text, keyboard = self.get_cost_message(cost_breakdown, reservation_code)
+        await message.reply_text(cost_text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
+        await self.send_admin_notification(booking, reservation_code, context)
+        return reservation_code
     
     async def show_reservation_details(self, query, context, reservation_code):
         """نمایش جزئیات رزرو"""
@@ -1496,6 +1863,104 @@ class MandaniStudioBot:
             logger.error(f"خطا در پشتیبان گیری: {e}")
             await query.edit_message_text("❌ خطا در پشتیبان گیری!")
     
+    def get_export_date_range(self, args: List[str]) -> tuple:
+        """تعیین بازه زمانی خروجی فاکتورها (پیش‌فرض: ماه جاری؛ یک تاریخ = همان روز)"""
+        if len(args) > 2:
+            raise ValueError("حداکثر دو تاریخ")
+        if args:
+            dates = [PersianDateUtils.persian_to_english_digits(arg) for arg in args]
+            # بررسی فرمت تاریخ‌ها (ValueError در صورت نامعتبر بودن)
+            for date in dates:
+                datetime.strptime(date, '%Y-%m-%d')
+            start_date, end_date = dates[0], dates[-1]
+            if start_date > end_date:
+                raise ValueError("تاریخ شروع بعد از تاریخ پایان است")
+            return start_date, end_date
+        
+        today = datetime.now().date()
+        first_day = today.replace(day=1)
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        last_day = next_month - timedelta(days=1)
+        return first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
+    
+    async def export_invoices_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """خروجی گروهی فاکتورها /export_invoices [از] [تا]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        try:
+            start_date, end_date = self.get_export_date_range(context.args or [])
+        except ValueError:
+            await update.message.reply_text("❌ فرمت صحیح: /export_invoices [YYYY-MM-DD] [YYYY-MM-DD]")
+            return
+        
+        status_message = await update.message.reply_text("📦 در حال آماده‌سازی فاکتورها...")
+        await self.export_invoices(status_message, context, user_id, start_date, end_date)
+    
+    async def export_invoices(self, message, context, chat_id: int, start_date: str, end_date: str):
+        """تولید فاکتورهای یک بازه و ارسال به صورت یک فایل ZIP"""
+        back_keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 بازگشت", callback_data="admin_panel")
+        ]])
+        
+        reservations = self.db.get_reservations_by_date_range(start_date, end_date)
+        if not reservations:
+            await message.edit_text(
+                f"📦 هیچ رزروی در بازه {start_date} تا {end_date} یافت نشد.",
+                reply_markup=back_keyboard
+            )
+            return
+        
+        async def report_progress(done: int, failed: int, total: int):
+            text = (
+                "📦 در حال تولید فاکتورها...\n\n"
+                f"{PersianDateUtils.english_to_persian_digits(str(done + failed))} از "
+                f"{PersianDateUtils.english_to_persian_digits(str(total))}"
+            )
+            if failed:
+                text += f"\n⚠️ ناموفق: {PersianDateUtils.english_to_persian_digits(str(failed))}"
+            try:
+                await message.edit_text(text)
+            except Exception:
+                pass  # خطای ویرایش پیام نباید خروجی را متوقف کند
+        
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as f:
+            zip_path = f.name
+        
+        try:
+            exported, failed = await InvoiceBatchExporter().export(reservations, zip_path, report_progress)
+            if not exported:
+                await message.edit_text(
+                    f"❌ تولید هر {PersianDateUtils.english_to_persian_digits(str(failed))} فاکتور ناموفق بود (جزئیات در لاگ).",
+                    reply_markup=back_keyboard
+                )
+                return
+            
+            with open(zip_path, 'rb') as document:
+                await context.bot.send_document(
+                    chat_id=chat_id,
+                    document=document,
+                    filename=f"mandani_invoices_{start_date}_{end_date}.zip",
+                    caption=f"📦 فاکتورهای {start_date} تا {end_date}"
+                )
+            
+            result_text = f"✅ {PersianDateUtils.english_to_persian_digits(str(exported))} فاکتور ارسال شد."
+            if failed:
+                result_text += (
+                    f"\n⚠️ {PersianDateUtils.english_to_persian_digits(str(failed))} فاکتور تولید نشد (جزئیات در لاگ)."
+                )
+            await message.edit_text(result_text, reply_markup=back_keyboard)
+            
+        except Exception as e:
+            logger.error(f"خطا در خروجی فاکتورها: {e}")
+            await message.edit_text("❌ خطا در تولید فاکتورها!", reply_markup=back_keyboard)
+        finally:
+            os.unlink(zip_path)
+    
     async def forward_to_admins(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """ارسال پیام به ادمین‌ها"""
         user = update.effective_user
@@ -1581,6 +2046,188 @@ class MandaniStudioBot:
         except Exception as e:
             await update.message.reply_text(f"❌ خطا در ارسال پیام: {str(e)}")
     
+    def get_profile_seconds(self, args: List[str], default: int, maximum: int) -> int:
+        """مدت پروفایل از آرگومان دستور (محدود به سقف Config)"""
+        seconds = int(PersianDateUtils.persian_to_english_digits(args[0])) if args else default
+        if seconds <= 0:
+            raise ValueError(seconds)
+        return min(seconds, maximum)
+    
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """پروفایل CPU ترافیک زنده و ارسال فایل collapsed-stack /profile [ثانیه]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        try:
+            seconds = self.get_profile_seconds(context.args or [], 10, config.PROFILE_MAX_SECONDS)
+        except ValueError:
+            await update.message.reply_text(f"❌ فرمت صحیح: /profile [ثانیه، حداکثر {config.PROFILE_MAX_SECONDS}]")
+            return
+        
+        if profiling.profile_in_progress():
+            await update.message.reply_text("⏳ یک پروفایل دیگر در حال اجراست.")
+            return
+        
+        self.db.log_action(user_id, "cpu_profile", f"{seconds}s")
+        status_message = await update.message.reply_text(f"🔥 پروفایل CPU به مدت {seconds} ثانیه...")
+        
+        profiler = await profiling.run_cpu_profile(
+            seconds,
+            interval=config.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+            max_overhead=config.PROFILE_MAX_OVERHEAD_PERCENT / 100
+        )
+        
+        top = '\n'.join(f"{count:>5} {label}" for label, count in profiler.top_functions(8))
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            document=profiler.collapsed().encode('utf-8'),
+            filename=f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded",
+            caption=(
+                f"🔥 {profiler.samples} نمونه در {profiler.duration:.1f}s "
+                f"(سربار {profiler.overhead * 100:.1f}%)\n"
+                "قابل باز کردن با speedscope.app یا flamegraph.pl"
+            )
+        )
+        # نام توابع شامل _ هستند؛ بدون parse_mode ارسال می‌شود
+        await status_message.edit_text(f"✅ پروفایل ارسال شد. پرتکرارترین توابع:\n\n{top[:3500]}")
+    
+    async def memsnap_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """تفاوت تخصیص حافظه بین دو snapshot از tracemalloc /memsnap [ثانیه]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        try:
+            seconds = self.get_profile_seconds(context.args or [], 10, config.MEMSNAP_MAX_SECONDS)
+        except ValueError:
+            await update.message.reply_text(f"❌ فرمت صحیح: /memsnap [ثانیه، حداکثر {config.MEMSNAP_MAX_SECONDS}]")
+            return
+        
+        if profiling.profile_in_progress():
+            await update.message.reply_text("⏳ یک پروفایل دیگر در حال اجراست.")
+            return
+        
+        self.db.log_action(user_id, "memory_snapshot", f"{seconds}s")
+        status_message = await update.message.reply_text(f"🧠 ردیابی حافظه به مدت {seconds} ثانیه...")
+        report = await profiling.memory_snapshot_diff(seconds, max_seconds=config.MEMSNAP_MAX_SECONDS)
+        await status_message.edit_text(report[:4000])
+    
+    async def dbprofile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """نمایش پرهزینه‌ترین دستورات SQL /dbprofile [تعداد|reset]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        profiler = self.db.profiler
+        if not profiler:
+            await update.message.reply_text("⚠️ پروفایل پایگاه داده غیرفعال است (DB_PROFILE=true را تنظیم کنید).")
+            return
+        
+        args = context.args or []
+        if args and args[0] == 'reset':
+            profiler.reset()
+            await update.message.reply_text("✅ آمار کوئری‌ها پاک شد.")
+            return
+        
+        try:
+            limit = min(int(args[0]), 30) if args else 10
+        except ValueError:
+            await update.message.reply_text("❌ فرمت صحیح: /dbprofile [تعداد|reset]")
+            return
+        
+        report = profiler.format_report(limit)
+        # متن SQL ممکن است شامل کاراکترهای Markdown باشد؛ بدون parse_mode ارسال می‌شود
+        await update.message.reply_text(
+            f"🐢 پرهزینه‌ترین کوئری‌ها:\n\n{report[:3900]}" if report else "📭 هنوز کوئری‌ای ثبت نشده است."
+        )
+    
+    async def record_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """روشن/خاموش کردن ضبط ترافیک /record [on|off|status]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        action = (context.args or ['status'])[0].lower()
+        if action == 'on':
+            self.traffic_recorder.start()
+        elif action == 'off':
+            self.traffic_recorder.stop()
+        elif action != 'status':
+            await update.message.reply_text("❌ فرمت صحیح: /record [on|off|status]")
+            return
+        
+        self.db.log_action(user_id, "traffic_record", action)
+        # مسیر فایل ممکن است شامل _ باشد؛ بدون parse_mode ارسال می‌شود
+        await update.message.reply_text(self.traffic_recorder.status())
+    
+    async def loopstalls_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """نمایش آخرین توقف‌های event loop /loopstalls [تعداد|reset]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        if not self.loop_monitor.running:
+            await update.message.reply_text("⚠️ پایش event loop غیرفعال است (LOOP_MONITOR=true را تنظیم کنید).")
+            return
+        
+        args = context.args or []
+        if args and args[0] == 'reset':
+            self.loop_monitor.reset()
+            await update.message.reply_text("✅ توقف‌های ثبت شده پاک شد.")
+            return
+        
+        try:
+            limit = min(int(args[0]), 10) if args else 5
+        except ValueError:
+            await update.message.reply_text("❌ فرمت صحیح: /loopstalls [تعداد|reset]")
+            return
+        
+        report = self.loop_monitor.format_report(limit)
+        if not self.loop_monitor.stalls:
+            report += "\n\n📭 توقفی بیش از آستانه ثبت نشده است."
+        # نام فایل‌ها و متدها شامل _ هستند؛ بدون parse_mode ارسال می‌شود
+        await update.message.reply_text(report[:4000])
+    
+    async def crew_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """تخصیص عکاس، دوربین و پهپاد به مراسم‌های یک بازه /crew [از] [تا]"""
+        user_id = update.effective_user.id
+        
+        if not self.db.is_admin(user_id):
+            await update.message.reply_text("❌ شما دسترسی ادمین ندارید!")
+            return
+        
+        args = context.args or []
+        if args:
+            start_day = parse_event_date(args[0])
+            end_day = parse_event_date(args[1]) if len(args) > 1 else start_day
+            if start_day is None or end_day is None or end_day < start_day:
+                await update.message.reply_text("❌ فرمت صحیح: /crew [۱۴۰۳/۰۸/۱۵] [۱۴۰۳/۰۸/۳۰]")
+                return
+        else:
+            # پیش‌فرض: هفت روز آینده
+            start_day = datetime.now().date()
+            end_day = start_day + timedelta(days=6)
+        
+        reservations = self.db.get_reservations_by_date_range(start_day.isoformat(), end_day.isoformat())
+        if not reservations:
+            await update.message.reply_text("📭 هیچ رزرو فعالی در این بازه وجود ندارد.")
+            return
+        
+        schedule = schedule_reservations(reservations, self.availability)
+        report = format_schedule(schedule, self.availability.capacity)
+        await update.message.reply_text(report[:4000])
+    
     def setup_conversation_handler(self):
         """تنظیم ConversationHandler برای رزرو"""
         return ConversationHandler(
@@ -1596,20 +2243,23 @@ class MandaniStudioBot:
                 WAITING_SERVICE_TYPE: [CallbackQueryHandler(self.button_callback)],
                 WAITING_BRIDE_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_bride_name_input)],
                 WAITING_GUEST_COUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_guest_count_input)],
-                WAITING_EVENT_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_event_date_input)],
+                WAITING_EVENT_DATE: [
+                    CallbackQueryHandler(self.handle_date_picker_callback, pattern="^dp:"),
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_event_date_input)
+                ],
                 WAITING_EVENT_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_event_time_input)],
                 WAITING_LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_location_input)],
                 WAITING_DURATION: [
-                    CallbackQueryHandler(self.handle_other_callbacks),
+                    CallbackQueryHandler(self.button_callback),
                     MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_duration_input)
                 ],
                 WAITING_SPECIAL_REQUESTS: [
-                    CallbackQueryHandler(self.handle_other_callbacks),
+                    CallbackQueryHandler(self.button_callback),
                     MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_special_requests_input)
                 ],
-                WAITING_CAMERAS: [CallbackQueryHandler(self.handle_other_callbacks)],
+                WAITING_CAMERAS: [CallbackQueryHandler(self.button_callback)],
                 WAITING_CAMERA_QUALITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_camera_quality_input)],
-                WAITING_HELISHOT: [CallbackQueryHandler(self.handle_other_callbacks)],
+                WAITING_HELISHOT: [CallbackQueryHandler(self.button_callback)],
                 WAITING_SEARCH_QUERY: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_search_query)],
                 WAITING_ADMIN_USERNAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_admin_username_input)],
             },
@@ -1679,7 +2329,7 @@ class MandaniStudioBot:
         """بررسی یادآوری‌های تحویل"""
         # پروژه‌هایی که ۳ روز تا تحویل دارند
         target_date = (datetime.now() + timedelta(days=3)).date()
-        events = self.db.get_reservations_by_date_range(
+        events = self.db.get_reservations_by_delivery_date_range(
             target_date.strftime('%Y-%m-%d'),
             target_date.strftime('%Y-%m-%d')
         )
@@ -1710,21 +2360,52 @@ class MandaniStudioBot:
                 except Exception as e:
                     logger.error(f"خطا در ارسال یادآوری تحویل: {e}")
     
-    def run(self, webhook_mode=False):
-        """اجرای ربات"""
+    def build_application(self, update_queue: asyncio.Queue = None, use_updater: bool = True) -> Application:
+        """
+        ساخت Application و ثبت handler ها
+        
+        Args:
+            update_queue: صف update ها (برای webhook یک صف محدود داده می‌شود)
+            use_updater: در حالت webhook، update ها مستقیم وارد صف می‌شوند
+        """
         # ایجاد Application با JobQueue
         try:
             from telegram.ext import JobQueue
-            application = Application.builder().token(BOT_TOKEN).job_queue(JobQueue()).build()
+            builder = Application.builder().token(BOT_TOKEN).job_queue(JobQueue())
             logger.info("✅ JobQueue فعال شد")
         except ImportError:
-            application = Application.builder().token(BOT_TOKEN).build()
+            builder = Application.builder().token(BOT_TOKEN)
             logger.warning("⚠️ JobQueue در دسترس نیست")
         
+        if config.TELEGRAM_API_BASE_URL:
+            # سرور Bot API محلی (یا سرور جعلی تست بار)
+            builder = builder.base_url(config.TELEGRAM_API_BASE_URL)
+        if update_queue is not None:
+            builder = builder.update_queue(update_queue)
+        if not use_updater:
+            builder = builder.updater(None)
+        
+        application = builder.post_shutdown(self.post_shutdown).build()
+        
+        # ضبط ترافیک (شامل update های تکراری) و سپس حذف تکراری‌ها، پیش از همه handler ها
+        application.add_handler(TypeHandler(Update, self.traffic_recorder.record_update), group=-2)
+        application.add_handler(TypeHandler(Update, self.update_dedup.check_update), group=-1)
+        
         # اضافه کردن handler ها
         application.add_handler(CommandHandler("start", self.start_command))
         application.add_handler(CommandHandler("help", self.help_command))
         application.add_handler(CommandHandler("reply", self.reply_command))
+        # پروفایل‌ها تا پایان مدت منتظر می‌مانند؛ block=False تا پردازش سایر update ها ادامه یابد
+        application.add_handler(CommandHandler("profile", self.profile_command, block=False))
+        application.add_handler(CommandHandler("memsnap", self.memsnap_command, block=False))
+        application.add_handler(CommandHandler("export_invoices", self.export_invoices_command))
+        application.add_handler(CommandHandler("dbprofile", self.dbprofile_command))
+        application.add_handler(CommandHandler("record", self.record_command))
+        application.add_handler(CommandHandler("loopstalls", self.loopstalls_command))
+        application.add_handler(CommandHandler("crew", self.crew_command))
+        application.add_handler(CommandHandler("book", self.book_command))
+        application.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, self.handle_web_app_data))
+        application.add_handler(InlineQueryHandler(self.handle_inline_query))
         application.add_handler(self.setup_conversation_handler())
         application.add_handler(CallbackQueryHandler(self.button_callback))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_message))
@@ -1750,6 +2431,29 @@ class MandaniStudioBot:
         except Exception as e:
             logger.warning(f"⚠️ خطا در تنظیم یادآوری‌ها: {e}")
         
+        return application
+    
+    async def post_init(self, application: Application):
+        """شروع پایش event loop و سرور /health، /metrics و /webapp/ در حالت polling (در صورت تنظیم METRICS_PORT)"""
+        if config.LOOP_MONITOR:
+            self.loop_monitor.start()
+        if config.METRICS_PORT:
+            from webhook import WebhookServer, load_webapp_assets
+            self.health_server = WebhookServer(application, assets=load_webapp_assets())
+            await self.health_server.start(port=config.METRICS_PORT, with_webhook=False)
+            logger.info(f"📈 سرور متریک در پورت {config.METRICS_PORT} شروع شد")
+    
+    async def post_shutdown(self, application: Application):
+        """ذخیره وضعیت و توقف سرور متریک پس از توقف ربات"""
+        self.update_dedup.persist()
+        self.traffic_recorder.stop()
+        await self.loop_monitor.stop()
+        if self.health_server:
+            await self.health_server.stop()
+            self.health_server = None
+    
+    def run(self, webhook_mode=False):
+        """اجرای ربات"""
         logger.info("🚀 ربات استودیو ماندنی شروع به کار کرد...")
         
         if webhook_mode:
@@ -1760,19 +2464,102 @@ class MandaniStudioBot:
                 sys.exit(1)
             
             logger.info(f"🌐 تنظیم webhook: {webhook_url}")
-            application.run_webhook(
-                listen="0.0.0.0",
-                port=int(os.getenv('WEBHOOK_PORT', 8443)),
+            from webhook import run_webhook_server
+            run_webhook_server(
+                self,
                 webhook_url=webhook_url,
-                drop_pending_updates=True
+                port=int(os.getenv('WEBHOOK_PORT', 8443))
             )
         else:
             # شروع polling برای development
-            application.run_polling(drop_pending_updates=True)
+            application = self.build_application()
+            application.post_init = self.post_init
+            application.run_polling(drop_pending_updates=config.DROP_PENDING_UPDATES)
+
+
+def profile_startup(top: int = 15):
+    """نمایش زمان import ماژول‌ها و مراحل راه‌اندازی ربات (python main.py --profile-startup)"""
+    import sqlite3
+    import subprocess
+    import tempfile
+    import time
+    
+    # زمان import در یک پردازه تازه، مانند cold start واقعی
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    # هر ماژول پس از زیرماژول‌هایش چاپ می‌شود؛ import های مستقیم main تورفتگی ۳ دارند
+    children, imports, total_us = [], [], 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        indent = len(name) - len(name.lstrip())
+        if indent == 3:
+            children.append((int(cumulative_us), int(self_us), name.strip()))
+        elif indent == 1:
+            if name.strip() == 'main':
+                imports, total_us = sorted(children, reverse=True), int(cumulative_us)
+            children = []
+    
+    print(f"📦 زمان import main: {total_us / 1000:.1f}ms")
+    print(f"{'module':<40}{'cumulative ms':>15}{'self ms':>10}")
+    for cumulative_us, self_us, name in imports[:top]:
+        print(f"{name:<40}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+    
+    # مراحل راه‌اندازی در همین پردازه
+    phases = []
+    
+    def timed(label, func):
+        start = time.perf_counter()
+        value = func()
+        phases.append((label, (time.perf_counter() - start) * 1000))
+        return value
+    
+    # راه‌اندازی schema را migrate کرده و در پایگاه داده می‌نویسد؛ روی یک کپی موقت اجرا می‌شود
+    database_path = config.DATABASE_PATH
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config.DATABASE_PATH = os.path.join(temp_dir, os.path.basename(database_path))
+        try:
+            if os.path.exists(database_path):
+                source = sqlite3.connect(database_path)
+                target = sqlite3.connect(config.DATABASE_PATH)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+            
+            timed("DatabaseManager (بررسی schema)", lambda: DatabaseManager(config.DATABASE_PATH))
+            bot = timed("MandaniStudioBot.__init__", MandaniStudioBot)
+            if BOT_TOKEN:
+                timed("build_application", bot.build_application)
+            timed("اولین فاکتور PDF (بارگذاری reportlab، خارج از مسیر راه‌اندازی)", lambda: bot.pdf_generator.generate_invoice_pdf(
+                {'reservation_code': 'PROFILE', 'service_type': 'wedding'},
+                CostCalculator.calculate_service_cost('wedding', {})
+            ))
+        finally:
+            config.DATABASE_PATH = database_path
+    
+    print("\n⏱️ مراحل راه‌اندازی:")
+    for label, elapsed in phases:
+        print(f"  {label:<60}{elapsed:>10.1f}ms")
 
 
 def main():
     """تابع اصلی"""
+    setup_logging()
+    
+    if '--profile-startup' in sys.argv[1:]:
+        profile_startup()
+        return
+    
+    if not config.validate():
+        print("⚠️ لطفاً فایل .env را بررسی کنید و تنظیمات ضروری را وارد کنید")
+        sys.exit(1)
+    
     if not BOT_TOKEN or BOT_TOKEN == 'YOUR_BOT_TOKEN_HERE':
         print("❌ لطفاً BOT_TOKEN را در متغیر محیطی تنظیم کنید!")
         sys.exit(1)
@@ -0,0 +1,271 @@
+"""
+📈 ماژول متریک‌های ربات استودیو ماندنی
+Prometheus-style metrics for Mandani Studio Bot
+
+این ماژول شمارنده‌ها، gauge ها و هیستوگرام‌های تأخیر را نگه داشته و
+آنها را با فرمت متنی Prometheus برای مسیر /metrics تولید می‌کند
+"""
+
+import functools
+import inspect
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# مرزهای پیش‌فرض هیستوگرام تأخیر (ثانیه)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    """فرمت عدد برای خروجی Prometheus"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """فرمت برچسب‌ها به صورت {a="b",...}"""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """پایه مشترک متریک‌ها"""
+
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], float]):
+        """مقدار متریک (بدون برچسب) هنگام خروجی از این تابع خوانده می‌شود"""
+        self._function = function
+
+    def header(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.metric_type}',
+        ]
+
+
+class Counter(_Metric):
+    """شمارنده افزایشی"""
+
+    metric_type = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        if self._function is not None:
+            lines.append(f'{self.name} {_format_value(self._function())}')
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """مقدار لحظه‌ای"""
+
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """هیستوگرام با bucket های ثابت"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # به ازای هر ترکیب برچسب: [شمارش هر bucket..., مجموع، تعداد]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bucket_labels = self.labelnames + ('le',)
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(bucket_labels, key + (_format_value(bound),))} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{_format_labels(bucket_labels, key + ("+Inf",))} {state[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    """ثبت و خروجی متریک‌ها"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames=(), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """خروجی همه متریک‌ها با فرمت متنی Prometheus"""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+# رجیستری سراسری
+registry = MetricsRegistry()
+
+HANDLER_LATENCY = registry.histogram(
+    'mandani_handler_duration_seconds', 'Bot handler latency', ('handler', 'prefix')
+)
+HANDLER_CALLS = registry.counter(
+    'mandani_handler_calls_total', 'Bot handler calls', ('handler', 'prefix')
+)
+HANDLER_ERRORS = registry.counter(
+    'mandani_handler_errors_total', 'Bot handler errors', ('handler', 'prefix')
+)
+DB_LATENCY = registry.histogram(
+    'mandani_db_duration_seconds', 'DatabaseManager method latency', ('method',)
+)
+DB_CALLS = registry.counter(
+    'mandani_db_calls_total', 'DatabaseManager method calls', ('method',)
+)
+DB_ERRORS = registry.counter(
+    'mandani_db_errors_total', 'DatabaseManager method errors', ('method',)
+)
+
+# بخش‌های متغیر انتهای callback_data (اعداد، کد رزرو و ...)
+_DYNAMIC_SUFFIX = re.compile(r'_(\d+|[A-Z0-9]{4,}|[0-9a-f]{8,})$')
+
+
+def callback_prefix(data: Optional[str]) -> str:
+    """تبدیل callback_data به پیشوند با تعداد محدود (مثلاً view_reservation_ABC123 → view_reservation)"""
+    if not data:
+        return ''
+    return _DYNAMIC_SUFFIX.sub('', data)
+
+
+def _extract_prefix(args) -> str:
+    """پیدا کردن callback_data از آرگومان‌های handler (Update یا CallbackQuery)"""
+    for arg in args[:1]:
+        query = getattr(arg, 'callback_query', None) or arg
+        data = getattr(query, 'data', None)
+        if isinstance(data, str):
+            return callback_prefix(data)
+    return ''
+
+
+def instrument_handler(func: Callable, name: str) -> Callable:
+    """پوشاندن یک handler async برای ثبت تأخیر، تعداد و خطا"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        prefix = _extract_prefix(args)
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name, prefix=prefix)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, handler=name, prefix=prefix)
+            HANDLER_CALLS.inc(handler=name, prefix=prefix)
+
+    return wrapper
+
+
+def instrument_bot(bot, pattern: str = r'^(button_callback|handle_\w+|\w+_command)$'):
+    """پوشاندن متدهای handler یک نمونه ربات (باید پیش از ثبت handler ها فراخوانی شود)"""
+    matcher = re.compile(pattern)
+    for name, method in inspect.getmembers(type(bot), inspect.iscoroutinefunction):
+        if matcher.match(name):
+            setattr(bot, name, instrument_handler(getattr(bot, name), name))
+    return bot
+
+
+def instrument_db_methods(exclude: Tuple[str, ...] = ()):
+    """دکوراتور کلاس DatabaseManager: ثبت تأخیر، تعداد و خطای همه متدهای عمومی"""
+
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith('_') or name in exclude or not inspect.isfunction(method):
+                continue
+            setattr(cls, name, _instrument_db_method(method, name))
+        return cls
+
+    return decorate
+
+
+def _instrument_db_method(method: Callable, name: str) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.inc(method=name)
+            raise
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - start, method=name)
+            DB_CALLS.inc(method=name)
+
+    return wrapper
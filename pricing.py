@@ -0,0 +1,445 @@
+"""
+💰 ماژول موتور قیمت‌گذاری
+Table-driven pricing engine for Mandani Studio Bot
+
+جدول قیمت (نرخ پایه خدمات، هزینه‌های واحدی اضافی با آستانه رایگان، تخفیف، مالیات و
+بیعانه) یک بار به ساختار فشرده‌ای از tuple ها تبدیل می‌شود و هر محاسبه فقط روی آن
+حلقه می‌زند. جدول از فایل JSON (PRICING_RULES_FILE) خوانده شده و با تغییر mtime فایل
+بدون راه‌اندازی مجدد دوباره بارگذاری می‌شود؛ در نبود فایل DEFAULT_RULES استفاده می‌شود.
+
+نتیجه هر محاسبه یک Quote تغییرناپذیر است. quote() نتایج را در یک cache محدود LRU با
+کلید (نسخه جدول، نوع خدمت، مقادیر فیلدهای قیمت‌گذاری شده) نگه می‌دارد تا صفحه هزینه،
+فاکتور و نماهای ادمین یک breakdown مشترک را استفاده کنند؛ با بارگذاری جدول جدید
+نسخه عوض شده و cache خالی می‌شود.
+
+خروجی جدول پیش‌فرض به عنوان نقطه شروع فایل قیمت:
+    python pricing.py > pricing_rules.json
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import Config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# quote_many پس از این تعداد مورد، اگر کمتر از یک هشتم آنها تکراری بوده باشند، محاسبه
+# تکراری‌ها را کنار می‌گذارد (ساخت کلید برای پیکربندی‌های یکتا فقط سربار است)
+_BATCH_MEMO_PROBE = 128
+
+# نشانه نبود فیلد در کلید cache (متفاوت از هر مقدار واقعی، از جمله None)
+_ABSENT = object()
+
+# جدول قیمت پیش‌فرض (تومان)؛ tax_rate و deposit_percentage با مقدار null از Config خوانده می‌شوند
+DEFAULT_RULES = {
+    'tax_rate': None,
+    'deposit_percentage': None,
+    'unknown_service_name': 'خدمت نامشخص',
+    'services': {
+        'birthday': {'name': 'عکاسی تولد', 'base': 500000},
+        'wedding': {
+            'name': 'عکاسی عروسی',
+            'base': 2000000,
+            'extras': {'photographers': {'included': 2, 'unit_price': 300000}},
+        },
+        'engagement': {'name': 'فیلمبرداری عقد', 'base': 1000000},
+        'general': {'name': 'عکاسی/فیلمبرداری عمومی', 'base': 300000},
+        # سایر: نرخ سفارشی از فیلد custom_cost
+        'other': {'name': 'سایر خدمات', 'base': 0, 'custom_cost_field': 'custom_cost'},
+    },
+    # هزینه‌های اضافی مشترک (به همین ترتیب در فاکتور نمایش داده می‌شوند)؛
+    # هر خدمت می‌تواند در services.<نوع>.extras بخشی از آنها را بازنویسی کند
+    'extras': {
+        'cameras': {
+            'included': 2, 'default': 2, 'unit_price': 100000,
+            'description': 'دوربین اضافی ({count} عدد)',
+        },
+        'helishot': {'flag': True, 'unit_price': 200000, 'description': 'هلی‌شات'},
+        'photographers': {
+            'included': 1, 'default': 1, 'unit_price': 150000,
+            'description': 'عکاس/فیلمبردار اضافی ({count} نفر)',
+        },
+    },
+    'discount': {
+        'field': 'discount_percent',
+        'max_percent': 100,
+        # تخفیف پلکانی: بیشترین پله‌ای که جمع فرعی به آن رسیده (در کنار تخفیف دستی، هر کدام بیشتر باشد)
+        'tiers': [],
+    },
+}
+
+
+class ExtraRule(NamedTuple):
+    """هزینه اضافی کامپایل شده"""
+    field: str
+    default: object
+    included: int
+    unit_price: float
+    description: str
+    flag: bool
+
+
+class ServiceRule(NamedTuple):
+    """خدمت کامپایل شده"""
+    name: str
+    base: float
+    custom_cost_field: Optional[str]
+    extras: Tuple[ExtraRule, ...]
+
+
+class QuoteLine(NamedTuple):
+    """یک سطر فاکتور"""
+    description: str
+    amount: float
+
+
+class Quote(NamedTuple):
+    """تفکیک هزینه یک خدمت (تغییرناپذیر؛ بین صفحه هزینه، فاکتور و نماهای ادمین مشترک است)"""
+    base_service: QuoteLine
+    extras: Tuple[QuoteLine, ...]
+    subtotal: float
+    discount: float
+    tax_rate: float
+    tax: float
+    total: float
+    deposit_percentage: float
+    deposit: float
+    balance: float
+    pricing_version: int
+
+
+class CompiledRules(NamedTuple):
+    """جدول قیمت کامپایل شده (تغییرناپذیر؛ با بارگذاری مجدد کامل جایگزین می‌شود)"""
+    version: int
+    services: Dict[str, ServiceRule]
+    unknown: ServiceRule
+    discount_field: str
+    max_discount: float
+    tier_thresholds: Tuple[float, ...]
+    tier_percents: Tuple[float, ...]
+    tax_rate: float
+    deposit_percentage: float
+
+
+def compile_rules(rules: Dict, version: int = 0) -> CompiledRules:
+    """
+    تبدیل جدول قیمت به ساختار قابل ارزیابی سریع
+
+    Raises:
+        ValueError: جدول نامعتبر
+    """
+    shared = rules.get('extras', {})
+
+    def build_extras(overrides: Dict) -> Tuple[ExtraRule, ...]:
+        extras = []
+        for field in list(shared) + [f for f in overrides if f not in shared]:
+            spec = {**shared.get(field, {}), **overrides.get(field, {})}
+            if 'unit_price' not in spec:
+                raise ValueError(f"unit_price برای هزینه اضافی {field} تعریف نشده است")
+            flag = bool(spec.get('flag', False))
+            extras.append(ExtraRule(
+                field=field,
+                default=spec.get('default', False if flag else 0),
+                included=int(spec.get('included', 0)),
+                unit_price=float(spec['unit_price']),
+                description=spec.get('description', field),
+                flag=flag,
+            ))
+        return tuple(extras)
+
+    services = {}
+    for service_type, spec in rules.get('services', {}).items():
+        services[service_type.lower()] = ServiceRule(
+            name=spec.get('name', service_type),
+            base=float(spec.get('base', 0)),
+            custom_cost_field=spec.get('custom_cost_field'),
+            extras=build_extras(spec.get('extras', {})),
+        )
+
+    discount = rules.get('discount', {})
+    tiers = sorted((float(t['min_subtotal']), float(t['percent'])) for t in discount.get('tiers', []))
+    tax_rate = rules.get('tax_rate')
+    deposit_percentage = rules.get('deposit_percentage')
+
+    return CompiledRules(
+        version=version,
+        services=services,
+        unknown=ServiceRule(rules.get('unknown_service_name', 'خدمت نامشخص'), 0.0, None, build_extras({})),
+        discount_field=discount.get('field', 'discount_percent'),
+        max_discount=float(discount.get('max_percent', 100)),
+        tier_thresholds=tuple(t[0] for t in tiers),
+        tier_percents=tuple(t[1] for t in tiers),
+        tax_rate=Config.TAX_RATE if tax_rate is None else float(tax_rate),
+        deposit_percentage=Config.DEPOSIT_PERCENTAGE if deposit_percentage is None else float(deposit_percentage),
+    )
+
+
+class PricingEngine:
+    """محاسبه هزینه خدمات بر اساس جدول قیمت کامپایل شده"""
+
+    def __init__(self, rules_file: Optional[str] = None, reload_interval: float = 5.0,
+                 cache_size: int = 1024):
+        """
+        Args:
+            rules_file: مسیر فایل JSON جدول قیمت (در نبود فایل، DEFAULT_RULES)
+            reload_interval: حداقل فاصله بررسی تغییر فایل (ثانیه)
+            cache_size: حداکثر تعداد Quote های نگهداری شده (۰ = بدون cache)
+        """
+        self.rules_file = rules_file
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = time.monotonic()
+        self._rules = self._load_rules()
+        self._mtime = self._file_mtime()
+
+    @property
+    def version(self) -> int:
+        """شماره نسخه جدول قیمت (با هر بارگذاری مجدد افزایش می‌یابد)"""
+        return self._rules.version
+
+    @property
+    def rules(self) -> CompiledRules:
+        self._maybe_reload()
+        return self._rules
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.rules_file).st_mtime if self.rules_file else None
+        except OSError:
+            return None
+
+    def _load_rules(self, version: int = 1) -> CompiledRules:
+        rules = DEFAULT_RULES
+        if self.rules_file and os.path.exists(self.rules_file):
+            with open(self.rules_file, encoding='utf-8') as f:
+                rules = json.load(f)
+        return compile_rules(rules, version)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        mtime = self._file_mtime()
+        if mtime != self._mtime:
+            self.reload(mtime)
+
+    def reload(self, mtime: float = None):
+        """بارگذاری مجدد جدول قیمت (در صورت خطا جدول قبلی حفظ می‌شود)"""
+        with self._lock:
+            try:
+                self._rules = self._load_rules(self._rules.version + 1)
+                # کلیدهای cache شامل نسخه هستند؛ پاک کردن فقط حافظه نسخه قبلی را آزاد می‌کند
+                self._cache.clear()
+                logger.info(f"💰 جدول قیمت بارگذاری شد (نسخه {self._rules.version})")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error(f"❌ خطا در بارگذاری جدول قیمت {self.rules_file}: {e}")
+            self._mtime = mtime if mtime is not None else self._file_mtime()
+
+    def service_name(self, service_type: str) -> str:
+        """نام فارسی نوع خدمت"""
+        return self._resolve(self.rules, service_type).name
+
+    @staticmethod
+    def _resolve(rules: CompiledRules, service_type: str) -> ServiceRule:
+        return rules.services.get((service_type or '').lower()) or rules.unknown
+
+    @staticmethod
+    def _evaluate(rules: CompiledRules, service: ServiceRule, details: Dict) -> Quote:
+        base_cost = service.base
+        if service.custom_cost_field and service.custom_cost_field in details:
+            base_cost = details.get(service.custom_cost_field, 0)
+
+        extras = []
+        subtotal = base_cost
+        for extra in service.extras:
+            value = details.get(extra.field, extra.default)
+            if extra.flag:
+                if not value:
+                    continue
+                amount = extra.unit_price
+                description = extra.description
+            else:
+                count = value - extra.included
+                if count <= 0:
+                    continue
+                amount = count * extra.unit_price
+                description = extra.description.format(count=count)
+            extras.append(QuoteLine(description, amount))
+            subtotal += amount
+
+        discount_percent = details.get(rules.discount_field, 0)
+        if rules.tier_thresholds:
+            tier = bisect.bisect_right(rules.tier_thresholds, subtotal)
+            if tier:
+                discount_percent = max(discount_percent, rules.tier_percents[tier - 1])
+        discount = subtotal * (min(discount_percent, rules.max_discount) / 100) if discount_percent > 0 else 0
+
+        taxable_amount = subtotal - discount
+        tax = taxable_amount * rules.tax_rate
+        total = taxable_amount + tax
+        deposit = total * rules.deposit_percentage / 100
+
+        # آرگومان‌های موقعیتی (به ترتیب فیلدهای Quote) سریع‌تر از keyword هستند
+        return Quote(
+            QuoteLine(f'خدمت پایه - {service.name}', base_cost), tuple(extras),
+            subtotal, discount, rules.tax_rate, tax, total,
+            rules.deposit_percentage, deposit, total - deposit, rules.version,
+        )
+
+    @staticmethod
+    def _total(rules: CompiledRules, service: ServiceRule, details: Dict) -> float:
+        """جمع کل با همان محاسبه _evaluate، بدون ساخت سطرها و متن فاکتور"""
+        subtotal = service.base
+        if service.custom_cost_field and service.custom_cost_field in details:
+            subtotal = details.get(service.custom_cost_field, 0)
+
+        for extra in service.extras:
+            value = details.get(extra.field, extra.default)
+            if extra.flag:
+                if value:
+                    subtotal += extra.unit_price
+            else:
+                count = value - extra.included
+                if count > 0:
+                    subtotal += count * extra.unit_price
+
+        discount_percent = details.get(rules.discount_field, 0)
+        if rules.tier_thresholds:
+            tier = bisect.bisect_right(rules.tier_thresholds, subtotal)
+            if tier:
+                discount_percent = max(discount_percent, rules.tier_percents[tier - 1])
+        discount = subtotal * (min(discount_percent, rules.max_discount) / 100) if discount_percent > 0 else 0
+
+        taxable_amount = subtotal - discount
+        return taxable_amount + taxable_amount * rules.tax_rate
+
+    @staticmethod
+    def cache_key(rules: CompiledRules, service: ServiceRule, details: Dict) -> tuple:
+        """
+        کلید canonical یک پیکربندی: فقط فیلدهایی که در قیمت اثر دارند، با اعمال مقادیر پیش‌فرض
+
+        (مثلاً {} و {'cameras': 2} یک کلید دارند؛ نام و تلفن مشتری در کلید نیستند)
+        """
+        values = [bool(details.get(e.field, e.default)) if e.flag else details.get(e.field, e.default)
+                  for e in service.extras]
+        if service.custom_cost_field:
+            values.append(details.get(service.custom_cost_field, _ABSENT))
+        values.append(details.get(rules.discount_field, 0))
+        # id خدمت در یک نسخه جدول یکتا و پایدار است (نوع‌های ناشناخته همه به unknown می‌رسند)
+        return (rules.version, id(service), tuple(values))
+
+    def quote(self, service_type: str, details: Dict) -> Quote:
+        """
+        محاسبه هزینه یک خدمت (با cache)
+
+        Returns:
+            Quote شامل تفکیک هزینه‌ها (خدمت پایه، اضافات، تخفیف، مالیات، جمع کل، بیعانه)
+        """
+        rules = self.rules
+        service = self._resolve(rules, service_type)
+        if not self.cache_size:
+            return self._evaluate(rules, service, details)
+
+        key = self.cache_key(rules, service, details)
+        try:
+            with self._lock:
+                quote = self._cache.get(key)
+                if quote is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return quote
+        except TypeError:
+            # مقدار غیرقابل hash (مثلاً لیست) در فیلدهای قیمت؛ بدون cache محاسبه می‌شود
+            return self._evaluate(rules, service, details)
+
+        quote = self._evaluate(rules, service, details)
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[key] = quote
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return quote
+
+    def quote_many(self, items: Iterable[Tuple[str, Dict]], totals_only: bool = False) -> List:
+        """
+        محاسبه گروهی (مثلاً قیمت‌گذاری مجدد رزروهای ذخیره شده پس از تغییر نرخ‌ها)
+
+        همه موارد با یک نسخه ثابت از جدول قیمت محاسبه می‌شوند، حتی اگر فایل در حین
+        اجرا تغییر کند. نوع خدمت هر مقدار یک بار resolve می‌شود و هر پیکربندی تکراری
+        (کلید cache_key) در طول همان دسته فقط یک بار محاسبه می‌شود؛ رزروهای ذخیره شده
+        معمولاً چند پیکربندی محدود دارند (اگر دسته تقریباً همه یکتا باشد، پس از
+        _BATCH_MEMO_PROBE مورد این کار متوقف می‌شود). cache مشترک quote() استفاده نمی‌شود تا هزاران
+        پیکربندی یک‌بار مصرف، Quote های پرکاربرد را از آن بیرون نکنند. با totals_only
+        فقط محاسبه عددی انجام شده و Quote و سطرهای فاکتور ساخته نمی‌شوند.
+
+        Args:
+            items: (نوع خدمت، جزئیات) ها
+            totals_only: فقط جمع کل هر مورد
+        """
+        rules = self.rules
+        evaluate = self._total if totals_only else self._evaluate
+        cache_key = self.cache_key
+        services: Dict[str, ServiceRule] = {}
+        computed: Dict[tuple, object] = {}
+        results = []
+        memoize = True
+        for service_type, details in items:
+            service = services.get(service_type)
+            if service is None:
+                service = services[service_type] = self._resolve(rules, service_type)
+            details = details or {}
+            if len(results) == _BATCH_MEMO_PROBE and memoize:
+                memoize = len(results) - len(computed) >= _BATCH_MEMO_PROBE // 8
+            if not memoize:
+                results.append(evaluate(rules, service, details))
+                continue
+            key = cache_key(rules, service, details)
+            try:
+                result = computed.get(key)
+            except TypeError:
+                # مقدار غیرقابل hash در فیلدهای قیمت
+                results.append(evaluate(rules, service, details))
+                continue
+            if result is None:
+                result = computed[key] = evaluate(rules, service, details)
+            results.append(result)
+        return results
+
+
+_engine: Optional[PricingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> PricingEngine:
+    """موتور قیمت‌گذاری مشترک (ساخته شده با تنظیمات Config)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PricingEngine(
+                    Config.PRICING_RULES_FILE, Config.PRICING_RELOAD_INTERVAL, Config.PRICING_CACHE_SIZE
+                )
+                metrics.registry.counter(
+                    'mandani_quote_cache_hits_total', 'Price quotes served from the quote cache'
+                ).set_function(lambda: _engine.cache_hits)
+                metrics.registry.counter(
+                    'mandani_quote_cache_misses_total', 'Price quotes computed and stored in the quote cache'
+                ).set_function(lambda: _engine.cache_misses)
+    return _engine
+
+
+if __name__ == '__main__':
+    print(json.dumps(DEFAULT_RULES, ensure_ascii=False, indent=2))
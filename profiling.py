@@ -0,0 +1,202 @@
+"""
+🔥 ماژول پروفایل در حین اجرا
+On-demand CPU and memory profiling for Mandani Studio Bot
+
+SamplingProfiler در یک thread جداگانه stack همه thread ها را با sys._current_frames()
+نمونه‌برداری کرده و خروجی collapsed-stack (قابل استفاده در flamegraph.pl و
+speedscope) تولید می‌کند. فاصله نمونه‌برداری طوری تنظیم می‌شود که سربار از سقف
+تعیین شده بیشتر نشود. memory_snapshot_diff تفاوت دو snapshot از tracemalloc را
+برمی‌گرداند. مدت هر دو با سقف Config محدود است و در هر زمان فقط یک پروفایل اجرا می‌شود.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# حداکثر عمق stack و حداکثر stack های یکتا (محدودیت حافظه پروفایلر)
+MAX_STACK_DEPTH = 64
+MAX_UNIQUE_STACKS = 20000
+
+# حداکثر عمق traceback در tracemalloc (هر frame اضافه سربار هر تخصیص را بیشتر می‌کند)
+MAX_TRACE_FRAMES = 5
+
+# فیلتر تخصیص‌های خود tracemalloc و سیستم import از snapshot ها
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+# فقط یک پروفایل (CPU یا حافظه) در هر زمان
+_profile_lock = asyncio.Lock()
+
+
+def profile_in_progress() -> bool:
+    return _profile_lock.locked()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_DIR + os.sep):
+        filename = os.path.relpath(filename, PROJECT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    # ; جداکننده frame ها در فرمت collapsed است
+    return f"{code.co_name} ({filename}:{frame.f_lineno})".replace(';', ':')
+
+
+class SamplingProfiler:
+    """پروفایلر نمونه‌بردار stack با سقف سربار"""
+
+    def __init__(self, interval: float = 0.01, max_overhead: float = 0.05):
+        """
+        Args:
+            interval: فاصله پایه نمونه‌برداری (ثانیه)
+            max_overhead: حداکثر سهم زمان صرف شده در نمونه‌برداری (۰.۰۵ = ۵٪)
+        """
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.sampling_time = 0.0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.stopped_at = time.perf_counter()
+
+    def _sample(self, own_id: int, names: Dict[int, str]):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f'thread-{thread_id}'))
+            stack = ';'.join(reversed(labels))
+            if stack in self.stacks or len(self.stacks) < MAX_UNIQUE_STACKS:
+                self.stacks[stack] += 1
+            else:
+                self.dropped += 1
+        self.samples += 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        delay = self.interval
+        while not self._stop.wait(delay):
+            began = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_id, names)
+            cost = time.perf_counter() - began
+            self.sampling_time += cost
+            # اگر نمونه‌برداری گران باشد، فاصله بیشتر می‌شود تا سربار از سقف عبور نکند
+            delay = max(self.interval, cost / self.max_overhead - cost)
+
+    @property
+    def duration(self) -> float:
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    @property
+    def overhead(self) -> float:
+        return self.sampling_time / self.duration if self.duration else 0.0
+
+    def collapsed(self) -> str:
+        """خروجی collapsed-stack: هر خط «frame;frame;... تعداد»"""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+    def top_functions(self, limit: int = 10) -> list:
+        """پرتکرارترین frame های انتهایی (زمان self) در میان thread ها"""
+        leaf = Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(';', 1)[-1]] += count
+        return leaf.most_common(limit)
+
+
+async def run_cpu_profile(seconds: float, interval: float = 0.01, max_overhead: float = 0.05) -> SamplingProfiler:
+    """اجرای پروفایلر روی ترافیک زنده به مدت seconds (بدون مسدود کردن event loop)"""
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval, max_overhead)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+        logger.info(f"🔥 پروفایل CPU: {profiler.samples} نمونه در {profiler.duration:.1f}s "
+                    f"(سربار {profiler.overhead * 100:.1f}%)")
+        return profiler
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+async def memory_snapshot_diff(seconds: float, limit: int = 15, frames: int = 1, max_seconds: float = 60) -> str:
+    """
+    تفاوت تخصیص حافظه بین دو snapshot از tracemalloc
+
+    گرفتن snapshot و مقایسه آن‌ها روی همه تخصیص‌ها پیمایش می‌کند؛ در thread جداگانه اجرا
+    می‌شوند تا event loop در این مدت مسدود نشود.
+
+    Args:
+        seconds: فاصله دو snapshot (محدود به max_seconds)
+        limit: تعداد سطرهای گزارش
+        frames: عمق traceback ذخیره شده (حداکثر MAX_TRACE_FRAMES؛ عمق بیشتر = سربار بیشتر)
+        max_seconds: سقف فاصله دو snapshot
+    """
+    seconds = min(seconds, max_seconds)
+    frames = max(1, min(frames, MAX_TRACE_FRAMES))
+    async with _profile_lock:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(frames)
+        try:
+            before = await asyncio.to_thread(_take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await asyncio.to_thread(_take_snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+        stats = await asyncio.to_thread(after.compare_to, before, 'lineno')
+
+    lines = [
+        f"🧠 تفاوت تخصیص حافظه در {seconds:g} ثانیه",
+        f"📦 حافظه ردیابی شده: {current / 1024:.0f} KB (اوج {peak / 1024:.0f} KB)",
+        "",
+    ]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        filename = frame.filename
+        if filename.startswith(PROJECT_DIR + os.sep):
+            filename = os.path.relpath(filename, PROJECT_DIR)
+        else:
+            filename = os.path.basename(filename)
+        lines.append(f"{stat.size_diff / 1024:+.1f} KB ({stat.count_diff:+d}) {filename}:{frame.lineno}")
+    if not stats:
+        lines.append("📭 تغییری ثبت نشد.")
+    return '\n'.join(lines)
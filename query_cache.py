@@ -0,0 +1,140 @@
+"""
+🧊 ماژول cache نتایج کوئری
+Read-through query result cache with tag invalidation
+
+مسیرهای پرتکرار خواندن (رزروهای من، مشاهده رزرو، جستجو) هر بار SQLite را کوئری و
+service_details را از JSON رمزگشایی می‌کردند؛ در حالی که رزروها به ندرت تغییر می‌کنند.
+این cache نتیجه هر کوئری را با یک کلید و چند برچسب (tag) نگه می‌دارد:
+
+    reservation:{code}   رزرو با کد مشخص
+    user:{telegram_id}   رزروهای یک کاربر
+    search               همه نتایج جستجو
+
+هر نوشتن برچسب‌های مربوطه را باطل می‌کند. حجم با LRU و عمر هر مقدار با TTL محدود است.
+مقدارها بدون کپی بین فراخوانی‌ها مشترک هستند (کپی عمیق نتیجه جستجو تقریباً هم‌هزینه خود
+کوئری بود)؛ فراخواننده‌ها نتیجه را فقط می‌خوانند و مسیری که بخواهد ردیف را تغییر دهد باید
+خودش از آن کپی بگیرد.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Set
+
+import metrics
+
+CACHE_REQUESTS = metrics.registry.counter(
+    'mandani_db_cache_requests_total', 'Query cache lookups by key namespace', ('namespace', 'result')
+)
+CACHE_INVALIDATIONS = metrics.registry.counter(
+    'mandani_db_cache_invalidations_total', 'Cache entries dropped by tag invalidation', ('namespace',)
+)
+CACHE_EVICTIONS = metrics.registry.counter(
+    'mandani_db_cache_evictions_total', 'Cache entries dropped by size or age', ('reason',)
+)
+
+
+def _namespace(name: str) -> str:
+    return name.split(':', 1)[0]
+
+
+class QueryCache:
+    """cache خواندنی با ابطال بر اساس برچسب، محدودیت تعداد (LRU) و TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: حداکثر تعداد مقادیر (0 = غیرفعال)
+            ttl: عمر هر مقدار (ثانیه)
+            clock: ساعت (برای سنجش و بررسی)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, value, tags)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        # با هر ابطال افزایش می‌یابد؛ نتیجه کوئری‌ای که همزمان با یک نوشتن اجرا شده ذخیره نمی‌شود
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(self, key: str, loader: Callable, tags: Iterable[str] = ()):
+        """
+        مقدار کلید از cache، یا اجرای loader و ذخیره نتیجه (None هم ذخیره می‌شود)
+
+        نتیجه برگردانده شده مشترک است و نباید تغییر داده شود.
+
+        Args:
+            key: کلید یکتا با پیشوند namespace (مثلاً reservation:ABC123)
+            loader: تابع بدون آرگومان که کوئری اصلی را اجرا می‌کند
+            tags: برچسب‌هایی که با ابطال هر کدام این مقدار حذف می‌شود
+        """
+        if not self.enabled:
+            return loader()
+
+        namespace = _namespace(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    CACHE_REQUESTS.inc(namespace=namespace, result='hit')
+                    return entry[1]
+                self._drop(key)
+                CACHE_EVICTIONS.inc(reason='ttl')
+            generation = self._generation
+        CACHE_REQUESTS.inc(namespace=namespace, result='miss')
+
+        value = loader()
+        tags = tuple(tags)
+        with self._lock:
+            if generation == self._generation:
+                self._drop(key)
+                self._entries[key] = (self._clock() + self.ttl, value, tags)
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+                    CACHE_EVICTIONS.inc(reason='size')
+        return value
+
+    def invalidate(self, *tags: str) -> int:
+        """حذف همه مقادیر دارای یکی از برچسب‌ها؛ تعداد حذف شده‌ها را برمی‌گرداند"""
+        if not self.enabled:
+            return 0
+        dropped = 0
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                keys = self._tags.pop(tag, ())
+                for key in keys:
+                    if self._drop(key):
+                        dropped += 1
+                if keys:
+                    CACHE_INVALIDATIONS.inc(len(keys), namespace=_namespace(tag))
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
@@ -0,0 +1,232 @@
+"""
+🔎 ماژول ایندکس جستجوی رزروها
+In-memory prefix index for reservation lookup
+
+جستجوی ادمین (حالت inline: ‎@bot ABC…) به جای LIKE روی کل جدول، از یک trie درون
+حافظه پاسخ داده می‌شود. کلیدهای هر رزرو:
+    کد رزرو                     ABC123
+    کلمات و نام کامل مشتری      پس از یکسان‌سازی ی/ک عربی، نیم‌فاصله و حروف کوچک
+    پسوندهای شماره تلفن         ۴ رقم آخر یا بیشتر، با یکسان‌سازی ‎+98 و ‎0098 به 0
+
+هر گره trie فقط کدهای رزروهایی را نگه می‌دارد که کلیدشان دقیقاً به آن گره ختم
+می‌شود. پاسخ یک پیشوند، پیمایش زیردرخت همان گره است. پرس‌وجوی چندکلمه‌ای اشتراک
+نتایج کلمات است. نتایج به ترتیب جدیدترین رزرو مرتب می‌شوند.
+
+ایندکس یک بار هنگام راه‌اندازی از پایگاه داده ساخته شده و با listener های نوشتن
+DatabaseManager (ایجاد رزرو و تغییر وضعیت) به‌روز می‌شود.
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INLINE_QUERIES = metrics.registry.counter(
+    'mandani_inline_queries_total', 'Inline reservation lookups answered', ('result',)
+)
+SEARCH_SECONDS = metrics.registry.histogram(
+    'mandani_search_index_seconds', 'Prefix index lookup latency',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+)
+
+# کوتاه‌ترین پسوند تلفن قابل جستجو
+MIN_PHONE_SUFFIX = 4
+
+_NORMALIZE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    '‌': ' ', '‏': None, '‎': None, 'ـ': None,
+    **{persian: str(digit) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(digit) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_text(text: str) -> str:
+    """یکسان‌سازی متن برای جستجو (ی و ک عربی، اعراب، نیم‌فاصله، ارقام، حروف کوچک)"""
+    text = _DIACRITICS.sub('', (text or '').translate(_NORMALIZE))
+    return ' '.join(text.lower().split())
+
+
+def normalize_phone(phone: str) -> str:
+    """فقط ارقام، با پیش‌شماره ‎+98 / ‎0098 به صورت 0"""
+    digits = _NON_DIGITS.sub('', (phone or '').translate(_NORMALIZE))
+    for prefix in ('0098', '98'):
+        if digits.startswith(prefix) and len(digits) == len(prefix) + 10:
+            return '0' + digits[len(prefix):]
+    return digits
+
+
+class SearchEntry(NamedTuple):
+    """خلاصه یک رزرو برای نمایش نتیجه جستجو"""
+    id: int
+    code: str
+    name: str
+    phone: str
+    service_type: str
+    event_date: str
+    status: str
+
+
+class _Node:
+    __slots__ = ('children', 'codes')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.codes: Set[str] = set()
+
+
+class ReservationSearchIndex:
+    """trie پیشوندی روی کد رزرو، نام مشتری و پسوندهای شماره تلفن"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._entries: Dict[str, SearchEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def entry_from_row(row: Dict) -> Optional[SearchEntry]:
+        code = row.get('reservation_code')
+        if not code:
+            return None
+        return SearchEntry(
+            row.get('id') or 0, code, row.get('customer_name') or '', row.get('customer_phone') or '',
+            row.get('service_type') or '', row.get('event_date') or '', row.get('booking_status') or 'pending'
+        )
+
+    @staticmethod
+    def keys(entry: SearchEntry) -> Set[str]:
+        """کلیدهای trie یک رزرو"""
+        keys = {entry.code.lower()}
+        name = normalize_text(entry.name)
+        if name:
+            keys.add(name)
+            keys.update(name.split())
+        phone = normalize_phone(entry.phone)
+        keys.update(phone[i:] for i in range(len(phone) - MIN_PHONE_SUFFIX + 1))
+        return keys
+
+    # ========================================
+    # ساخت و به‌روزرسانی
+    # ========================================
+
+    def load(self, db) -> int:
+        """ساخت ایندکس از همه رزروهای پایگاه داده"""
+        started = time.perf_counter()
+        root, entries = _Node(), {}
+        for entry in filter(None, map(self.entry_from_row, db.get_search_rows())):
+            entries[entry.code] = entry
+            for key in self.keys(entry):
+                self._insert(root, key, entry.code)
+        with self._lock:
+            self._root, self._entries = root, entries
+        logger.info(f"🔎 ایندکس جستجو: {len(entries)} رزرو ({(time.perf_counter() - started) * 1000:.0f}ms)")
+        return len(entries)
+
+    def add(self, entry: SearchEntry):
+        """افزودن یا جایگزینی یک رزرو"""
+        with self._lock:
+            previous = self._entries.get(entry.code)
+            if previous is not None:
+                for key in self.keys(previous) - self.keys(entry):
+                    self._discard(key, entry.code)
+            self._entries[entry.code] = entry
+            for key in self.keys(entry):
+                self._insert(self._root, key, entry.code)
+
+    def remove(self, code: str):
+        with self._lock:
+            entry = self._entries.pop(code, None)
+            if entry is not None:
+                for key in self.keys(entry):
+                    self._discard(key, code)
+
+    def on_reservation_changed(self, db, reservation_code: str):
+        """listener نوشتن DatabaseManager"""
+        entry = self.entry_from_row(db.get_reservation_by_code(reservation_code) or {})
+        if entry:
+            self.add(entry)
+        else:
+            self.remove(reservation_code)
+
+    @staticmethod
+    def _insert(root: _Node, key: str, code: str):
+        node = root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+        node.codes.add(code)
+
+    def _discard(self, key: str, code: str):
+        """حذف کد از گره کلید و هرس گره‌های خالی مسیر"""
+        path = [self._root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].codes.discard(code)
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.codes or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+
+    # ========================================
+    # جستجو
+    # ========================================
+
+    def _prefix(self, prefix: str) -> Set[str]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        codes, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            codes.update(node.codes)
+            stack.extend(node.children.values())
+        return codes
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[SearchEntry], Optional[int]]:
+        """
+        جستجوی پیشوندی (هر کلمه پرس‌وجو پیشوند یکی از کلیدهاست)
+
+        Returns:
+            (نتایج صفحه به ترتیب جدیدترین، offset صفحه بعد یا None)
+        """
+        started = time.perf_counter()
+        terms = normalize_text(query).split()
+        # شماره تلفن با فاصله، خط تیره یا پیش‌شماره (‎+98 912 123-4567) یک کلمه است
+        compact = ''.join(terms).replace('-', '').lstrip('+')
+        if compact.isdigit():
+            terms = [normalize_phone(compact)]
+        with self._lock:
+            if terms:
+                codes = None
+                for term in terms:
+                    matches = self._prefix(term)
+                    codes = matches if codes is None else codes & matches
+                    if not codes:
+                        SEARCH_SECONDS.observe(time.perf_counter() - started)
+                        return [], None
+                entries = [self._entries[code] for code in codes]
+            else:
+                # پرس‌وجوی خالی: جدیدترین رزروها
+                entries = list(self._entries.values())
+        entries.sort(key=lambda entry: entry.id, reverse=True)
+        page = entries[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(entries) else None
+        SEARCH_SECONDS.observe(time.perf_counter() - started)
+        return page, next_offset
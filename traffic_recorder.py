@@ -0,0 +1,312 @@
+"""
+🎙️ ماژول ضبط ترافیک ربات
+Production traffic recorder for Mandani Studio Bot
+
+update های ورودی به صورت NDJSON فشرده (gzip) با چرخش فایل بر اساس اندازه ذخیره
+می‌شوند تا بعداً با benchmarks/replay.py روی سرور جعلی Bot API بازپخش شوند.
+اطلاعات شخصی (نام، تلفن، ایمیل و در صورت نیاز شناسه کاربر) قبل از نوشتن حذف یا
+جایگزین می‌شوند. فشرده‌سازی و نوشتن در یک thread جداگانه انجام می‌شود تا event loop
+منتظر دیسک نماند. با گزینه names علاوه بر نام پروفایل تلگرام، کلمات متن‌های تایپ شده
+(نام، نام خانوادگی، مکان و ...) هم جایگزین می‌شوند؛ فقط دستور، ارقام و علائم باقی می‌ماند. ضبط در حین اجرا با دستور /record روشن و خاموش می‌شود.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# گزینه‌های حذف اطلاعات شخصی
+SCRUB_OPTIONS = ('names', 'phones', 'emails', 'ids')
+
+# شماره موبایل با ارقام لاتین، فارسی یا عربی و فاصله یا خط تیره بین ارقام
+# (مانند ValidationUtils.validate_phone که [\s\-] را پیش از بررسی حذف می‌کند)
+_PHONE = re.compile(r'(?<!\d)(?:(?:\+|00)[9۹٩][8۸٨][\s\-]?|[0۰٠])[9۹٩](?:[\s\-]?\d){9}(?!\d)')
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+# ایمیل (برای دست نخوردن در این مرحله) یا یک دنباله حروف
+_EMAIL_OR_WORD = re.compile(_EMAIL.pattern + r'|[^\W\d_]+')
+_COMMAND = re.compile(r'^/\w+(?:@\w+)?')
+
+# جایگزین هر کلمه متن تایپ شده؛ اعتبارسنجی نام و متن فارسی را پاس می‌کند
+WORD_PLACEHOLDER = 'متن'
+
+_NAME_KEYS = ('first_name', 'last_name', 'username', 'title')
+# فیلدهای شخصی فرم Mini App (web_app_data.data)
+_BOOKING_NAME_KEYS = ('name', 'family_name', 'bride_name', 'location')
+_USER_KEYS = ('from', 'chat', 'user', 'sender_chat')
+
+CURRENT_FILE = 'updates.ndjson.gz'
+
+
+class TrafficRecorder:
+    """ضبط update ها در فایل‌های NDJSON فشرده و چرخشی"""
+
+    def __init__(self, directory: str = 'recordings', max_bytes: int = 50 * 1024 * 1024,
+                 backup_count: int = 10, scrub: Iterable[str] = ('names', 'phones', 'emails'),
+                 flush_every: int = 20, queue_size: int = 10000):
+        """
+        Args:
+            directory: پوشه فایل‌های ضبط
+            max_bytes: حداکثر اندازه فشرده هر فایل پیش از چرخش
+            backup_count: تعداد فایل‌های چرخیده نگهداری شده
+            scrub: اطلاعات شخصی قابل حذف (names, phones, emails, ids)
+            flush_every: نوشتن بافر روی دیسک پس از هر چند update
+            queue_size: ظرفیت صف نوشتن؛ در صورت پر شدن، update های جدید ضبط نمی‌شوند
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.scrub = frozenset(option for option in scrub if option in SCRUB_OPTIONS)
+        self.flush_every = max(1, flush_every)
+
+        # نمک تصادفی برای شناسه‌های جایگزین (در هر بار اجرا متفاوت)
+        self._salt = os.urandom(16)
+        self._lock = threading.Lock()
+        self._file: Optional[gzip.GzipFile] = None
+        self._raw = None
+        self._unflushed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+
+        self.recorded_count = 0
+        self.dropped_count = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    @property
+    def current_path(self) -> Path:
+        return self.directory / CURRENT_FILE
+
+    def start(self):
+        """شروع ضبط (ادامه فایل جاری در صورت وجود)"""
+        with self._lock:
+            if self._file is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._open()
+            self.started_at = time.time()
+            self._writer = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+            self._writer.start()
+        logger.info(f"🎙️ ضبط ترافیک شروع شد: {self.current_path}")
+
+    def stop(self):
+        """توقف ضبط، نوشتن update های صف و بستن فایل"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join()
+        with self._lock:
+            if self._file is None:
+                return
+            self._close()
+        logger.info(f"⏹️ ضبط ترافیک متوقف شد ({self.recorded_count} update)")
+
+    def _run(self):
+        """thread نویسنده: خواندن صف و نوشتن در فایل تا رسیدن به None"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.record(*item)
+            except Exception as e:
+                logger.error(f"خطا در ضبط update: {e}")
+
+    def _open(self):
+        self._raw = open(self.current_path, 'ab')
+        # هر بار باز شدن یک gzip member جدید می‌سازد؛ خواندن فایل چندعضوی مشکلی ندارد
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='ab', compresslevel=6)
+
+    def _close(self):
+        self._file.close()
+        self._raw.close()
+        self._file = None
+        self._raw = None
+        self._unflushed = 0
+
+    def _rotate(self):
+        """چرخش فایل جاری و حذف قدیمی‌ترین فایل‌ها"""
+        self._close()
+        rotated = self.directory / f"updates-{time.strftime('%Y%m%d-%H%M%S')}-{self.recorded_count}.ndjson.gz"
+        os.replace(self.current_path, rotated)
+
+        for old in recording_files(self.directory, include_current=False)[:-self.backup_count or None]:
+            old.unlink(missing_ok=True)
+        self._open()
+
+    # ========================================
+    # حذف اطلاعات شخصی
+    # ========================================
+
+    def _pseudonym(self, value) -> str:
+        return hashlib.sha256(self._salt + str(value).encode('utf-8')).hexdigest()[:8]
+
+    def _pseudo_id(self, value: int) -> int:
+        # شناسه‌ها در محدوده شناسه‌های واقعی کاربر باقی می‌مانند و در طول ضبط ثابت هستند
+        return 10 ** 9 + int(self._pseudonym(value), 16) % (10 ** 9)
+
+    def _pseudo_phone(self, phone: str) -> str:
+        # هر قالب یک شماره (فاصله‌دار، +98، ارقام فارسی) جایگزین یکسانی دارد که
+        # همچنان اعتبارسنجی تلفن را پاس می‌کند
+        digits = ''.join(str(int(char)) for char in phone if char.isdigit())
+        return '09' + str(int(self._pseudonym('0' + digits[-10:]), 16))[-9:].zfill(9)
+
+    def _scrub_words(self, text: str) -> str:
+        """جایگزینی کلمات متن آزاد (دستور ابتدای متن، ارقام و ایمیل‌ها حفظ می‌شوند)"""
+        command = _COMMAND.match(text)
+        prefix = command.group() if command else ''
+        rest = _EMAIL_OR_WORD.sub(
+            lambda m: m.group() if '@' in m.group() else WORD_PLACEHOLDER, text[len(prefix):]
+        )
+        return prefix + rest
+
+    def _scrub_text(self, text: str) -> str:
+        if 'names' in self.scrub:
+            text = self._scrub_words(text)
+        if 'phones' in self.scrub:
+            text = _PHONE.sub(lambda m: self._pseudo_phone(m.group()), text)
+        if 'emails' in self.scrub:
+            text = _EMAIL.sub(lambda m: f'user{self._pseudonym(m.group())}@example.com', text)
+        return text
+
+    def _scrub_web_app_data(self, data: str) -> str:
+        """
+        حذف اطلاعات شخصی فرم Mini App (رشته JSON شامل init_data و booking)
+
+        init_data یک credential امضا شده است و همیشه حذف می‌شود؛ بنابراین فرم‌های
+        بازپخش شده در بررسی امضا رد می‌شوند.
+        """
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return ''
+        if not isinstance(payload, dict):
+            return ''
+        payload.pop('init_data', None)
+        booking = payload.get('booking')
+        if isinstance(booking, dict):
+            for key, value in booking.items():
+                if not isinstance(value, str):
+                    continue
+                if key in _BOOKING_NAME_KEYS and 'names' in self.scrub:
+                    booking[key] = WORD_PLACEHOLDER
+                elif key == 'phone' and 'phones' in self.scrub:
+                    booking[key] = self._scrub_text(value) if _PHONE.search(value) else '09000000000'
+                else:
+                    booking[key] = self._scrub_text(value)
+        return json.dumps(payload, ensure_ascii=False)
+
+    def scrub_data(self, data, parent_key: str = ''):
+        """حذف اطلاعات شخصی از دیکشنری update (بازگشتی)"""
+        if isinstance(data, dict):
+            result = {}
+            for key, value in data.items():
+                if key in _NAME_KEYS and 'names' in self.scrub and isinstance(value, str):
+                    value = f'user_{self._pseudonym(value)}' if key == 'username' else 'کاربر'
+                elif key == 'phone_number' and 'phones' in self.scrub:
+                    value = self._scrub_text(str(value)) if _PHONE.search(str(value)) else '09000000000'
+                elif key in ('text', 'caption') and isinstance(value, str):
+                    value = self._scrub_text(value)
+                elif key == 'data' and parent_key == 'web_app_data' and isinstance(value, str):
+                    value = self._scrub_web_app_data(value)
+                elif key == 'id' and parent_key in _USER_KEYS and 'ids' in self.scrub and isinstance(value, int):
+                    value = self._pseudo_id(value)
+                else:
+                    value = self.scrub_data(value, key)
+                result[key] = value
+            return result
+        if isinstance(data, list):
+            return [self.scrub_data(item, parent_key) for item in data]
+        return data
+
+    # ========================================
+    # ضبط
+    # ========================================
+
+    def record(self, update_data: dict, timestamp: float = None):
+        """نوشتن یک update در فایل ضبط (همزمان؛ update های زنده از thread نویسنده می‌رسند)"""
+        if self._file is None:
+            return
+
+        line = json.dumps(
+            {'ts': timestamp or time.time(), 'update': self.scrub_data(update_data)},
+            ensure_ascii=False, separators=(',', ':'), default=str
+        ).encode('utf-8') + b'\n'
+
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self.recorded_count += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._file.flush()
+                self._unflushed = 0
+                if self._raw.tell() >= self.max_bytes:
+                    self._rotate()
+
+    async def record_update(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        """handler گروه -2: قرار دادن update در صف ضبط پیش از حذف تکراری‌ها و سایر handler ها"""
+        if self._writer is None or not isinstance(update, Update):
+            return
+        try:
+            self._queue.put_nowait((update.to_dict(), time.time()))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def status(self) -> str:
+        """متن وضعیت برای دستور /record"""
+        if not self.enabled:
+            return f"⏹️ ضبط ترافیک خاموش است (مجموع ضبط شده: {self.recorded_count})"
+        size = self.current_path.stat().st_size if self.current_path.exists() else 0
+        minutes = (time.time() - self.started_at) / 60 if self.started_at else 0
+        scrub = ', '.join(sorted(self.scrub)) or 'هیچ'
+        return (
+            f"🎙️ ضبط ترافیک روشن است\n"
+            f"📁 {self.current_path} ({size / 1024:.0f} KB)\n"
+            f"🔢 update های ضبط شده: {self.recorded_count} (در صف: {self._queue.qsize()}، "
+            f"دور ریخته: {self.dropped_count})\n"
+            f"⏱️ مدت: {minutes:.0f} دقیقه\n"
+            f"🛡️ حذف اطلاعات شخصی: {scrub}"
+        )
+
+
+def recording_files(path, include_current: bool = True) -> List[Path]:
+    """فایل‌های ضبط یک پوشه به ترتیب زمانی (فایل جاری در انتها)"""
+    path = Path(path)
+    if path.is_file():
+        return [path]
+    files = sorted(path.glob('updates-*.ndjson.gz'), key=lambda p: p.stat().st_mtime)
+    if include_current and (path / CURRENT_FILE).exists():
+        files.append(path / CURRENT_FILE)
+    return files
+
+
+def read_recording(paths: Iterable) -> Iterator[Tuple[float, dict]]:
+    """خواندن update های ضبط شده: (زمان، update)"""
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield record['ts'], record['update']
+            except (EOFError, gzip.BadGzipFile, ValueError):
+                # فایل در حال نوشتن یا ناقص (توقف ناگهانی)؛ خطوط خوانده شده معتبر هستند
+                logger.warning(f"⚠️ انتهای ناقص فایل ضبط: {path}")
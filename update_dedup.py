@@ -0,0 +1,93 @@
+"""
+🔁 ماژول حذف update های تکراری
+Update de-duplication for Mandani Studio Bot
+
+تلگرام در صورت کندی پاسخ webhook یا راه‌اندازی مجدد ربات، update ها را دوباره ارسال می‌کند.
+این ماژول با یک حلقه ثابت از update_id های اخیر و یک high-water mark ذخیره شده در
+پایگاه داده، از پردازش دوباره یک update جلوگیری می‌کند.
+
+high-water mark به صورت دسته‌ای (هر persist_every update) و هنگام توقف ربات (post_shutdown در
+هر دو حالت polling و webhook) ذخیره می‌شود
+تا هر update یک commit همزمان روی event loop نداشته باشد. پس از توقف ناگهانی، حداکثر
+persist_every update آخر ممکن است دوباره پردازش شوند.
+"""
+
+from array import array
+import logging
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """تشخیص update های تکراری بر اساس update_id"""
+
+    STATE_KEY = 'last_update_id'
+
+    def __init__(self, db: DatabaseManager, window_size: int = 4096, persist_every: int = 64):
+        """
+        Args:
+            db: مدیر پایگاه داده برای ذخیره high-water mark
+            window_size: تعداد update_id های اخیر که در حافظه نگه داشته می‌شوند
+            persist_every: ذخیره high-water mark پس از هر چند update جدید
+        """
+        self.db = db
+        self.window_size = window_size
+        self.persist_every = max(1, persist_every)
+
+        # هر update_id در خانه update_id % window_size ذخیره می‌شود
+        self._ring = array('q', [-1]) * window_size
+
+        # update هایی که قبل از راه‌اندازی مجدد دیده شده‌اند
+        self.restored_mark = int(db.get_state(self.STATE_KEY, '-1'))
+        self.high_water_mark = self.restored_mark
+        self._unsaved = 0
+
+        self.duplicate_count = 0
+
+    def is_duplicate(self, update_id: int) -> bool:
+        """
+        بررسی تکراری بودن update و ثبت آن به عنوان دیده شده
+
+        Returns:
+            True اگر update قبلاً دیده شده باشد
+        """
+        if update_id <= self.restored_mark:
+            return True
+
+        # قدیمی‌تر از پنجره حلقه؛ قابل ردیابی نیست و تکراری فرض می‌شود
+        if update_id <= self.high_water_mark - self.window_size:
+            return True
+
+        slot = update_id % self.window_size
+        if self._ring[slot] == update_id:
+            return True
+        self._ring[slot] = update_id
+
+        if update_id > self.high_water_mark:
+            self.high_water_mark = update_id
+            self._unsaved += 1
+            if self._unsaved >= self.persist_every:
+                self.persist()
+
+        return False
+
+    def persist(self):
+        """ذخیره high-water mark در پایگاه داده"""
+        if self._unsaved:
+            self.db.set_state(self.STATE_KEY, str(self.high_water_mark))
+            self._unsaved = 0
+
+    async def check_update(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        """handler گروه -1: توقف پردازش update های تکراری"""
+        if not isinstance(update, Update):
+            return
+
+        if self.is_duplicate(update.update_id):
+            self.duplicate_count += 1
+            logger.info(f"🔁 update تکراری نادیده گرفته شد: {update.update_id}")
+            raise ApplicationHandlerStop
@@ -5,6 +5,7 @@ Utility functions for Mandani Studio Bot
 این ماژول شامل توابع کمکی برای محاسبه هزینه، تولید PDF، مدیریت تاریخ و غیره است
 """
 
+import bisect
 import random
 import string
 import re
@@ -12,16 +13,12 @@ from datetime import datetime, timedelta, date
 from typing import Dict, List, Tuple, Optional
 import json
 import logging
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 import io
 
+from pricing import Quote, get_engine
+
+# reportlab سنگین است و فقط هنگام تولید اولین PDF بارگذاری می‌شود (PDFGenerator)
+
 
 class PersianDateUtils:
     """کلاس کمکی برای کار با تاریخ فارسی"""
@@ -55,14 +52,113 @@ class PersianDateUtils:
             text = text.replace(english, persian)
         return text
     
+    # ========================================
+    # تبدیل شمسی ↔ میلادی با جداول از پیش محاسبه شده
+    # ========================================
+    
+    # سال‌های پوشش داده شده با جدول؛ خارج از آن jdatetime مستقیماً استفاده می‌شود
+    JALALI_MIN_YEAR = 1300
+    JALALI_MAX_YEAR = 1500
+    
+    # فاصله اول هر ماه از اول فروردین (۶ ماه ۳۱ روزه، ۵ ماه ۳۰ روزه، اسفند ۲۹ یا ۳۰)
+    _MONTH_OFFSETS = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+    
+    # ordinal میلادی اول فروردین هر سال (با اولین تبدیل ساخته می‌شود)
+    _year_starts: List[int] = []
+    
+    _DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+    _DATE_PATTERN = re.compile(r'^\s*(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})\s*$')
+    
+    @classmethod
+    def _jalali_year_starts(cls) -> List[int]:
+        if not cls._year_starts:
+            import jdatetime
+            cls._year_starts = [
+                jdatetime.date(year, 1, 1).togregorian().toordinal()
+                for year in range(cls.JALALI_MIN_YEAR, cls.JALALI_MAX_YEAR + 2)
+            ]
+        return cls._year_starts
+    
+    @classmethod
+    def jalali_to_gregorian(cls, year: int, month: int, day: int) -> date:
+        """تبدیل تاریخ شمسی به میلادی (ValueError برای تاریخ ناموجود مثل ۳۱ مهر)"""
+        starts = cls._jalali_year_starts()
+        index = year - cls.JALALI_MIN_YEAR
+        if not 0 <= index < len(starts) - 1:
+            import jdatetime
+            return jdatetime.date(year, month, day).togregorian()
+        if not 1 <= month <= 12:
+            raise ValueError(f"ماه نامعتبر: {month}")
+        if month <= 6:
+            month_length = 31
+        elif month <= 11:
+            month_length = 30
+        else:
+            month_length = starts[index + 1] - starts[index] - cls._MONTH_OFFSETS[11]
+        if not 1 <= day <= month_length:
+            raise ValueError(f"روز نامعتبر: {year}/{month}/{day}")
+        return date.fromordinal(starts[index] + cls._MONTH_OFFSETS[month - 1] + day - 1)
+    
+    @classmethod
+    def gregorian_to_jalali(cls, date_obj: date) -> Tuple[int, int, int]:
+        """تبدیل تاریخ میلادی به (سال، ماه، روز) شمسی"""
+        starts = cls._jalali_year_starts()
+        ordinal = date_obj.toordinal()
+        index = bisect.bisect_right(starts, ordinal) - 1
+        if not 0 <= index < len(starts) - 1:
+            import jdatetime
+            jalali = jdatetime.date.fromgregorian(date=date_obj)
+            return jalali.year, jalali.month, jalali.day
+        offset = ordinal - starts[index]
+        month = bisect.bisect_right(cls._MONTH_OFFSETS, offset)
+        return cls.JALALI_MIN_YEAR + index, month, offset - cls._MONTH_OFFSETS[month - 1] + 1
+    
+    @classmethod
+    def parse_jalali_date(cls, text: str) -> Optional[date]:
+        """
+        تاریخ وارد شده (۱۴۰۳/۰۸/۱۵، 1403-8-15، ...) ← date میلادی
+        
+        تاریخ‌های میلادی ISO (سال ۱۷۰۰ به بعد) نیز پذیرفته می‌شوند؛ تاریخ نامعتبر: None
+        """
+        match = cls._DATE_PATTERN.match((text or '').translate(cls._DIGITS))
+        if not match:
+            return None
+        year, month, day = (int(part) for part in match.groups())
+        try:
+            if year >= 1700:
+                return date(year, month, day)
+            return cls.jalali_to_gregorian(year, month, day)
+        except ValueError:
+            return None
+    
+    @classmethod
+    def format_jalali_date(cls, date_obj: date) -> str:
+        """قالب استاندارد نمایش و ذخیره تاریخ شمسی: ۱۴۰۳/۰۸/۱۵"""
+        year, month, day = cls.gregorian_to_jalali(date_obj)
+        return cls.english_to_persian_digits(f"{year:04d}/{month:02d}/{day:02d}")
+    
+    @classmethod
+    def normalize_event_date(cls, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        تاریخ خام ← (تاریخ شمسی استاندارد، تاریخ میلادی ISO)
+        
+        تاریخ غیرقابل تبدیل بدون تغییر و با ISO برابر None برگردانده می‌شود
+        """
+        parsed = cls.parse_jalali_date(text)
+        if parsed is None:
+            return text, None
+        return cls.format_jalali_date(parsed), parsed.isoformat()
+    
     @staticmethod
     def format_persian_date(date_obj: date) -> str:
-        """فرمت کردن تاریخ به شمسی (ساده)"""
-        # برای سادگی، از تاریخ میلادی استفاده می‌کنیم
-        # در پیاده‌سازی واقعی می‌توان از کتابخانه jdatetime استفاده کرد
-        return PersianDateUtils.english_to_persian_digits(
-            date_obj.strftime('%Y/%m/%d')
-        )
+        """فرمت کردن تاریخ میلادی به شمسی با ارقام فارسی"""
+        return PersianDateUtils.format_jalali_date(date_obj)
+    
+    @classmethod
+    def get_persian_datetime(cls, moment: datetime = None) -> str:
+        """تاریخ و ساعت شمسی (پیش‌فرض: اکنون)، مثال: ۱۴۰۳/۰۸/۱۵ ۱۸:۳۰"""
+        moment = moment or datetime.now()
+        return f"{cls.format_jalali_date(moment.date())} {cls.english_to_persian_digits(moment.strftime('%H:%M'))}"
     
     @staticmethod
     def calculate_days_until(target_date: str) -> int:
@@ -76,30 +172,10 @@ class PersianDateUtils:
 
 
 class CostCalculator:
-    """کلاس محاسبه هزینه خدمات"""
-    
-    # نرخ‌های پایه خدمات (تومان)
-    BASE_RATES = {
-        'birthday': 500000,      # عکاسی تولد
-        'wedding': 2000000,      # عروسی
-        'engagement': 1000000,   # عقد
-        'general': 300000,       # عمومی
-        'other': 0              # سایر (نرخ سفارشی)
-    }
-    
-    # هزینه‌های اضافی
-    EXTRA_COSTS = {
-        'extra_camera': 100000,     # دوربین اضافی
-        'helishot': 200000,         # هلی‌شات
-        'extra_photographer': 150000, # عکاس اضافی
-        'wedding_extra_photographer': 300000  # عکاس اضافی برای عروسی
-    }
-    
-    # مالیات
-    TAX_RATE = 0.09  # 9%
+    """کلاس محاسبه هزینه خدمات (نرخ‌ها در جدول قیمت pricing.py تعریف می‌شوند)"""
     
     @classmethod
-    def calculate_service_cost(cls, service_type: str, details: Dict) -> Dict:
+    def calculate_service_cost(cls, service_type: str, details: Dict) -> Quote:
         """
         محاسبه هزینه خدمت بر اساس جزئیات
         
@@ -108,89 +184,27 @@ class CostCalculator:
             details: جزئیات خدمت
         
         Returns:
-            Dict شامل breakdown هزینه‌ها
+            Quote تغییرناپذیر شامل breakdown هزینه‌ها (از cache مشترک)
         """
-        base_cost = cls.BASE_RATES.get(service_type.lower(), 0)
-        
-        # اگر نوع خدمت "سایر" است، از هزینه سفارشی استفاده کن
-        if service_type.lower() == 'other' and 'custom_cost' in details:
-            base_cost = details.get('custom_cost', 0)
-        
-        breakdown = {
-            'base_service': {
-                'description': f'خدمت پایه - {cls.get_service_name(service_type)}',
-                'amount': base_cost
-            },
-            'extras': [],
-            'subtotal': base_cost,
-            'tax': 0,
-            'discount': 0,
-            'total': 0
-        }
-        
-        # محاسبه هزینه‌های اضافی
-        cameras = details.get('cameras', 2)
-        if cameras > 2:  # بیش از 2 دوربین
-            extra_cameras = cameras - 2
-            extra_cost = extra_cameras * cls.EXTRA_COSTS['extra_camera']
-            breakdown['extras'].append({
-                'description': f'دوربین اضافی ({extra_cameras} عدد)',
-                'amount': extra_cost
-            })
-            breakdown['subtotal'] += extra_cost
-        
-        # هلی‌شات
-        if details.get('helishot', False):
-            helishot_cost = cls.EXTRA_COSTS['helishot']
-            breakdown['extras'].append({
-                'description': 'هلی‌شات',
-                'amount': helishot_cost
-            })
-            breakdown['subtotal'] += helishot_cost
-        
-        # عکاس/فیلمبردار اضافی
-        photographers = details.get('photographers', 1)
-        base_photographers = 2 if service_type.lower() == 'wedding' else 1
-        
-        if photographers > base_photographers:
-            extra_photographers = photographers - base_photographers
-            cost_per_photographer = (
-                cls.EXTRA_COSTS['wedding_extra_photographer'] 
-                if service_type.lower() == 'wedding' 
-                else cls.EXTRA_COSTS['extra_photographer']
-            )
-            extra_cost = extra_photographers * cost_per_photographer
-            breakdown['extras'].append({
-                'description': f'عکاس/فیلمبردار اضافی ({extra_photographers} نفر)',
-                'amount': extra_cost
-            })
-            breakdown['subtotal'] += extra_cost
-        
-        # تخفیف
-        discount_percent = details.get('discount_percent', 0)
-        if discount_percent > 0:
-            breakdown['discount'] = breakdown['subtotal'] * (discount_percent / 100)
-        
-        # محاسبه مالیات
-        taxable_amount = breakdown['subtotal'] - breakdown['discount']
-        breakdown['tax'] = taxable_amount * cls.TAX_RATE
-        
-        # محاسبه کل
-        breakdown['total'] = taxable_amount + breakdown['tax']
-        
-        return breakdown
-    
+        return get_engine().quote(service_type, details)
+
+    @classmethod
+    def price_booking(cls, payload: Dict) -> Tuple[Dict, Optional[Quote], List[str]]:
+        """
+        اعتبارسنجی و قیمت‌گذاری کل فرم رزرو در یک مرحله
+
+        Returns:
+            (اطلاعات رزرو، Quote یا None در صورت خطا، لیست خطاها)
+        """
+        booking, errors = ValidationUtils.validate_booking(payload)
+        if errors:
+            return booking, None, errors
+        return booking, cls.calculate_service_cost(booking['service_type'], booking), errors
+
     @staticmethod
     def get_service_name(service_type: str) -> str:
         """تبدیل نوع خدمت به نام فارسی"""
-        names = {
-            'birthday': 'عکاسی تولد',
-            'wedding': 'عکاسی عروسی',
-            'engagement': 'فیلمبرداری عقد',
-            'general': 'عکاسی/فیلمبرداری عمومی',
-            'other': 'سایر خدمات'
-        }
-        return names.get(service_type.lower(), 'خدمت نامشخص')
+        return get_engine().service_name(service_type)
     
     @staticmethod
     def format_currency(amount: float) -> str:
@@ -198,6 +212,11 @@ class CostCalculator:
         return PersianDateUtils.english_to_persian_digits(
             f"{amount:,.0f} تومان"
         )
+    
+    @staticmethod
+    def format_percent(percent: float) -> str:
+        """فرمت کردن درصد با ارقام فارسی (۹، ۱۲٫۵)"""
+        return PersianDateUtils.english_to_persian_digits(f"{percent:.2f}".rstrip('0').rstrip('.'))
 
 
 class ReservationCodeGenerator:
@@ -208,7 +227,7 @@ class ReservationCodeGenerator:
         """تولید کد رزرو تصادفی"""
         characters = string.ascii_uppercase + string.digits
         # حذف کاراکترهای مشکل‌ساز
-        characters = characters.replace('0', '').replace('O', '').replace('I', '').replace('1')
+        characters = characters.replace('0', '').replace('O', '').replace('I', '').replace('1', '')
         return ''.join(random.choices(characters, k=length))
 
 
@@ -327,6 +346,103 @@ class ValidationUtils:
         except:
             return False
 
+    @classmethod
+    def validate_booking(cls, payload: Dict, today: date = None) -> Tuple[Dict, List[str]]:
+        """
+        اعتبارسنجی یکجای فرم رزرو (Mini App) با همان قواعد مراحل گفتگو
+
+        فقط فیلدهای شناخته شده به dict خروجی منتقل می‌شوند (مثلاً discount_percent یا
+        custom_cost فرستاده شده توسط کاربر نادیده گرفته می‌شوند).
+
+        Args:
+            payload: فیلدهای فرم
+            today: تاریخ مبنا برای رد تاریخ‌های گذشته
+
+        Returns:
+            (اطلاعات رزرو با همان کلیدهای user_data گفتگو، لیست خطاها)
+        """
+        today = today or date.today()
+        errors = []
+        booking = {}
+
+        def text(key: str, max_length: int) -> str:
+            value = payload.get(key)
+            return value.strip()[:max_length] if isinstance(value, str) else ''
+
+        def number(key: str, minimum: int, maximum: int) -> Optional[int]:
+            value = payload.get(key)
+            try:
+                value = int(PersianDateUtils.persian_to_english_digits(str(value)))
+            except (TypeError, ValueError):
+                return None
+            return value if minimum <= value <= maximum else None
+
+        # اطلاعات شخصی
+        booking['name'] = text('name', 50)
+        if not cls.validate_persian_text(booking['name'], 2, 50):
+            errors.append("نام نامعتبر است")
+        booking['family_name'] = text('family_name', 50)
+        if len(booking['family_name']) < 2:
+            errors.append("نام خانوادگی نامعتبر است")
+        booking['phone'] = text('phone', 20)
+        if not cls.validate_phone(booking['phone']):
+            errors.append("شماره تلفن نامعتبر است")
+        booking['email'] = text('email', 100) or None
+        if booking['email'] and not cls.validate_email(booking['email']):
+            errors.append("ایمیل نامعتبر است")
+
+        # نوع خدمت
+        booking['service_type'] = text('service_type', 20).lower()
+        if booking['service_type'] not in get_engine().rules.services:
+            errors.append("نوع خدمت نامعتبر است")
+        if booking['service_type'] == 'wedding':
+            booking['bride_name'] = text('bride_name', 50)
+            if len(booking['bride_name']) < 2:
+                errors.append("نام عروس نامعتبر است")
+            booking['guest_count'] = number('guest_count', 1, 10000)
+            if booking['guest_count'] is None:
+                errors.append("تعداد مهمانان نامعتبر است")
+
+        # اطلاعات مراسم
+        day = PersianDateUtils.parse_jalali_date(text('event_date', 20))
+        if day is None:
+            errors.append("تاریخ مراسم نامعتبر است")
+        elif day < today:
+            errors.append("تاریخ مراسم گذشته است")
+        else:
+            booking['event_date'] = PersianDateUtils.format_jalali_date(day)
+        booking['event_time'] = text('event_time', 20)
+        if not cls.validate_time(booking['event_time']):
+            errors.append("ساعت مراسم نامعتبر است")
+        booking['location'] = text('location', 200)
+        if len(booking['location']) < 3:
+            errors.append("مکان مراسم نامعتبر است")
+
+        duration = payload.get('duration')
+        if duration == 'full':
+            booking['duration'] = "تمام روز"
+        else:
+            hours = number('duration', 1, 24)
+            if hours is None:
+                errors.append("مدت زمان مراسم نامعتبر است")
+            else:
+                booking['duration'] = f"{hours} ساعت"
+        booking['special_requests'] = text('special_requests', 500) or None
+
+        # مشخصات فنی (همان بازه‌های کیبوردهای گفتگو)
+        booking['cameras'] = number('cameras', 1, 5)
+        if booking['cameras'] is None:
+            errors.append("تعداد دوربین نامعتبر است")
+        booking['camera_quality'] = text('camera_quality', 30)
+        if not booking['camera_quality']:
+            errors.append("کیفیت دوربین مشخص نشده است")
+        booking['helishot'] = payload.get('helishot') is True
+        booking['photographers'] = number('photographers', 1, 4)
+        if booking['photographers'] is None:
+            errors.append("تعداد عکاس نامعتبر است")
+
+        return booking, errors
+
 
 class PDFGenerator:
     """تولید فاکتور PDF"""
@@ -337,11 +453,13 @@ class PDFGenerator:
     
     def setup_fonts(self):
         """تنظیم فونت‌های فارسی"""
-        # در پیاده‌سازی واقعی، فونت فارسی را اضافه کنید
+        # در پیاده‌سازی واقعی، فونت فارسی را اضافه کنید (import ها اینجا، نه در سطح ماژول)
+        # from reportlab.pdfbase import pdfmetrics
+        # from reportlab.pdfbase.ttfonts import TTFont
         # pdfmetrics.registerFont(TTFont('Persian', 'path/to/persian_font.ttf'))
         pass
     
-    def generate_invoice_pdf(self, reservation_data: Dict, cost_breakdown: Dict) -> io.BytesIO:
+    def generate_invoice_pdf(self, reservation_data: Dict, cost_breakdown: Quote) -> io.BytesIO:
         """
         تولید فاکتور PDF
         
@@ -352,6 +470,13 @@ class PDFGenerator:
         Returns:
             BytesIO object حاوی PDF
         """
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+        
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         
@@ -401,39 +526,39 @@ class PDFGenerator:
         
         # خدمت پایه
         table_data.append([
-            CostCalculator.format_currency(cost_breakdown['base_service']['amount']),
-            cost_breakdown['base_service']['description']
+            CostCalculator.format_currency(cost_breakdown.base_service.amount),
+            cost_breakdown.base_service.description
         ])
         
         # خدمات اضافی
-        for extra in cost_breakdown['extras']:
+        for extra in cost_breakdown.extras:
             table_data.append([
-                CostCalculator.format_currency(extra['amount']),
-                extra['description']
+                CostCalculator.format_currency(extra.amount),
+                extra.description
             ])
         
         # جمع فرعی
         table_data.append([
-            CostCalculator.format_currency(cost_breakdown['subtotal']),
+            CostCalculator.format_currency(cost_breakdown.subtotal),
             'جمع فرعی'
         ])
         
         # تخفیف
-        if cost_breakdown['discount'] > 0:
+        if cost_breakdown.discount > 0:
             table_data.append([
-                f"-{CostCalculator.format_currency(cost_breakdown['discount'])}",
+                f"-{CostCalculator.format_currency(cost_breakdown.discount)}",
                 'تخفیف'
             ])
         
         # مالیات
         table_data.append([
-            CostCalculator.format_currency(cost_breakdown['tax']),
-            'مالیات (%۹)'
+            CostCalculator.format_currency(cost_breakdown.tax),
+            f"مالیات (%{CostCalculator.format_percent(cost_breakdown.tax_rate * 100)})"
         ])
         
         # جمع کل
         table_data.append([
-            CostCalculator.format_currency(cost_breakdown['total']),
+            CostCalculator.format_currency(cost_breakdown.total),
             'جمع کل'
         ])
         
@@ -457,8 +582,8 @@ class PDFGenerator:
         
         # اطلاعات پرداخت
         payment_info = f"""
-        مبلغ بیعانه (۵۰٪): {CostCalculator.format_currency(cost_breakdown['total'] * 0.5)}<br/>
-        مبلغ باقی‌مانده: {CostCalculator.format_currency(cost_breakdown['total'] * 0.5)}<br/>
+        مبلغ بیعانه ({CostCalculator.format_percent(cost_breakdown.deposit_percentage)}٪): {CostCalculator.format_currency(cost_breakdown.deposit)}<br/>
+        مبلغ باقی‌مانده: {CostCalculator.format_currency(cost_breakdown.balance)}<br/>
         <br/>
         شماره کارت: ۱۲۳۴-۵۶۷۸-۹۰۱۲-۳۴۵۶<br/>
         نام صاحب کارت: استودیو ماندنی
@@ -520,34 +645,35 @@ class MessageFormatter:
         """.strip()
     
     @staticmethod
-    def format_cost_breakdown(cost_breakdown: Dict) -> str:
+    def format_cost_breakdown(cost_breakdown: Quote) -> str:
         """فرمت کردن تفکیک هزینه‌ها"""
         text = "💰 **تفکیک هزینه‌ها**\n\n"
         
         # خدمت پایه
-        text += f"🔹 {cost_breakdown['base_service']['description']}: "
-        text += f"{CostCalculator.format_currency(cost_breakdown['base_service']['amount'])}\n"
+        text += f"🔹 {cost_breakdown.base_service.description}: "
+        text += f"{CostCalculator.format_currency(cost_breakdown.base_service.amount)}\n"
         
         # خدمات اضافی
-        for extra in cost_breakdown['extras']:
-            text += f"🔹 {extra['description']}: "
-            text += f"{CostCalculator.format_currency(extra['amount'])}\n"
+        for extra in cost_breakdown.extras:
+            text += f"🔹 {extra.description}: "
+            text += f"{CostCalculator.format_currency(extra.amount)}\n"
         
-        text += f"\n📊 جمع فرعی: {CostCalculator.format_currency(cost_breakdown['subtotal'])}\n"
+        text += f"\n📊 جمع فرعی: {CostCalculator.format_currency(cost_breakdown.subtotal)}\n"
         
         # تخفیف
-        if cost_breakdown['discount'] > 0:
-            text += f"🎁 تخفیف: -{CostCalculator.format_currency(cost_breakdown['discount'])}\n"
+        if cost_breakdown.discount > 0:
+            text += f"🎁 تخفیف: -{CostCalculator.format_currency(cost_breakdown.discount)}\n"
         
         # مالیات
-        text += f"📋 مالیات (۹٪): {CostCalculator.format_currency(cost_breakdown['tax'])}\n"
+        tax_percent = CostCalculator.format_percent(cost_breakdown.tax_rate * 100)
+        text += f"📋 مالیات ({tax_percent}٪): {CostCalculator.format_currency(cost_breakdown.tax)}\n"
         
         # جمع کل
-        text += f"\n💵 **جمع کل: {CostCalculator.format_currency(cost_breakdown['total'])}**\n"
+        text += f"\n💵 **جمع کل: {CostCalculator.format_currency(cost_breakdown.total)}**\n"
         
         # بیعانه
-        deposit = cost_breakdown['total'] * 0.5
-        text += f"💳 بیعانه مورد نیاز (۵۰٪): {CostCalculator.format_currency(deposit)}"
+        deposit_percent = CostCalculator.format_percent(cost_breakdown.deposit_percentage)
+        text += f"💳 بیعانه مورد نیاز ({deposit_percent}٪): {CostCalculator.format_currency(cost_breakdown.deposit)}"
         
         return text
     
@@ -615,17 +741,10 @@ class SmartRecommendations:
 
 
 def setup_logging():
-    """تنظیم سیستم لاگ"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('mandani_bot.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    """تنظیم سیستم لاگ (توسط نقطه ورود برنامه فراخوانی می‌شود، نه هنگام import)"""
+    from logging_setup import setup_logging as _setup_logging
+    _setup_logging()
     return logging.getLogger(__name__)
 
 
-# تنظیم logger
-logger = setup_logging()
+logger = logging.getLogger(__name__)
@@ -0,0 +1,211 @@
+"""
+📱 ماژول Mini App رزرو
+Telegram Mini App (WebApp) booking form for Mandani Studio Bot
+
+مسیر گفتگویی رزرو حدود ۱۵ رفت و برگشت کاربر ↔ ربات دارد. فرم Mini App همه فیلدها را
+در مرورگر تلگرام جمع کرده و با Telegram.WebApp.sendData یکجا می‌فرستد. کل رزرو یک
+update web_app_data است و با یک تراکنش پایگاه داده ثبت می‌شود.
+
+فایل‌های فرم (پوشه WEBAPP_DIR) هنگام راه‌اندازی یک بار خوانده، فشرده (gzip) و
+hash می‌شوند و از همان سرور HTTP webhook (/webapp/) سرو می‌شوند:
+    index.html          Cache-Control: no-cache (اعتبارسنجی مجدد ارزان با ETag و پاسخ 304)
+    سایر فایل‌ها        Cache-Control: immutable یک‌ماهه؛ index.html با ?v=<نسخه> به آنها اشاره می‌کند
+
+payload ارسالی فرم:
+    {"init_data": "<Telegram.WebApp.initData>", "booking": {...فیلدهای فرم}}
+امضای init_data با HMAC-SHA256 و کلید مشتق از توکن ربات بررسی می‌شود. payload فقط
+وقتی پذیرفته می‌شود که امضا معتبر، تازه و متعلق به همان کاربر فرستنده پیام باشد.
+"""
+
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import mimetypes
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from aiohttp import web
+
+import metrics
+from pricing import Quote
+from utils import CostCalculator
+
+logger = logging.getLogger(__name__)
+
+WEBAPP_BOOKINGS = metrics.registry.counter(
+    'mandani_webapp_bookings_total', 'Reservations created from the Mini App form'
+)
+WEBAPP_REJECTED = metrics.registry.counter(
+    'mandani_webapp_rejected_total', 'Mini App submissions rejected (signature, validation or capacity)'
+)
+
+# فایل‌های متنی کوچک‌تر از این اندازه فشرده نمی‌شوند
+GZIP_MIN_SIZE = 512
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+VERSION_PLACEHOLDER = '{{version}}'
+
+
+class Asset(NamedTuple):
+    """یک فایل آماده سرو (بدنه خام و فشرده، ETag و سیاست cache)"""
+    content_type: str
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    cache_control: str
+
+
+class StaticAssets:
+    """فایل‌های فرم Mini App در حافظه با ETag، gzip و هدرهای cache"""
+
+    INDEX = 'index.html'
+
+    def __init__(self, directory: str, max_age: int = 30 * 24 * 3600):
+        """
+        Args:
+            directory: پوشه فایل‌های فرم
+            max_age: مدت cache فایل‌های نسخه‌دار (ثانیه)
+        """
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.assets: Dict[str, Asset] = {}
+        self.version = ''
+        self.load()
+
+    def load(self):
+        """خواندن فایل‌ها؛ نسخه از hash همه فایل‌ها به جز index.html ساخته می‌شود"""
+        files = {
+            path.relative_to(self.directory).as_posix(): path.read_bytes()
+            for path in sorted(self.directory.rglob('*')) if path.is_file()
+        }
+        digest = hashlib.blake2b(digest_size=6)
+        for name, body in files.items():
+            if name != self.INDEX:
+                digest.update(name.encode('utf-8') + b'\0' + body)
+        self.version = digest.hexdigest()
+
+        assets = {}
+        for name, body in files.items():
+            if name == self.INDEX:
+                body = body.replace(VERSION_PLACEHOLDER.encode('ascii'), self.version.encode('ascii'))
+                cache_control = 'no-cache'
+            else:
+                cache_control = f'public, max-age={self.max_age}, immutable'
+            assets[name] = self._build(name, body, cache_control)
+        self.assets = assets
+        logger.info(f"📱 فایل‌های Mini App بارگذاری شد: {len(assets)} فایل (نسخه {self.version})")
+
+    @staticmethod
+    def _build(name: str, body: bytes, cache_control: str) -> Asset:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        gzipped = None
+        if len(body) >= GZIP_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                gzipped = compressed
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        return Asset(content_type, body, gzipped, etag, cache_control)
+
+    def register(self, app: web.Application, prefix: str = '/webapp'):
+        """ثبت مسیرهای فرم در aiohttp Application"""
+        app.router.add_get(prefix + '/', self.handle)
+        app.router.add_get(prefix + '/{name:.+}', self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """پردازش GET فایل‌ها (فقط از فایل‌های بارگذاری شده؛ مسیر دلخواه خوانده نمی‌شود)"""
+        asset = self.assets.get(request.match_info.get('name') or self.INDEX)
+        if asset is None:
+            return web.Response(status=404)
+
+        headers = {'ETag': asset.etag, 'Cache-Control': asset.cache_control, 'Vary': 'Accept-Encoding'}
+        if asset.etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+
+        body = asset.body
+        if asset.gzipped and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = asset.gzipped
+            headers['Content-Encoding'] = 'gzip'
+        headers['Content-Type'] = asset.content_type
+        return web.Response(body=body, headers=headers)
+
+
+@lru_cache(maxsize=4)
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b'WebAppData', bot_token.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _data_check_hash(fields: Dict[str, str], bot_token: str) -> str:
+    data_check_string = '\n'.join(f'{key}={fields[key]}' for key in sorted(fields))
+    return hmac.new(_secret_key(bot_token), data_check_string.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def sign_init_data(fields: Dict[str, str], bot_token: str) -> str:
+    """ساخت initData امضا شده مانند تلگرام (برای تست بار و آزمایش فرم خارج از تلگرام)"""
+    return urlencode({**fields, 'hash': _data_check_hash(fields, bot_token)})
+
+
+def validate_init_data(init_data: str, bot_token: str, max_age: int = 86400,
+                       now: float = None) -> Optional[Dict]:
+    """
+    بررسی امضای Telegram.WebApp.initData
+
+    Args:
+        init_data: رشته query string دریافتی از فرم
+        bot_token: توکن ربات
+        max_age: حداکثر عمر auth_date (ثانیه؛ ۰ = بدون محدودیت)
+
+    Returns:
+        فیلدهای initData (user به dict تبدیل شده) یا None برای امضای نامعتبر یا منقضی
+    """
+    if not init_data or not bot_token:
+        return None
+    try:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        return None
+
+    received = fields.pop('hash', '')
+    if not hmac.compare_digest(_data_check_hash(fields, bot_token), received):
+        return None
+
+    try:
+        auth_date = int(fields.get('auth_date', 0))
+        if max_age and (now or time.time()) - auth_date > max_age:
+            return None
+        if 'user' in fields:
+            fields['user'] = json.loads(fields['user'])
+    except ValueError:
+        return None
+    return fields
+
+
+def parse_submission(data: str, bot_token: str, user_id: int,
+                     max_age: int = 86400) -> Tuple[Dict, Optional[Quote], List[str]]:
+    """
+    payload فرم ← (اطلاعات رزرو، Quote، خطاها) با بررسی امضا، اعتبارسنجی و قیمت‌گذاری یکجا
+
+    Args:
+        data: محتوای web_app_data.data
+        bot_token: توکن ربات
+        user_id: شناسه کاربر فرستنده پیام
+        max_age: حداکثر عمر امضا (ثانیه)
+    """
+    try:
+        payload = json.loads(data)
+        if not isinstance(payload, dict) or not isinstance(payload.get('booking'), dict):
+            raise ValueError('booking')
+    except ValueError:
+        return {}, None, ["اطلاعات فرم قابل خواندن نیست"]
+
+    init = validate_init_data(payload.get('init_data'), bot_token, max_age)
+    if init is None or (init.get('user') or {}).get('id') != user_id:
+        logger.warning(f"⚠️ فرم Mini App با امضای نامعتبر یا منقضی از کاربر {user_id}")
+        return {}, None, ["امضای فرم نامعتبر یا منقضی است؛ لطفاً فرم را دوباره باز کنید"]
+
+    return CostCalculator.price_booking(payload['booking'])
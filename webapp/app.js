@@ -0,0 +1,110 @@
+// فرم رزرو Mini App استودیو ماندنی
+// همه فیلدها با یک Telegram.WebApp.sendData ارسال می‌شوند؛ اعتبارسنجی نهایی و قیمت‌گذاری در ربات انجام می‌شود.
+(function () {
+  'use strict';
+
+  var tg = window.Telegram && window.Telegram.WebApp;
+  var form = document.getElementById('booking');
+  var errorBox = document.getElementById('error');
+  var wedding = document.getElementById('wedding');
+  var jalali = document.getElementById('jalali');
+  var fields = form.elements;
+
+  // محدودیت sendData در تلگرام
+  var MAX_PAYLOAD = 4096;
+  var PHONE = /^(09\d{9}|(\+98|0098)9\d{9}|0\d{10})$/;
+  var jalaliFormat = new Intl.DateTimeFormat('fa-IR-u-ca-persian', { year: 'numeric', month: 'long', day: 'numeric' });
+
+  function today() {
+    var now = new Date();
+    now.setMinutes(now.getMinutes() - now.getTimezoneOffset());
+    return now.toISOString().slice(0, 10);
+  }
+
+  function toggleWedding() {
+    var on = fields.service_type.value === 'wedding';
+    wedding.hidden = !on;
+    fields.bride_name.required = on;
+    fields.guest_count.required = on;
+  }
+
+  function showJalali() {
+    var value = fields.event_date.value;
+    jalali.textContent = value ? jalaliFormat.format(new Date(value + 'T12:00:00')) : '';
+  }
+
+  function collect() {
+    var booking = {
+      name: fields.name.value,
+      family_name: fields.family_name.value,
+      phone: fields.phone.value.replace(/[\s-]/g, ''),
+      email: fields.email.value,
+      service_type: fields.service_type.value,
+      event_date: fields.event_date.value,
+      event_time: fields.event_time.value,
+      location: fields.location.value,
+      duration: fields.duration.value,
+      special_requests: fields.special_requests.value,
+      cameras: Number(fields.cameras.value),
+      camera_quality: fields.camera_quality.value,
+      helishot: fields.helishot.checked,
+      photographers: Number(fields.photographers.value)
+    };
+    if (booking.service_type === 'wedding') {
+      booking.bride_name = fields.bride_name.value;
+      booking.guest_count = Number(fields.guest_count.value);
+    }
+    return booking;
+  }
+
+  function validate() {
+    var errors = [];
+    Array.prototype.forEach.call(fields, function (field) {
+      if (!field.name) return;
+      var invalid = !field.checkValidity() || (field.name === 'phone' && !PHONE.test(field.value.replace(/[\s-]/g, '')));
+      field.classList.toggle('invalid', invalid);
+      if (!invalid) return;
+      var label = field.closest('label');
+      var title = label ? label.firstChild.textContent : field.closest('fieldset').querySelector('legend').textContent;
+      errors.push('• ' + title.trim());
+    });
+    if (fields.event_date.value && fields.event_date.value < today()) {
+      errors.push('• تاریخ مراسم گذشته است');
+    }
+    errorBox.textContent = errors.length ? 'لطفاً این موارد را اصلاح کنید:\n' + errors.join('\n') : '';
+    errorBox.hidden = !errors.length;
+    return !errors.length;
+  }
+
+  function submit(event) {
+    if (event) event.preventDefault();
+    if (!validate()) {
+      if (tg) tg.HapticFeedback.notificationOccurred('error');
+      return;
+    }
+    var payload = JSON.stringify({ init_data: tg ? tg.initData : '', booking: collect() });
+    if (payload.length > MAX_PAYLOAD) {
+      errorBox.textContent = 'متن درخواست‌های خاص طولانی است؛ لطفاً کوتاه‌تر بنویسید.';
+      errorBox.hidden = false;
+      return;
+    }
+    if (tg) {
+      tg.MainButton.showProgress();
+      tg.sendData(payload);  // پنجره بسته شده و ربات یک update web_app_data دریافت می‌کند
+    }
+  }
+
+  fields.event_date.min = today();
+  fields.service_type.addEventListener('change', toggleWedding);
+  fields.event_date.addEventListener('change', showJalali);
+  form.addEventListener('submit', submit);
+  toggleWedding();
+
+  if (tg) {
+    document.body.classList.add('telegram');
+    tg.ready();
+    tg.expand();
+    tg.MainButton.setParams({ text: '✅ ثبت رزرو', is_visible: true });
+    tg.MainButton.onClick(submit);
+  }
+})();
@@ -3,131 +3,245 @@
 🌐 Webhook Handler برای ربات استودیو مندانی
 Mandani Studio Bot Webhook Handler for Web Hosting
 
-این فایل برای دریافت webhook های تلگرام در محیط hosting استفاده می‌شود
+این فایل برای دریافت webhook های تلگرام در محیط hosting استفاده می‌شود.
+update ها بلافاصله با پاسخ 200 تأیید شده و در صف محدود Application قرار می‌گیرند؛
+در صورت پر بودن صف، درخواست با 429/503 رد می‌شود تا تلگرام دوباره ارسال کند.
 """
 
 import os
 import sys
-import json
+import asyncio
+import hmac
 import logging
+import signal
 from pathlib import Path
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import ssl
+
+from aiohttp import web
 
 # اضافه کردن مسیر پروژه
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-# Import ربات
-try:
-    from main import MandaniStudioBot
-    from config import Config
-except ImportError as e:
-    print(f"❌ خطا در import: {e}")
-    sys.exit(1)
-
-# تنظیم logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from telegram import Update
+from config import Config
+import metrics
+from logging_setup import setup_logging
+
 logger = logging.getLogger(__name__)
 
-class WebhookHandler(BaseHTTPRequestHandler):
-    """Handler برای webhook های تلگرام"""
-    
-    def __init__(self, *args, bot_instance=None, **kwargs):
-        self.bot = bot_instance
-        super().__init__(*args, **kwargs)
-    
-    def do_POST(self):
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """سرور asyncio برای دریافت webhook های تلگرام"""
+
+    # از این درصد پر شدن صف به بعد، درخواست‌ها با 429 رد می‌شوند
+    SHED_THRESHOLD = 0.9
+
+    def __init__(self, application, secret_token: str = '', path: str = '/webhook', assets=None):
+        """
+        Args:
+            application: Application ربات (با update_queue محدود)
+            secret_token: توکن مخفی webhook
+            path: مسیر دریافت update ها
+            assets: StaticAssets فرم Mini App (سرو در /webapp/)
+        """
+        self.application = application
+        self.secret_token = secret_token
+        self.path = path
+        self.assets = assets
+        self.runner = None
+
+        # شمارنده‌ها برای /health و /metrics
+        self.accepted_count = 0
+        self.rejected_count = 0
+
+        metrics.registry.gauge(
+            'mandani_update_queue_size', 'Updates waiting in the Application queue'
+        ).set_function(lambda: self.update_queue.qsize())
+        metrics.registry.counter(
+            'mandani_webhook_accepted_total', 'Webhook updates accepted into the queue'
+        ).set_function(lambda: self.accepted_count)
+        metrics.registry.counter(
+            'mandani_webhook_rejected_total', 'Webhook updates rejected with 429/503'
+        ).set_function(lambda: self.rejected_count)
+
+    @property
+    def update_queue(self) -> asyncio.Queue:
+        return self.application.update_queue
+
+    def create_app(self, with_webhook: bool = True) -> web.Application:
+        """ایجاد aiohttp Application و ثبت مسیرها"""
+        app = web.Application()
+        if with_webhook:
+            app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/health', self.handle_health)
+        app.router.add_get('/metrics', self.handle_metrics)
+        if self.assets:
+            self.assets.register(app)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
         """پردازش POST request های webhook"""
+        # بررسی توکن مخفی
+        if self.secret_token:
+            received = request.headers.get(SECRET_TOKEN_HEADER, '')
+            if not hmac.compare_digest(received, self.secret_token):
+                logger.warning(f"⚠️ webhook با توکن نامعتبر از {request.remote}")
+                return web.Response(status=403)
+
+        # کنترل بار: قبل از parse کردن بدنه
+        queue = self.update_queue
+        if queue.maxsize and queue.qsize() >= queue.maxsize * self.SHED_THRESHOLD:
+            self.rejected_count += 1
+            status = 503 if queue.full() else 429
+            return web.Response(status=status, headers={'Retry-After': '1'})
+
         try:
-            # بررسی مسیر
-            if self.path != '/webhook':
-                self.send_response(404)
-                self.end_headers()
-                return
-            
-            # خواندن داده‌ها
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # Parse JSON
-            update_data = json.loads(post_data.decode('utf-8'))
-            
-            # پردازش update در ربات
-            if self.bot:
-                # در اینجا باید update را به ربات ارسال کنیم
-                # این کار نیاز به async processing دارد
-                logger.info(f"دریافت update: {update_data.get('update_id', 'unknown')}")
-            
-            # پاسخ موفق
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"ok": true}')
-            
+            update_data = await request.json()
+            update = Update.de_json(update_data, self.application.bot)
         except Exception as e:
-            logger.error(f"خطا در پردازش webhook: {e}")
-            self.send_response(500)
-            self.end_headers()
-    
-    def do_GET(self):
-        """پردازش GET request ها"""
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status": "healthy", "bot": "mandani_studio"}')
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Override logging"""
-        logger.info(f"{self.address_string()} - {format % args}")
-
-def create_webhook_server(bot_instance, port=8443):
-    """ایجاد سرور webhook"""
-    
-    def handler(*args, **kwargs):
-        return WebhookHandler(*args, bot_instance=bot_instance, **kwargs)
-    
-    server = HTTPServer(('', port), handler)
-    
-    # تنظیم SSL (در صورت نیاز)
-    # ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    # ssl_context.load_cert_chain('cert.pem', 'key.pem')
-    # server.socket = ssl_context.wrap_socket(server.socket, server_side=True)
-    
-    return server
+            logger.error(f"خطا در parse کردن update: {e}")
+            return web.Response(status=400)
+
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected_count += 1
+            return web.Response(status=503, headers={'Retry-After': '1'})
+
+        self.accepted_count += 1
+        return web.json_response({'ok': True})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """پردازش GET /health"""
+        return web.json_response({
+            'status': 'healthy',
+            'bot': 'mandani_studio',
+            'queue_size': self.update_queue.qsize(),
+            'queue_capacity': self.update_queue.maxsize,
+            'accepted': self.accepted_count,
+            'rejected': self.rejected_count,
+        })
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """پردازش GET /metrics (فرمت متنی Prometheus)"""
+        return web.Response(
+            body=metrics.registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8443, with_webhook: bool = True):
+        """شروع سرور HTTP روی event loop جاری"""
+        self.runner = web.AppRunner(self.create_app(with_webhook), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+
+    async def stop(self):
+        """توقف سرور HTTP"""
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def load_webapp_assets():
+    """فایل‌های فرم Mini App (فقط در صورت تنظیم WEBAPP_URL)"""
+    if not Config.WEBAPP_URL:
+        return None
+    from webapp import StaticAssets
+    return StaticAssets(Config.WEBAPP_DIR, Config.WEBAPP_CACHE_MAX_AGE)
+
+
+async def serve(bot_instance, webhook_url: str, port: int = 8443):
+    """
+    اجرای ربات و سرور webhook روی یک event loop تا دریافت SIGTERM یا SIGINT
+
+    با سیگنال توقف، سرور HTTP و Application متوقف شده و post_shutdown ربات اجرا می‌شود
+    (ذخیره آخرین update_id، بستن فایل ضبط و توقف پایش event loop).
+    """
+    application = bot_instance.build_application(
+        update_queue=asyncio.Queue(maxsize=Config.WEBHOOK_QUEUE_SIZE),
+        use_updater=False
+    )
+    server = WebhookServer(application, Config.WEBHOOK_SECRET_TOKEN, assets=load_webapp_assets())
+
+    if not Config.WEBHOOK_SECRET_TOKEN:
+        logger.warning("⚠️ WEBHOOK_SECRET_TOKEN تنظیم نشده؛ درخواست‌ها بدون احراز هویت پذیرفته می‌شوند")
+
+    async with application:
+        await application.start()
+        await application.bot.set_webhook(
+            url=webhook_url,
+            secret_token=Config.WEBHOOK_SECRET_TOKEN or None,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=Config.DROP_PENDING_UPDATES
+        )
+        await server.start(port=port)
+        if Config.LOOP_MONITOR:
+            bot_instance.loop_monitor.start()
+
+        logger.info(f"🌐 Webhook server شروع شد در پورت {port}")
+        logger.info("📱 ربات آماده دریافت webhook ها...")
+
+        # systemd و docker با SIGTERM متوقف می‌کنند؛ بدون handler پردازه بدون اجرای finally بسته می‌شود
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        signals = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+                signals.append(sig)
+            except (NotImplementedError, RuntimeError):
+                # ویندوز یا اجرا خارج از thread اصلی
+                pass
+
+        try:
+            await stop_event.wait()
+            logger.info("⏹️ سیگنال توقف دریافت شد")
+        finally:
+            for sig in signals:
+                loop.remove_signal_handler(sig)
+            await server.stop()
+            await application.stop()
+            # PTB فقط در run_polling/run_webhook post_shutdown را صدا می‌زند؛ اینجا مستقیم اجرا
+            # می‌شود تا آخرین update_id ذخیره شده و ضبط و پایش event loop متوقف شوند
+            await bot_instance.post_shutdown(application)
+
+
+def run_webhook_server(bot_instance, webhook_url: str, port: int = 8443):
+    """اجرای سرور webhook تا زمان توقف"""
+    try:
+        asyncio.run(serve(bot_instance, webhook_url, port))
+    except KeyboardInterrupt:
+        logger.info("⏹️ سرور توسط کاربر متوقف شد")
+
 
 def main():
     """تابع اصلی webhook handler"""
+    setup_logging()
     try:
         # تنظیم config
         if not Config.validate():
             logger.error("❌ خطا در تنظیمات")
             sys.exit(1)
-        
+
+        if not Config.WEBHOOK_URL:
+            logger.error("❌ WEBHOOK_URL تنظیم نشده است!")
+            sys.exit(1)
+
+        # Import ربات
+        from main import MandaniStudioBot
+
         # ایجاد instance ربات
         bot = MandaniStudioBot()
-        
+
         # تنظیم port
         port = int(os.getenv('WEBHOOK_PORT', 8443))
-        
-        # ایجاد سرور
-        server = create_webhook_server(bot, port)
-        
-        logger.info(f"🌐 Webhook server شروع شد در پورت {port}")
-        logger.info("📱 ربات آماده دریافت webhook ها...")
-        
+
         # اجرای سرور
-        server.serve_forever()
-        
-    except KeyboardInterrupt:
-        logger.info("⏹️ سرور توسط کاربر متوقف شد")
+        run_webhook_server(bot, Config.WEBHOOK_URL, port)
+
     except Exception as e:
         logger.error(f"❌ خطا در اجرای webhook server: {e}")
         sys.exit(1)
@@ -0,0 +1,198 @@
+"""
+🪄 ماژول ویزارد تک‌پیامی رزرو
+Single-message booking wizard for Mandani Studio Bot
+
+در حالت ویزارد، پاسخ مراحل متنی رزرو به جای ارسال پیام تازه، همان پیامی را ویرایش
+می‌کند که دکمه‌های رزرو روی آن هستند. نتیجه یک پیام برای هر رزرو است با نوار پیشرفت
+get_progress_indicator در انتهای آن. hash محتوای نهایی (متن، کیبورد، parse_mode) نگهداری
+می‌شود و ویرایشی که محتوای تازه‌ای ندارد اصلاً ارسال نمی‌شود. پیام‌های تایپ شده کاربر در
+صف حذف جمع شده و در پایان رزرو با یک فراخوانی deleteMessages در پس‌زمینه حذف می‌شوند
+(یا زودتر، اگر صف به اندازه دسته برسد).
+
+این حالت تعداد پیام‌های چت را کم می‌کند، نه تعداد فراخوانی‌های Bot API: هر پاسخ متنی
+به جای sendMessage یک editMessageText است و حذف پیام‌ها یک فراخوانی اضافه در هر رزرو دارد
+(۳۱ در برابر ۳۰ فراخوانی برای هر رزرو در تست بار). پاسخ هر مرحله متنی تازه دارد، پس hash
+محتوا تقریباً هیچ ویرایشی را حذف نمی‌کند؛ و پیام ویرایش شده بالای پاسخ‌های تایپ شده کاربر
+می‌ماند و تا حذف آنها در پایان رزرو ممکن است از دید خارج شود. به همین دلیل پیش‌فرض
+(BOOKING_WIZARD) خاموش است.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message, Update
+from telegram.error import BadRequest
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WIZARD_EDITS = metrics.registry.counter(
+    'mandani_wizard_edits_total', 'Booking wizard messages edited in place'
+)
+WIZARD_EDITS_SKIPPED = metrics.registry.counter(
+    'mandani_wizard_edits_skipped_total', 'Wizard edits skipped because the rendered content was unchanged'
+)
+WIZARD_INPUTS_DELETED = metrics.registry.counter(
+    'mandani_wizard_inputs_deleted_total', 'User input messages deleted by the booking wizard'
+)
+
+# حداکثر شناسه در هر فراخوانی deleteMessages
+DELETE_MESSAGES_LIMIT = 100
+
+BACK_KEYBOARD = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_main")]])
+
+
+class _WizardState:
+    __slots__ = ('message_id', 'content_hash', 'pending')
+
+    def __init__(self, message_id: int, content_hash: Optional[bytes] = None):
+        self.message_id = message_id
+        self.content_hash = content_hash
+        self.pending: List[int] = []
+
+
+class BookingWizard:
+    """نگهداری پیام ویزارد هر چت و ویرایش آن به جای ارسال پیام تازه"""
+
+    def __init__(self, progress: Callable[[str], str], enabled: bool = False, delete_input: bool = True,
+                 delete_batch: int = DELETE_MESSAGES_LIMIT, max_chats: int = 10000):
+        """
+        Args:
+            progress: تابع نوار پیشرفت (get_progress_indicator) برای هر مرحله
+            enabled: غیرفعال = رفتار قبلی (ارسال پیام تازه در هر مرحله)
+            delete_input: حذف پیام‌های تایپ شده کاربر
+            delete_batch: حداکثر پیام در صف حذف پیش از پایان رزرو
+            max_chats: حداکثر ویزارد فعال نگهداری شده (قدیمی‌ترین‌ها فراموش می‌شوند)
+        """
+        self.progress = progress
+        self.enabled = enabled
+        self.delete_input = delete_input
+        self.delete_batch = min(max(1, delete_batch), DELETE_MESSAGES_LIMIT)
+        self.max_chats = max_chats
+        self._states: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def content_hash(text: str, reply_markup=None, parse_mode: str = None) -> bytes:
+        payload = json.dumps(
+            [text, reply_markup.to_dict() if reply_markup else None, parse_mode],
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+    def _remember(self, chat_id: int, state: _WizardState):
+        self._states[chat_id] = state
+        self._states.move_to_end(chat_id)
+        while len(self._states) > self.max_chats:
+            self._states.popitem(last=False)
+
+    def attach(self, context, message: Message):
+        """
+        پیامی که دکمه آن زده شد میزبان ویزارد است (فراخوانی از callback ها)
+
+        handler دکمه خودش پیام را ویرایش می‌کند؛ hash قبلی دیگر معتبر نیست.
+        """
+        if not self.enabled or message is None:
+            return
+        chat_id = message.chat_id
+        state = self._states.get(chat_id)
+        if state is None or state.message_id != message.message_id:
+            pending = state.pending if state else []
+            state = _WizardState(message.message_id)
+            state.pending = pending
+            self._remember(chat_id, state)
+        else:
+            state.content_hash = None
+
+    def finish(self, context, chat_id: int):
+        """پایان رزرو: حذف پیام‌های باقی‌مانده و فراموش کردن پیام ویزارد"""
+        state = self._states.pop(chat_id, None)
+        if state:
+            self._flush(context, chat_id, state)
+
+    async def show(self, update: Update, context, step: str, text: str, reply_markup=None,
+                   parse_mode: str = None) -> Optional[Message]:
+        """
+        پاسخ یک مرحله متنی رزرو
+
+        Args:
+            step: مرحله نوار پیشرفت (personal_info، service_type، event_details، ...)
+
+        Returns:
+            پیام تازه در صورت ارسال؛ None اگر پیام ویزارد ویرایش شد یا تغییری نداشت
+        """
+        if not self.enabled:
+            return await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+
+        chat_id = update.effective_chat.id
+        progress = self.progress(step).strip()
+        if progress and progress not in text:
+            text = f"{text.rstrip()}\n\n{progress}"
+        # پیام ویزارد همیشه راه خروج دارد
+        reply_markup = reply_markup or BACK_KEYBOARD
+        digest = self.content_hash(text, reply_markup, parse_mode)
+
+        state = self._states.get(chat_id)
+        if state is None:
+            message = await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+            self._remember(chat_id, _WizardState(message.message_id, digest))
+            return message
+
+        if self.delete_input and update.message:
+            state.pending.append(update.message.message_id)
+
+        message = None
+        if digest == state.content_hash:
+            WIZARD_EDITS_SKIPPED.inc()
+        else:
+            try:
+                await context.bot.edit_message_text(
+                    text, chat_id=chat_id, message_id=state.message_id,
+                    reply_markup=reply_markup, parse_mode=parse_mode
+                )
+                WIZARD_EDITS.inc()
+            except BadRequest as e:
+                if 'not modified' not in str(e).lower():
+                    # پیام ویزارد حذف شده یا دیگر قابل ویرایش نیست؛ ادامه با پیام تازه
+                    logger.debug(f"ویرایش پیام ویزارد ممکن نشد ({e})؛ ارسال پیام تازه")
+                    message = await update.message.reply_text(
+                        text, reply_markup=reply_markup, parse_mode=parse_mode
+                    )
+                    state.message_id = message.message_id
+            state.content_hash = digest
+
+        if len(state.pending) >= self.delete_batch:
+            self._flush(context, chat_id, state)
+        return message
+
+    def _flush(self, context, chat_id: int, state: _WizardState):
+        if not state.pending:
+            return
+        message_ids, state.pending = state.pending, []
+        context.application.create_task(self._delete(context.bot, chat_id, message_ids))
+
+    @staticmethod
+    async def _delete(bot, chat_id: int, message_ids: List[int]):
+        """حذف دسته‌ای با deleteMessages (Bot API 7.0)؛ در صورت خطا، حذف تکی و همزمان"""
+        deleted = 0
+        for start in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+            chunk = message_ids[start:start + DELETE_MESSAGES_LIMIT]
+            try:
+                if hasattr(bot, 'delete_messages'):
+                    await bot.delete_messages(chat_id, chunk)
+                else:
+                    # python-telegram-bot 20.7 برای این متد wrapper ندارد
+                    await bot._post('deleteMessages', {'chat_id': chat_id, 'message_ids': chunk})
+                deleted += len(chunk)
+            except Exception as e:
+                logger.debug(f"deleteMessages ناموفق بود ({e})؛ حذف تکی")
+                results = await asyncio.gather(
+                    *(bot.delete_message(chat_id, message_id) for message_id in chunk),
+                    return_exceptions=True
+                )
+                deleted += sum(1 for result in results if result is True)
+        WIZARD_INPUTS_DELETED.inc(deleted)